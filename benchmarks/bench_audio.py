@@ -0,0 +1,58 @@
+"""
+Audio conversion throughput, vectorized `pyoai_realtime.audio` against the previous ad-hoc approach.
+
+The previous approach is what `tests/test_audio.py` used to do: normalize with NumPy, take the first channel and
+then convert each float sample to PCM16 one at a time.
+
+    uv run python benchmarks/bench_audio.py [seconds]
+"""
+
+import math
+import struct
+import sys
+import time
+from array import array
+
+from pyoai_realtime import audio
+
+
+def stereo_clip(rate: int, seconds: int) -> bytes:
+    samples = array("h")
+    for i in range(rate * seconds):
+        value = int(12000 * math.sin(2 * math.pi * 220 * i / rate))
+        samples.extend((value, value))
+    return samples.tobytes()
+
+
+def adhoc_pcm16(raw: bytes) -> bytes:
+    samples = audio.np.frombuffer(raw, dtype="<i2").astype(audio.np.float32)[::2]
+    samples /= 2**15
+    out = bytearray()
+    for s in samples.tolist():
+        s = max(-1.0, min(1.0, s))
+        out += struct.pack("<h", int(s * 0x8000 if s < 0 else s * 0x7FFF))
+    return bytes(out)
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main(seconds: int = 10):
+    cases = [("float32 -> pcm16, 24kHz stereo", audio.DEFAULT_FREQUENCY), ("resample 44.1kHz stereo", 44_100)]
+    for label, rate in cases:
+        raw = stereo_clip(rate, seconds)
+        print(f"{label} ({seconds}s of audio)")
+        if rate == audio.DEFAULT_FREQUENCY and audio.np is not None:
+            elapsed = timed(adhoc_pcm16, raw)
+            print(f"  {'ad-hoc':>8}: {elapsed * 1000:8.1f} ms  ({seconds / elapsed:8.0f}x realtime)")
+        backends = [("numpy", True), ("array", False)] if audio.np is not None else [("array", False)]
+        for name, use_numpy in backends:
+            elapsed = timed(audio.to_pcm16, raw, rate, 2, "s16", 1 << 16, use_numpy)
+            print(f"  {name:>8}: {elapsed * 1000:8.1f} ms  ({seconds / elapsed:8.0f}x realtime)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,85 @@
+"""
+Audio delta frames per second through `RealtimeAPI`'s receive path, per core.
+
+Pre-encoded `response.audio.delta` frames (compact json like the api sends) are fed to `_handle_message` directly, so
+only the client side is measured. Every configuration gets the raw frames and pays for what it needs of them: the
+generic path the utf-8 decode websockets does for text frames, the fast path nothing. Both end with the decoded PCM in
+the same audio sink, optionally with a no-op `server.*` handler that makes the fast path build the event dict too.
+
+    uv run python benchmarks/bench_audio_fast_path.py [frames] [chunk_ms]
+"""
+
+import asyncio
+import base64
+import json
+import os
+import random
+import sys
+import time
+
+from pyoai_realtime import log
+from pyoai_realtime.audio_fast_path import AudioDelta
+from pyoai_realtime.constants import DEFAULT_FREQUENCY
+from pyoai_realtime.realtime_api import RealtimeAPI
+from pyoai_realtime.utils import generate_id
+
+
+def frames(n: int, chunk_ms: int) -> list[bytes]:
+    pcm = random.Random(0).randbytes(DEFAULT_FREQUENCY * chunk_ms // 1000 * 2)
+    delta = base64.b64encode(pcm).decode("ascii")
+    ids = {"response_id": generate_id("resp_"), "item_id": generate_id("item_"), "output_index": 0, "content_index": 0}
+    return [
+        json.dumps(
+            {"event_id": generate_id("event_"), "type": "response.audio.delta", **ids, "delta": delta},
+            separators=(",", ":"),
+        ).encode()
+        for _ in range(n)
+    ]
+
+
+async def measure(api: RealtimeAPI, messages: list[bytes], wildcard: bool = False) -> float:
+    received = 0
+
+    def consume(frame: AudioDelta):
+        nonlocal received
+        received += len(frame.pcm)
+
+    api.add_audio_sink(consume)
+    if wildcard:
+        api.on("server.*", lambda event: None)
+
+    # best of three, the runs are short enough for other load on the machine to show
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        if api.audio_fast_path:
+            for message in messages:
+                await api._handle_message(message)
+        else:
+            for message in messages:
+                await api._handle_message(message.decode())
+        best = min(best, time.perf_counter() - start)
+    assert received
+    return len(messages) / best
+
+
+async def main(n: int = 20_000, chunk_ms: int = 40):
+    messages = frames(n, chunk_ms)
+    log.console.file = open(os.devnull, "w")
+
+    results = {
+        "generic, logged": await measure(RealtimeAPI(), messages[: n // 50]),
+        "generic": await measure(RealtimeAPI(log_events=False), messages),
+        "generic, server.*": await measure(RealtimeAPI(log_events=False), messages, wildcard=True),
+        "fast path": await measure(RealtimeAPI(audio_fast_path=True, log_events=False), messages),
+        "fast path, server.*": await measure(
+            RealtimeAPI(audio_fast_path=True, log_events=False), messages, wildcard=True
+        ),
+    }
+    print(f"{n} frames of {chunk_ms}ms audio")
+    for label, rate in results.items():
+        print(f"{label:>20}: {rate:9.0f} frames/s ({rate / results['generic']:5.2f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:3])))
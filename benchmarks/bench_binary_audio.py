@@ -0,0 +1,63 @@
+"""
+Bytes and time to relay response audio to a client as base64 json vs binary frames.
+
+A `RealtimeRelay` proxies a client to a `FakeRealtimeServer` that streams `chunks` 40 ms audio deltas per response,
+the client asks for `responses` responses and decodes the audio of every delta.
+
+    uv run python benchmarks/bench_binary_audio.py [responses] [chunks]
+"""
+
+import asyncio
+import base64
+import json
+import sys
+import time
+
+from websockets.asyncio.client import connect
+
+from pyoai_realtime.binary_audio import decode_audio_frame
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.realtime_conversation import RealtimeRelay
+
+
+async def run(responses: int, chunks: int, binary_audio: bool) -> tuple[int, int, float, float]:
+    async with FakeRealtimeServer(audio_chunks=chunks) as upstream:
+        relay = RealtimeRelay(upstream_url=upstream.url, model=None, binary_audio=binary_audio)
+        server = await relay.serve(hostname="localhost", port=0)
+        received = pcm = 0
+        decoding = 0.0
+        async with connect(f"ws://localhost:{server.sockets[0].getsockname()[1]}") as client:
+            await client.recv()
+            start = time.perf_counter()
+            for _ in range(responses):
+                await client.send(json.dumps({"type": "response.create"}))
+                while True:
+                    message = await client.recv()
+                    received += len(message)
+                    t = time.perf_counter()
+                    if isinstance(message, bytes):
+                        pcm += len(decode_audio_frame(message)[2])
+                    elif (event := json.loads(message))["type"] == "response.audio.delta":
+                        pcm += len(base64.b64decode(event["delta"]))
+                    decoding += time.perf_counter() - t
+                    if isinstance(message, str) and '"response.done"' in message:
+                        break
+            elapsed = time.perf_counter() - start
+        server.close()
+        await server.wait_closed()
+    return received, pcm, elapsed, decoding
+
+
+async def main(responses: int = 50, chunks: int = 50):
+    print(f"{responses} responses of {chunks} x 40 ms audio deltas through the relay")
+    for label, binary_audio in (("base64 json", False), ("binary", True)):
+        received, pcm, elapsed, decoding = await run(responses, chunks, binary_audio)
+        frames = responses * chunks
+        print(
+            f"{label:>12}: {received / 2**20:6.2f} MiB to the client ({received / pcm:.2f} x pcm),"
+            f" {elapsed * 1e6 / frames:6.1f} us per delta end to end, client decode {decoding * 1e6 / frames:5.2f} us"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:3])))
@@ -0,0 +1,55 @@
+"""
+Audio handler delay with a heavy observer on the same events, dispatched inline vs as a background handler.
+
+Audio deltas arrive in bursts (as they do when several frames land in one read), a critical handler stands in for
+playback and an observer burns `observer_ms` of cpu per event (analytics, persistence). Delay is from the burst
+arriving to the playback handler seeing each frame.
+
+    uv run python benchmarks/bench_dispatch_priority.py [bursts] [burst_size] [observer_ms]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+from pyoai_realtime.event_handler import HandlerPriority, RealtimeEventHandler
+
+
+def busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def run(bursts: int, burst_size: int, observer_ms: float, observer_priority: HandlerPriority) -> list[float]:
+    handler = RealtimeEventHandler()
+    delays = []
+    handler.on(
+        "server.response.audio.delta",
+        lambda event: delays.append(time.perf_counter() - event["arrived"]),
+        HandlerPriority.CRITICAL,
+    )
+    handler.on("server.response.audio.delta", lambda event: busy(observer_ms / 1000), observer_priority)
+
+    for _ in range(bursts):
+        arrived = time.perf_counter()
+        for _ in range(burst_size):
+            await handler.dispatch("server.response.audio.delta", {"arrived": arrived})
+        # the next read, background handlers get the loop in between
+        await asyncio.sleep(burst_size * observer_ms / 1000 * 1.5)
+    await handler.flush_background()
+    return delays
+
+
+async def main(bursts: int = 50, burst_size: int = 5, observer_ms: int = 2):
+    print(f"{bursts} bursts of {burst_size} deltas, observer {observer_ms} ms per event")
+    for label, priority in (("inline", HandlerPriority.NORMAL), ("background", HandlerPriority.BACKGROUND)):
+        delays = sorted(await run(bursts, burst_size, observer_ms, priority))
+        p99 = delays[min(len(delays) - 1, int(len(delays) * 0.99))]
+        p50 = statistics.median(delays)
+        print(f"{label:>10} observer: playback delay p50 {p50 * 1000:6.2f} ms, p99 {p99 * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:4])))
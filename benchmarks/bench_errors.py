@@ -0,0 +1,74 @@
+"""
+Connection attempts during an outage: a fixed retry interval vs `ErrorPolicy` with jittered backoff and a breaker.
+
+C clients keep trying to connect to an endpoint that is down for D seconds and comes back afterwards. Fewer attempts
+during the outage is capacity the endpoint (and the client) does not spend on a reconnect storm, the recovery column
+is how long after the endpoint is back the last client is connected.
+
+    uv run python benchmarks/bench_errors.py [clients] [outage_s] [reset_timeout_s]
+"""
+
+import asyncio
+import socket
+import sys
+import time
+
+from pyoai_realtime.errors import CircuitBreakers, CircuitOpenError, ErrorPolicy
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.realtime_api import RealtimeAPI
+
+
+class CountingAPI(RealtimeAPI):
+    attempts = 0
+
+    async def _open(self, url: str, headers: dict):
+        CountingAPI.attempts += 1
+        return await super()._open(url, headers)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+async def client(url: str, policy: ErrorPolicy | None, connected: list):
+    api = CountingAPI(url=url, error_policy=policy, log_events=False)
+    while True:
+        try:
+            await api.connect(model=None)
+            break
+        except CircuitOpenError as err:
+            await asyncio.sleep(err.retry_after)
+        except OSError:
+            await asyncio.sleep(0.1 if policy is None else 0)
+    connected.append(time.perf_counter())
+    await api.disconnect()
+
+
+async def run(clients: int, outage: float, policy: ErrorPolicy | None) -> tuple[int, float]:
+    port = free_port()
+    CountingAPI.attempts = 0
+    connected = []
+    tasks = [asyncio.create_task(client(f"ws://localhost:{port}", policy, connected)) for _ in range(clients)]
+    await asyncio.sleep(outage)
+    during_outage = CountingAPI.attempts
+    async with FakeRealtimeServer(port=port):
+        back = time.perf_counter()
+        await asyncio.gather(*tasks)
+    return during_outage, max(connected) - back
+
+
+async def main(clients: int = 50, outage: int = 5, reset_timeout: int = 1):
+    print(f"{clients} clients, {outage} s outage")
+    strategies = {
+        "retry every 100 ms": None,
+        "ErrorPolicy": ErrorPolicy(breakers=CircuitBreakers(reset_timeout=reset_timeout)),
+    }
+    for label, policy in strategies.items():
+        attempts, recovery = await run(clients, outage, policy)
+        print(f"{label:>18}: {attempts:6d} attempts during the outage, all connected {recovery * 1000:6.0f} ms after")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:4])))
@@ -0,0 +1,29 @@
+"""
+Microbenchmark for event id generation.
+
+    uv run python benchmarks/bench_generate_id.py
+"""
+
+import random
+import string
+import timeit
+
+from pyoai_realtime.utils import generate_id, generate_monotonic_id
+
+
+def legacy_generate_id(prefix: str, length: int = 21) -> str:
+    return prefix + "".join(random.choices(string.digits[1:] + string.ascii_letters, k=length - len(prefix)))
+
+
+def main(number: int = 200_000):
+    for name, fn in [
+        ("legacy random.choices", legacy_generate_id),
+        ("generate_id", generate_id),
+        ("generate_monotonic_id", generate_monotonic_id),
+    ]:
+        elapsed = min(timeit.repeat(lambda: fn("evt_"), number=number, repeat=3))
+        print(f"{name:>22}: {elapsed / number * 1e6:5.2f} us/id")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Import cost of the package entry points, from `python -X importtime` in fresh interpreters.
+
+Prints the cumulative time of each module (best of N runs) and the slowest imports it pulls in.
+
+    uv run python benchmarks/bench_import.py [runs] [top]
+"""
+
+import os
+import subprocess
+import sys
+
+MODULES = [
+    "pyoai_realtime",
+    "pyoai_realtime.realtime_events",
+    "pyoai_realtime.realtime_conversation",
+    "pyoai_realtime.realtime_api",
+]
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def importtime(module: str) -> dict[str, tuple[int, int]]:
+    """Self and cumulative microseconds of every module imported by `import module`."""
+    env = {**os.environ, "PYTHONPATH": SRC}
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], env=env, capture_output=True, text=True
+    )
+    times = {}
+    for line in out.stderr.splitlines()[1:]:
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main(runs: int = 5, top: int = 5):
+    for module in MODULES:
+        samples = [importtime(module) for _ in range(runs)]
+        best = min(samples, key=lambda times: times[module][1])
+        # the parent package is imported first and timed on its own line
+        total = sum(best[name][1] for name in {module, "pyoai_realtime"})
+        print(f"{module}: {total / 1000:.1f} ms")
+        slowest = sorted(best.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        for name, (self_us, _) in slowest:
+            print(f"    {self_us / 1000:6.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
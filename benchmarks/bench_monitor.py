@@ -0,0 +1,86 @@
+"""
+Playback delay in an overloaded loop, with and without a `LoopMonitor` shedding background handlers.
+
+Bursts of audio deltas are due every `period_ms`, a critical handler stands in for playback and an inline observer
+burns `observer_ms` of cpu per event, more than the loop has between bursts. Delay is from a burst being due to the
+playback handler seeing each frame. Also prints the cost of one sample with `connections` fake api connections.
+
+    uv run python benchmarks/bench_monitor.py [bursts] [burst_size] [observer_ms] [period_ms] [connections]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+from pyoai_realtime import log
+from pyoai_realtime.event_handler import HandlerPriority, RealtimeEventHandler
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.monitor import LoopMonitor
+from pyoai_realtime.realtime_api import RealtimeAPI
+
+
+def busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def run(bursts: int, burst_size: int, observer_ms: float, period_ms: float, monitor: LoopMonitor) -> tuple:
+    handler = RealtimeEventHandler()
+    delays = []
+    handler.on(
+        "server.response.audio.delta",
+        lambda event: delays.append(time.perf_counter() - event["due"]),
+        HandlerPriority.CRITICAL,
+    )
+    handler.on("server.response.audio.delta", lambda event: busy(observer_ms / 1000), HandlerPriority.NORMAL)
+    monitor.attach(handler)
+    monitor.start()
+
+    due = time.perf_counter()
+    for _ in range(bursts):
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        for _ in range(burst_size):
+            await handler.dispatch("server.response.audio.delta", {"due": due})
+        due += period_ms / 1000
+    await monitor.stop()
+    await handler.flush_background()
+    return delays, handler.background_stats
+
+
+async def sample_us(connections: int, samples: int = 2000) -> float:
+    async with FakeRealtimeServer() as server:
+        apis = [RealtimeAPI(url=server.url, log_events=False) for _ in range(connections)]
+        await asyncio.gather(*(api.connect() for api in apis))
+        monitor = LoopMonitor()
+        for api in apis:
+            monitor.attach(api)
+        start = time.perf_counter()
+        for _ in range(samples):
+            monitor.sample(0.0)
+        elapsed = (time.perf_counter() - start) / samples
+        await asyncio.gather(*(api.disconnect() for api in apis))
+    return elapsed * 1e6
+
+
+async def main(
+    bursts: int = 200, burst_size: int = 5, observer_ms: int = 3, period_ms: int = 10, connections: int = 50
+):
+    log.warn = lambda *args, **kwargs: None
+    print(f"{bursts} bursts of {burst_size} deltas every {period_ms} ms, observer {observer_ms} ms per event")
+    for label, threshold in (("monitor only", None), ("adaptive", 0.02)):
+        monitor = LoopMonitor(interval=0.01, lag_threshold=threshold, shed_priority=HandlerPriority.NORMAL)
+        delays, stats = await run(bursts, burst_size, observer_ms, period_ms, monitor)
+        delays.sort()
+        p99 = delays[min(len(delays) - 1, int(len(delays) * 0.99))]
+        print(
+            f"{label:>12}: playback delay p50 {statistics.median(delays) * 1000:7.2f} ms, p99 {p99 * 1000:7.2f} ms,"
+            f" loop lag p99 {monitor.stats.lag_percentile(99) * 1000:7.2f} ms,"
+            f" observer shed for {stats.shed} events"
+        )
+    print(f"one sample of {connections} connections: {await sample_us(connections):.1f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:6])))
@@ -0,0 +1,68 @@
+"""
+Journal throughput and resume time of the SQLite conversation store.
+
+A session of I items with D transcript deltas each is journaled into a database file, then rebuilt by replaying the
+whole journal (no checkpoints) and from the latest checkpoint plus its tail.
+
+    uv run python benchmarks/bench_persistence.py [items] [deltas] [checkpoint_every]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from pyoai_realtime.event_functions import ConversationInterface, EventFunctionsMixin
+from pyoai_realtime.persistence import ConversationJournal, SQLiteStore
+
+
+class Processor(EventFunctionsMixin):
+    def __init__(self):
+        self.conversation = ConversationInterface()
+        self.event_processor = {}
+        self._register_events()
+
+
+def events(items: int, deltas: int) -> list[dict]:
+    out = []
+    for idx in range(items):
+        item = {"id": f"item_{idx}", "type": "message", "role": "assistant", "content": []}
+        out.append({"event_id": "e", "type": "conversation.item.created", "previous_item_id": None, "item": item})
+        ids = {"response_id": "resp_1", "item_id": item["id"], "output_index": 0, "content_index": 0}
+        out.extend(
+            {"event_id": "e", "type": "response.audio_transcript.delta", **ids, "delta": "word "} for _ in range(deltas)
+        )
+    return out
+
+
+def journal_and_resume(path: str, stream: list[dict], checkpoint_every: int) -> dict:
+    store = SQLiteStore(path)
+    journal = ConversationJournal(store, "sess_1", Processor(), checkpoint_every=checkpoint_every)
+    start = time.perf_counter()
+    journal.extend(stream)
+    journal.flush()
+    journaled = time.perf_counter() - start
+    store.close()
+
+    store = SQLiteStore(path)
+    start = time.perf_counter()
+    resumed = ConversationJournal.resume(store, "sess_1", Processor())
+    resumed_s = time.perf_counter() - start
+    assert len(resumed.conversation.items) == len(journal.conversation.items)
+    store.close()
+    return {"events_per_s": len(stream) / journaled, "resume_ms": resumed_s * 1000}
+
+
+def main(items: int = 200, deltas: int = 100, checkpoint_every: int = 1000):
+    stream = events(items, deltas)
+    print(f"{len(stream)} events")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, every in (("journal only", 0), (f"checkpoint every {checkpoint_every}", checkpoint_every)):
+            result = journal_and_resume(os.path.join(tmp, f"{every}.db"), stream, every)
+            print(
+                f"{label:>24}: {result['events_per_s']:8.0f} events/s journaled, resume {result['resume_ms']:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
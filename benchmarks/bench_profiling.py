@@ -0,0 +1,41 @@
+"""
+Dispatch cost with handler profiling disabled and enabled.
+
+    uv run python benchmarks/bench_profiling.py [dispatches] [handlers]
+"""
+
+import asyncio
+import sys
+import time
+
+from pyoai_realtime.event_handler import RealtimeEventHandler
+
+
+async def dispatch_us(handler: RealtimeEventHandler, dispatches: int) -> float:
+    event = {"type": "response.audio.delta", "delta": ""}
+    start = time.perf_counter()
+    for i in range(dispatches):
+        await handler.dispatch("server.response.audio.delta", event)
+        if i % 100 == 99:
+            # a receive loop gets back to the event loop between frames, every 100 is the worst case here
+            await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    return (time.perf_counter() - start) / dispatches * 1e6
+
+
+async def main(dispatches: int = 100_000, handlers: int = 3):
+    handler = RealtimeEventHandler()
+    for _ in range(handlers):
+        handler.on("server.response.audio.delta", lambda event: None)
+
+    disabled = min([await dispatch_us(handler, dispatches) for _ in range(3)])
+    handler.enable_profiling(warn=False)
+    enabled = min([await dispatch_us(handler, dispatches) for _ in range(3)])
+    print(f"{handlers} handlers, us per dispatch")
+    print(f"profiling disabled: {disabled:6.2f}")
+    print(f" profiling enabled: {enabled:6.2f}")
+    print(handler.profiler.report(limit=3))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:3])))
@@ -0,0 +1,82 @@
+"""
+Throughput under a shared request limit: clients backing off blindly on errors vs a shared `RateLimitScheduler`.
+
+C clients under one key request responses back to back for D seconds against a fake server allowing L requests per
+W seconds. At most L + D * L / W responses fit, the table shows how close each strategy gets and at what cost.
+
+    uv run python benchmarks/bench_rate_limit.py [clients] [seconds] [limit] [window]
+"""
+
+import asyncio
+import sys
+import time
+
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.rate_limit import RateLimitScheduler
+from pyoai_realtime.realtime_api import RealtimeAPI
+
+
+async def request(api: RealtimeAPI) -> bool:
+    """One `response.create`, True once it is done, False if it was rejected."""
+    outcome = asyncio.get_running_loop().create_future()
+
+    def _done(event: dict):
+        if not outcome.done():
+            outcome.set_result(event["type"] == "response.done")
+
+    with api.scope() as scope:
+        scope.on_next("server.response.done", _done)
+        scope.on_next("server.error", _done)
+        await api.send("response.create")
+        return await outcome
+
+
+async def client(url: str, deadline: float, scheduler: RateLimitScheduler, results: dict):
+    api = RealtimeAPI(url=url, rate_limiter=scheduler, log_events=False)
+    await api.connect(model=None)
+    backoff = 0.1
+    while time.perf_counter() < deadline:
+        try:
+            async with asyncio.timeout(deadline - time.perf_counter()):
+                ok = await request(api)
+        except TimeoutError:
+            break
+        if ok:
+            results["done"] += 1
+            backoff = 0.1
+        else:
+            results["errors"] += 1
+            await asyncio.sleep(min(backoff, max(0, deadline - time.perf_counter())))
+            backoff = min(backoff * 2, 2.0)
+    await api.disconnect()
+
+
+async def run(
+    clients: int, seconds: float, limit: int, window: float, scheduled: bool
+) -> tuple[dict, RateLimitScheduler]:
+    scheduler = RateLimitScheduler() if scheduled else None
+    results = {"done": 0, "errors": 0}
+    async with FakeRealtimeServer(audio_chunks=1, request_limit=limit, limit_window=window) as server:
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(client(server.url, deadline, scheduler, results) for _ in range(clients)))
+    return results, scheduler
+
+
+async def main(clients: int = 8, seconds: int = 10, limit: int = 20, window: int = 2):
+    ceiling = limit + seconds * limit / window
+    print(f"{clients} clients, {seconds} s, {limit} requests per {window} s, at most {ceiling:.0f} responses")
+    for label, scheduled in (("blind backoff", False), ("scheduler", True)):
+        results, scheduler = await run(clients, seconds, limit, window, scheduled)
+        done, errors = results["done"], results["errors"]
+        line = f"{label:>14}: {done:4d} responses ({done / ceiling:4.0%}), {errors:4d} errors"
+        if scheduler is not None:
+            stats = scheduler.stats
+            line += (
+                f", queueing p50 {stats.latency_percentile(50) * 1000:.0f} ms"
+                f" p99 {stats.latency_percentile(99) * 1000:.0f} ms"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:5])))
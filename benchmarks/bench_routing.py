@@ -0,0 +1,94 @@
+"""
+Session setup through a `RealtimeRelay` without a router, with a `TenantRouter`, and when resuming a parked session.
+
+Each of `sessions` clients connects, waits for its first server event and disconnects. The upstream is a
+`FakeRealtimeServer` holding every event back `latency_ms`, a stand-in for the round trip to the api. A resumed client
+dropped its connection right after sending a request, the answer is waiting when it comes back.
+
+    uv run python benchmarks/bench_routing.py [sessions] [latency_ms]
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+from websockets.asyncio.client import connect
+
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.realtime_conversation import RealtimeRelay
+from pyoai_realtime.routing import Tenant, TenantRouter
+
+
+class Stub:
+    """Stands in for the handshake request, the server connection and its responses."""
+
+    def __init__(self, path: str = "/"):
+        self.path = path
+        self.headers = {}
+
+    def respond(self, status, text):
+        return Stub()
+
+
+async def first_event(url: str) -> float:
+    start = time.perf_counter()
+    async with connect(url) as client:
+        await client.recv()
+        return time.perf_counter() - start
+
+
+async def drop_connection(url: str, latency: float):
+    """Connect, send a request and go away before the answer arrives."""
+    async with connect(url) as client:
+        await client.recv()
+        await client.send(json.dumps({"type": "input_audio_buffer.clear"}))
+    await asyncio.sleep(2 * latency)
+
+
+async def run(sessions: int, latency: float, router: TenantRouter = None, resume: bool = False) -> list[float]:
+    async with FakeRealtimeServer(latency=latency) as upstream:
+        relay = RealtimeRelay(upstream_url=upstream.url, model=None, router=router)
+        server = await relay.serve(hostname="localhost", port=0)
+        url = f"ws://localhost:{server.sockets[0].getsockname()[1]}/?token=token"
+        setups = []
+        for i in range(sessions):
+            if resume:
+                # the answer waits in the parked upstream connection
+                await drop_connection(session_url := f"{url}&session=conv-{i}", latency)
+                setups.append(await first_event(session_url))
+                await router.close()
+            else:
+                setups.append(await first_event(url))
+        server.close()
+        await server.wait_closed()
+    return sorted(setups)
+
+
+async def main(sessions: int = 200, latency_ms: int = 20):
+    print(f"{sessions} sessions, {latency_ms} ms upstream latency")
+    tenants = {"token": Tenant("acme", max_sessions=1000)}
+    for label, router, resume in (
+        ("no router", None, False),
+        ("router, new session", TenantRouter(tenants), False),
+        ("router, resumed", TenantRouter(tenants), True),
+    ):
+        setups = await run(sessions, latency_ms / 1000, router, resume)
+        p50, p99 = setups[len(setups) // 2], setups[min(len(setups) - 1, int(len(setups) * 0.99))]
+        print(f"{label:>20}: first event p50 {p50 * 1e3:6.2f} ms, p99 {p99 * 1e3:6.2f} ms")
+
+    # the handshake hook alone, half of the keys are redirected
+    router = TenantRouter(tenants, node="a", nodes={"a": "ws://a", "b": "ws://b"})
+    connection = Stub()
+    requests = [Stub(f"/?token=token&session=conv-{i}") for i in range(100)]
+    start = time.perf_counter()
+    for _ in range(100):
+        for request in requests:
+            if router.process_request(connection, request) is None:
+                router.release(connection)
+    elapsed = time.perf_counter() - start
+    print(f"process_request + release: {elapsed * 1e6 / 10_000:.2f} us per handshake")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:3])))
@@ -0,0 +1,81 @@
+"""
+Event loop and websocket settings on the local fake-server workload.
+
+Every configuration runs in a fresh process: K sessions connect to the fake server, each requests R responses of D
+audio deltas (40ms each) and the receive throughput and time to first audio delta are reported.
+
+    uv run python benchmarks/bench_runtime.py [sessions] [responses] [deltas]
+"""
+
+import asyncio
+import multiprocessing
+import statistics
+import sys
+import time
+
+from pyoai_realtime import realtime_api, runtime
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.transport import TransportConfig
+
+
+async def session(url: str, responses: int, transport: TransportConfig) -> tuple[int, list[float]]:
+    api = realtime_api.RealtimeAPI(url=url, transport=transport, log_events=False)
+    frames, first_audio = 0, []
+
+    def count(event):
+        nonlocal frames
+        frames += 1
+
+    api.on("server.*", count)
+    await api.connect()
+    for _ in range(responses):
+        start = time.perf_counter()
+        first = asyncio.create_task(api.wait_for_next("server.response.audio.delta", timeout=30))
+        done = asyncio.create_task(api.wait_for_next("server.response.done", timeout=30))
+        await api.send("response.create")
+        await first
+        first_audio.append(time.perf_counter() - start)
+        await done
+    await api.disconnect()
+    return frames, first_audio
+
+
+async def workload(tuned: bool, sessions: int, responses: int, deltas: int) -> dict:
+    transport = TransportConfig() if tuned else TransportConfig.library_defaults()
+    async with FakeRealtimeServer(audio_chunks=deltas, **transport.server_kwargs()) as server:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(session(server.url, responses, transport) for _ in range(sessions)))
+        elapsed = time.perf_counter() - start
+    first_audio = [latency for _, latencies in results for latency in latencies]
+    return {
+        "frames_per_s": sum(frames for frames, _ in results) / elapsed,
+        "first_audio_ms": statistics.median(first_audio) * 1000,
+    }
+
+
+def child(queue, use_uvloop: bool, tuned: bool, args: tuple):
+    queue.put(runtime.run(workload(tuned, *args), use_uvloop=use_uvloop))
+
+
+def main(sessions: int = 20, responses: int = 5, deltas: int = 200):
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{sessions} sessions x {responses} responses x {deltas} deltas")
+    for use_uvloop in (False, True):
+        if use_uvloop and runtime.uvloop is None:
+            print("uvloop not installed, skipping")
+            continue
+        for tuned in (False, True):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=child, args=(queue, use_uvloop, tuned, (sessions, responses, deltas)))
+            proc.start()
+            result = queue.get()
+            proc.join()
+            label = f"{runtime.loop_name(use_uvloop)} + {'realtime defaults' if tuned else 'library defaults'}"
+            print(
+                f"{label:>33}: {result['frames_per_s']:8.0f} frames/s, "
+                f"first audio p50 {result['first_audio_ms']:6.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,71 @@
+"""
+Send-side latency of `RealtimeAPI.send` with and without the send queue, against the local fake server.
+
+K concurrent senders each stream 20ms audio appends and occasionally a `response.cancel`; latency is measured from
+calling `send` until the frame has been handed to the websocket.
+
+    uv run python benchmarks/bench_send_queue.py [senders] [appends_per_sender]
+"""
+
+import asyncio
+import base64
+import statistics
+import sys
+import time
+
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.realtime_api import RealtimeAPI
+
+AUDIO = base64.b64encode(bytes(960)).decode("ascii")  # 20ms at 24kHz
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(url: str, send_queue: bool, senders: int, appends: int) -> dict:
+    api = RealtimeAPI(url=url, send_queue=send_queue)
+    api.log = lambda *args: True
+    await api.connect()
+    latencies, cancel_latencies = [], []
+
+    async def sender(idx: int):
+        for n in range(appends):
+            if n % 50 == 49:
+                event_name, data = "response.cancel", {}
+            else:
+                event_name, data = "input_audio_buffer.append", {"audio": AUDIO}
+            start = time.perf_counter()
+            await api.send(event_name, data, wait=send_queue)
+            elapsed = time.perf_counter() - start
+            (cancel_latencies if event_name == "response.cancel" else latencies).append(elapsed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(sender(idx) for idx in range(senders)))
+    await api.flush()
+    elapsed = time.perf_counter() - start
+    frames = api.send_queue.stats.frames if send_queue else len(latencies) + len(cancel_latencies)
+    await api.disconnect()
+    return {
+        "p50": statistics.median(latencies) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "cancel_p99": percentile(cancel_latencies, 99) * 1000,
+        "frames": frames,
+        "events_per_s": (len(latencies) + len(cancel_latencies)) / elapsed,
+    }
+
+
+async def main(senders: int = 50, appends: int = 200):
+    async with FakeRealtimeServer() as server:
+        for label, send_queue in [("direct", False), ("queued", True)]:
+            result = await run(server.url, send_queue, senders, appends)
+            print(
+                f"{label:>7}: p50 {result['p50']:6.2f} ms  p99 {result['p99']:6.2f} ms  "
+                f"cancel p99 {result['cancel_p99']:6.2f} ms  {result['frames']:6d} frames  "
+                f"{result['events_per_s']:8.0f} events/s"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:3])))
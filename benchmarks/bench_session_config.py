@@ -0,0 +1,81 @@
+"""
+Per-session cost of sending a large `session.update`: `send` with the dict vs `update_session` with a cached config.
+
+Only the client side is measured, frames are written to a list instead of a socket.
+
+    uv run python benchmarks/bench_session_config.py [sessions] [tools]
+"""
+
+import asyncio
+import sys
+import time
+
+from pyoai_realtime.realtime_api import RealtimeAPI
+from pyoai_realtime.session_config import SessionConfig
+
+
+class CaptureAPI(RealtimeAPI):
+    def __init__(self, **kwargs):
+        super().__init__(log_events=False, **kwargs)
+        self.written = 0
+
+    @property
+    def connected(self) -> bool:
+        return True
+
+    async def _write(self, data: str):
+        self.written += len(data)
+
+
+def session(tools: int) -> dict:
+    tool = {
+        "type": "function",
+        "description": "Look up a record in the customer database. " * 4,
+        "parameters": {
+            "type": "object",
+            "properties": {f"field_{idx}": {"type": "string", "description": "A filter value"} for idx in range(8)},
+            "required": ["field_0"],
+        },
+    }
+    return {
+        "modalities": ["text", "audio"],
+        "instructions": "You are a helpful, concise support agent. " * 100,
+        "voice": "alloy",
+        "input_audio_format": "pcm16",
+        "output_audio_format": "pcm16",
+        "turn_detection": {"type": "server_vad", "threshold": 0.5, "silence_duration_ms": 500},
+        "tools": [{**tool, "name": f"tool_{idx}"} for idx in range(tools)],
+        "temperature": 0.8,
+    }
+
+
+async def main(sessions: int = 2_000, tools: int = 20):
+    config_dict = session(tools)
+
+    api = CaptureAPI()
+    start = time.process_time()
+    for _ in range(sessions):
+        await api.send("session.update", {"session": config_dict})
+    baseline = time.process_time() - start
+
+    config = SessionConfig(config_dict)
+    cached = CaptureAPI()
+    start = time.process_time()
+    for _ in range(sessions):
+        cached.session_config = None  # every session starts from scratch
+        await cached.update_session(config)
+    elapsed = time.process_time() - start
+
+    print(f"{sessions} sessions, {len(config.encoded)} byte config")
+    print(f"          send(dict): {baseline / sessions * 1e6:7.1f} us/session")
+    print(f"update_session(cached): {elapsed / sessions * 1e6:7.1f} us/session ({baseline / elapsed:.1f}x)")
+
+    full, diff = CaptureAPI(), CaptureAPI()
+    await full.send("session.update", {"session": {**config_dict, "voice": "verse"}})
+    diff.session_config = config
+    await diff.update_session(config.replace(voice="verse"))
+    print(f"voice change: {full.written} bytes full, {diff.written} bytes as a diff")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:3])))
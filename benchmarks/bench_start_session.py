@@ -0,0 +1,76 @@
+"""
+Time to first audio of a new session: sequential bootstrap vs the pipelined `start_session`.
+
+Sequential waits for `session.created`, sends `session.update`, waits for `session.updated` and only then appends
+the first input audio and asks for a response. The fake server holds every event back by `latency_ms` to stand in
+for the network round trip.
+
+    uv run python benchmarks/bench_start_session.py [sessions] [latency_ms]
+"""
+
+import asyncio
+import base64
+import statistics
+import sys
+import time
+
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.realtime_api import RealtimeAPI
+
+SESSION = {"voice": "alloy", "instructions": "You are a helpful, concise support agent. " * 20}
+AUDIO = b"\x00\x01" * 4800  # 200ms of 24kHz PCM16
+
+
+async def first_audio(api: RealtimeAPI):
+    return await api.wait_for_next("server.response.audio.delta", timeout=10)
+
+
+async def sequential(url: str) -> float:
+    api = RealtimeAPI(url=url, log_events=False)
+    start = time.perf_counter()
+    created = asyncio.create_task(api.wait_for_next("server.session.created", timeout=10))
+    await asyncio.sleep(0)
+    await api.connect()
+    await created
+    updated = asyncio.create_task(api.wait_for_next("server.session.updated", timeout=10))
+    await asyncio.sleep(0)
+    await api.send("session.update", {"session": SESSION})
+    await updated
+    delta = asyncio.create_task(first_audio(api))
+    await asyncio.sleep(0)
+    await api.send("input_audio_buffer.append", {"audio": base64.b64encode(AUDIO).decode("ascii")})
+    await api.send("input_audio_buffer.commit")
+    await api.send("response.create")
+    await delta
+    elapsed = time.perf_counter() - start
+    await api.disconnect()
+    return elapsed
+
+
+async def pipelined(url: str) -> float:
+    api = RealtimeAPI(url=url, log_events=False)
+    start = time.perf_counter()
+    delta = asyncio.create_task(first_audio(api))
+    await asyncio.sleep(0)
+    await api.start_session(SESSION, initial_audio=AUDIO)
+    await api.background_tasks["initial_audio"]
+    await api.send("input_audio_buffer.commit")
+    await api.send("response.create")
+    await delta
+    elapsed = time.perf_counter() - start
+    await api.disconnect()
+    return elapsed
+
+
+async def main(sessions: int = 20, latency_ms: int = 50):
+    async with FakeRealtimeServer(latency=latency_ms / 1000) as server:
+        results = {}
+        for label, bootstrap in (("sequential", sequential), ("start_session", pipelined)):
+            results[label] = statistics.median([await bootstrap(server.url) for _ in range(sessions)])
+    print(f"{sessions} sessions, {latency_ms} ms server latency, median time to first audio")
+    for label, seconds in results.items():
+        print(f"{label:>14}: {seconds * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:3])))
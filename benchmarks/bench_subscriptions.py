@@ -0,0 +1,83 @@
+"""
+Dispatch cost over a long session with per-response subscribers, and the cost of removing a handler.
+
+Every response a short-lived widget subscribes to `server.response.text.delta` and is dropped afterwards. Leaked
+strong handlers pile up and every dispatch pays for them, weak or scoped subscriptions keep dispatch flat.
+
+    uv run python benchmarks/bench_subscriptions.py [responses] [dispatches]
+"""
+
+import asyncio
+import gc
+import sys
+import time
+
+from pyoai_realtime.event_handler import RealtimeEventHandler
+
+EVENT = "server.response.text.delta"
+
+
+class Widget:
+    def on_delta(self, event):
+        pass
+
+
+async def dispatch_us(handler: RealtimeEventHandler, dispatches: int) -> float:
+    event = {"type": "response.text.delta", "delta": "hi"}
+    start = time.perf_counter()
+    for _ in range(dispatches):
+        await handler.dispatch(EVENT, event)
+    return (time.perf_counter() - start) / dispatches * 1e6
+
+
+async def session(mode: str, responses: int, dispatches: int) -> list[float]:
+    handler = RealtimeEventHandler()
+    handler.on(EVENT, lambda event: None)  # the one long-lived subscriber
+    costs = [await dispatch_us(handler, dispatches)]
+    for response in range(1, responses + 1):
+        widget = Widget()
+        match mode:
+            case "leaked on()":
+                handler.on(EVENT, widget.on_delta)
+            case "weak":
+                handler.subscribe(EVENT, widget.on_delta, weak=True)
+            case "scoped":
+                with handler.subscribe(EVENT, widget.on_delta):
+                    pass
+        del widget
+        if response % (responses // 4) == 0:
+            gc.collect()
+            costs.append(await dispatch_us(handler, dispatches))
+    return costs
+
+
+def removal_us(handlers: int) -> tuple[float, float]:
+    callbacks = [Widget().on_delta for _ in range(handlers)]
+    handler = RealtimeEventHandler()
+    for callback in callbacks:
+        handler.on(EVENT, callback)
+    start = time.perf_counter()
+    for callback in reversed(callbacks):
+        handler.off(EVENT, callback)
+    by_callback = (time.perf_counter() - start) / handlers * 1e6
+
+    subs = [handler.subscribe(EVENT, callback) for callback in callbacks]
+    start = time.perf_counter()
+    for sub in reversed(subs):
+        sub.cancel()
+    by_handle = (time.perf_counter() - start) / handlers * 1e6
+    return by_callback, by_handle
+
+
+async def main(responses: int = 20_000, dispatches: int = 2_000):
+    print(f"dispatch us after 0, 1/4 .. all of {responses} responses")
+    for mode in ("leaked on()", "weak", "scoped"):
+        costs = await session(mode, responses, dispatches)
+        print(f"{mode:>12}: " + " ".join(f"{cost:8.2f}" for cost in costs))
+
+    by_callback, by_handle = removal_us(10_000)
+    print(f"removing 10000 handlers: off(callback) {by_callback:.2f} us, Subscription.cancel() {by_handle:.2f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:3])))
@@ -0,0 +1,55 @@
+"""
+Accumulating streamed transcript deltas: `str +=` on the item dict vs `TextBuilder`.
+
+A long response of N fragments, with a UI that reads after every R fragments (0 never reads until the end).
+
+    uv run python benchmarks/bench_text_builder.py [fragments] [read_every]
+"""
+
+import random
+import string
+import sys
+import time
+
+from pyoai_realtime.text_builder import TextBuilder
+
+
+def fragments(n: int) -> list[str]:
+    rng = random.Random(0)
+    return ["".join(rng.choices(string.ascii_lowercase + " ", k=rng.randint(1, 8))) for _ in range(n)]
+
+
+def with_str(parts: list[str], read_every: int) -> str:
+    formatted = {"transcript": ""}
+    shown = 0
+    for idx, part in enumerate(parts, 1):
+        formatted["transcript"] += part
+        if read_every and idx % read_every == 0:
+            # what the UI has not shown yet
+            _ = formatted["transcript"][shown:]
+            shown = len(formatted["transcript"])
+    return formatted["transcript"]
+
+
+def with_builder(parts: list[str], read_every: int) -> str:
+    formatted = {"transcript": TextBuilder()}
+    for idx, part in enumerate(parts, 1):
+        formatted["transcript"] += part
+        if read_every and idx % read_every == 0:
+            _ = formatted["transcript"].read_new()
+    return str(formatted["transcript"])
+
+
+def main(n: int = 100_000, read_every: int = 1):
+    parts = fragments(n)
+    print(f"{n} fragments, {sum(map(len, parts))} characters, read every {read_every or 'never'}")
+    for label, fn in (("str +=", with_str), ("TextBuilder", with_builder)):
+        start = time.perf_counter()
+        text = fn(parts, read_every)
+        elapsed = time.perf_counter() - start
+        assert text == "".join(parts)
+        print(f"{label:>12}: {elapsed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
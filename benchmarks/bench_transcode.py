@@ -0,0 +1,65 @@
+"""
+Real-time factor of the transcoding stage per core, api audio (PCM16 at 24 kHz) to a codec and back.
+
+Audio is streamed in 40 ms chunks, like audio deltas. RTF is cpu time over audio time, its inverse is how many
+streams one core keeps up with. Opus is included when opuslib is installed.
+
+    uv run python benchmarks/bench_transcode.py [seconds]
+"""
+
+import math
+import sys
+import time
+from array import array
+
+from pyoai_realtime.constants import DEFAULT_FREQUENCY
+from pyoai_realtime.transcode import MuLawCodec, OpusCodec, Transcoder
+
+CHUNK = DEFAULT_FREQUENCY * 40 // 1000 * 2
+
+
+def speech_like(seconds: int) -> bytes:
+    # a few harmonics with a slow envelope, enough to keep the codecs honest
+    rate = DEFAULT_FREQUENCY
+    samples = array("h")
+    for i in range(rate * seconds):
+        envelope = 0.5 + 0.5 * math.sin(2 * math.pi * 3 * i / rate)
+        tone = sum(math.sin(2 * math.pi * f * i / rate) / n for n, f in enumerate((180, 360, 720, 1440), 1))
+        samples.append(round(8000 * envelope * tone))
+    return samples.tobytes()
+
+
+def rtf(transcoder: Transcoder, pcm: bytes, seconds: int) -> tuple[float, float]:
+    start = time.process_time()
+    packets = [packet for i in range(0, len(pcm), CHUNK) for packet in transcoder.encode(pcm[i : i + CHUNK])]
+    packets += transcoder.flush()
+    encoded = time.process_time() - start
+
+    start = time.process_time()
+    for packet in packets:
+        transcoder.decode(packet)
+    decoded = time.process_time() - start
+    return encoded / seconds, decoded / seconds
+
+
+def main(seconds: int = 10):
+    pcm = speech_like(seconds)
+    codecs = {"μ-law numpy": lambda: MuLawCodec(), "μ-law array": lambda: MuLawCodec(use_numpy=False)}
+    try:
+        OpusCodec()
+        codecs["opus 48k"] = lambda: OpusCodec()
+    except ImportError:
+        print("opuslib not installed, skipping opus")
+
+    print(f"{seconds} s of 24 kHz audio in 40 ms chunks, real-time factor per core (streams per core)")
+    for label, codec in codecs.items():
+        use_numpy = "array" not in label
+        encode, decode = rtf(Transcoder(codec(), use_numpy=use_numpy), pcm, seconds)
+        print(
+            f"{label:>12}: encode {encode:.4f} ({1 / encode:7.0f}), decode {decode:.4f} ({1 / decode:7.0f}),"
+            f" both {encode + decode:.4f} ({1 / (encode + decode):7.0f})"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,75 @@
+"""
+CPU and latency cost of websocket transport settings on the local fake-server workload.
+
+Each configuration is used on both ends: K sessions stream A input audio appends (40ms each) upstream and then request
+a response of D audio deltas. Client and server share the process, so the CPU time covers both sides of every frame.
+
+    uv run python benchmarks/bench_transport.py [sessions] [appends] [deltas]
+"""
+
+import asyncio
+import base64
+import random
+import statistics
+import sys
+import time
+
+from pyoai_realtime import runtime
+from pyoai_realtime.constants import DEFAULT_FREQUENCY
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.realtime_api import RealtimeAPI
+from pyoai_realtime.transport import TransportConfig
+
+CONFIGS = {
+    "library defaults": TransportConfig.library_defaults(),
+    "no compression": TransportConfig(),
+    "deflate both, level 1": TransportConfig(compress_outbound=True, compress_inbound=True),
+    "deflate inbound only": TransportConfig(compress_inbound=True),
+    "deflate outbound only": TransportConfig(compress_outbound=True),
+}
+
+AUDIO = base64.b64encode(random.Random(1).randbytes(DEFAULT_FREQUENCY * 40 // 1000 * 2)).decode("ascii")
+
+
+async def session(url: str, transport: TransportConfig, appends: int) -> float:
+    api = RealtimeAPI(url=url, transport=transport, log_events=False)
+    await api.connect()
+    for _ in range(appends):
+        await api.send("input_audio_buffer.append", {"audio": AUDIO})
+    start = time.perf_counter()
+    first = asyncio.create_task(api.wait_for_next("server.response.audio.delta", timeout=60))
+    done = asyncio.create_task(api.wait_for_next("server.response.done", timeout=60))
+    await api.send("response.create")
+    await first
+    first_audio = time.perf_counter() - start
+    await done
+    await api.disconnect()
+    return first_audio
+
+
+async def workload(transport: TransportConfig, sessions: int, appends: int, deltas: int) -> dict:
+    async with FakeRealtimeServer(audio_chunks=deltas, **transport.server_kwargs()) as server:
+        cpu, start = time.process_time(), time.perf_counter()
+        latencies = await asyncio.gather(*(session(server.url, transport, appends) for _ in range(sessions)))
+        elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu
+    frames = sessions * (appends + deltas)
+    return {
+        "frames_per_s": frames / elapsed,
+        "cpu_us_per_frame": cpu / frames * 1e6,
+        "first_audio_ms": statistics.median(latencies) * 1000,
+    }
+
+
+def main(sessions: int = 10, appends: int = 100, deltas: int = 200):
+    print(f"{sessions} sessions x ({appends} appends + {deltas} deltas), loop: {runtime.loop_name()}")
+    for label, transport in CONFIGS.items():
+        result = runtime.run(workload(transport, sessions, appends, deltas))
+        print(
+            f"{label:>22}: {result['frames_per_s']:8.0f} frames/s, "
+            f"{result['cpu_us_per_frame']:6.1f} us cpu/frame, "
+            f"first audio p50 {result['first_audio_ms']:6.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,54 @@
+"""
+CPU cost of the client-side VAD per second of streamed audio.
+
+    uv run python benchmarks/bench_vad.py [seconds]
+"""
+
+import math
+import random
+import sys
+import time
+from array import array
+
+from pyoai_realtime.vad import VoiceActivityDetector, np
+
+SAMPLE_RATE = 24_000
+CHUNK_MS = 100
+
+
+def synthetic_stream(seconds: int) -> bytes:
+    """Alternate 2s of voiced tone with 3s of low level noise."""
+    rng = random.Random(0)
+    samples = array("h")
+    for start in range(0, seconds * SAMPLE_RATE):
+        t = start / SAMPLE_RATE
+        if t % 5 < 2:
+            samples.append(int(8000 * math.sin(2 * math.pi * 180 * t)))
+        else:
+            samples.append(rng.randint(-40, 40))
+    return samples.tobytes()
+
+
+def run(pcm: bytes, use_numpy: bool) -> tuple[float, VoiceActivityDetector]:
+    vad = VoiceActivityDetector(use_numpy=use_numpy)
+    chunk = SAMPLE_RATE * CHUNK_MS // 1000 * 2
+    start = time.process_time()
+    for offset in range(0, len(pcm), chunk):
+        vad.process(pcm[offset : offset + chunk])
+    vad.flush()
+    return time.process_time() - start, vad
+
+
+def main(seconds: int = 60):
+    pcm = synthetic_stream(seconds)
+    backends = [("numpy", True), ("array", False)] if np is not None else [("array", False)]
+    for name, use_numpy in backends:
+        elapsed, vad = run(pcm, use_numpy)
+        print(
+            f"{name:>6}: {elapsed / seconds * 1000:7.3f} ms CPU per stream-second, "
+            f"dropped {vad.stats.dropped_ratio:.0%} of frames, {vad.stats.commits} commits"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 60)
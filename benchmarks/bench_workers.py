@@ -0,0 +1,64 @@
+"""
+Aggregate inbound frame throughput of `WorkerSupervisor` with 1..N worker processes.
+
+The fake server runs in its own process and streams audio deltas as fast as it can, every worker decodes and
+dispatches them. Near linear scaling needs at least N + 1 free cores.
+
+    uv run python benchmarks/bench_workers.py [max_workers] [sessions] [deltas_per_session]
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.realtime_api import RealtimeAPI
+from pyoai_realtime.workers import WorkerSupervisor
+
+
+async def run_response(api: RealtimeAPI, params: dict):
+    done = asyncio.create_task(api.wait_for_next("server.response.done", timeout=120))
+    await api.send("response.create")
+    await done
+
+
+def serve(port_queue, deltas: int):
+    async def main():
+        async with FakeRealtimeServer(audio_chunks=deltas) as server:
+            port_queue.put(server.port)
+            await asyncio.Future()
+
+    asyncio.run(main())
+
+
+async def bench(url: str, workers: int, sessions: int) -> tuple[float, int]:
+    supervisor = WorkerSupervisor(run_response, workers=workers, url=url, log_events=False)
+    await supervisor.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(supervisor.open_session(f"session-{idx}") for idx in range(sessions)))
+    while (metrics := await supervisor.metrics())["totals"]["closed"] < sessions:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    await supervisor.stop(drain_timeout=1)
+    return elapsed, metrics["totals"]["frames_received"]
+
+
+async def main(max_workers: int = os.cpu_count(), sessions: int = 32, deltas: int = 500):
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(port_queue, deltas), daemon=True)
+    server.start()
+    url = f"ws://localhost:{port_queue.get()}"
+
+    print(f"{os.cpu_count()} cores, {sessions} sessions x {deltas} audio deltas")
+    workers = 1
+    while workers <= max_workers:
+        elapsed, frames = await bench(url, workers, sessions)
+        print(f"{workers:3d} workers: {frames / elapsed:9.0f} frames/s ({elapsed:.2f}s)")
+        workers *= 2
+    server.kill()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:4])))
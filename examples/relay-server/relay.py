@@ -1,8 +1,7 @@
-import asyncio
 import json
 import os
 
-from pyoai_realtime import log
+from pyoai_realtime import log, runtime
 from pyoai_realtime.realtime_conversation import RealtimeRelay
 
 
@@ -34,11 +33,11 @@ async def relay_handler(websocket):
 
 async def main():
     hostname, port = "localhost", int(os.environ.get("RELAY_SERVER_PORT", 8081))
-    log.log(f"server @ wss://{hostname}:{port}")
+    log.log(f"server @ wss://{hostname}:{port} ({runtime.loop_name()})")
     relay_server = RealtimeRelay(hostname=hostname, port=port)
 
     await relay_server.run(relay_handler)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    runtime.run(main())
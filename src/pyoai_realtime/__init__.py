@@ -1,5 +1,21 @@
-from pyoai_realtime.event_handler import RealtimeEventHandler
+import importlib
 
 __all__ = [
     "RealtimeEventHandler",
 ]
+
+# exports are imported on first access so `import pyoai_realtime.realtime_events` does not pull in asyncio
+_LAZY = {
+    "RealtimeEventHandler": "pyoai_realtime.event_handler",
+}
+
+
+def __getattr__(name: str):
+    if module := _LAZY.get(name):
+        value = globals()[name] = getattr(importlib.import_module(module), name)
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *__all__])
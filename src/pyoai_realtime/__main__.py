@@ -0,0 +1,5 @@
+import sys
+
+from pyoai_realtime.cli import main
+
+sys.exit(main())
@@ -0,0 +1,294 @@
+"""Audio format conversion and resampling for the realtime api.
+
+The api only accepts (and produces) PCM16 little-endian mono audio at `DEFAULT_FREQUENCY` (24 kHz). Everything here is
+vectorized with NumPy when it is installed and falls back to the `array` module otherwise.
+"""
+
+import base64
+import math
+from array import array
+from typing import Sequence
+
+from pyoai_realtime.constants import DEFAULT_FREQUENCY
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, fall back to the array module
+    np = None
+
+_PCM16_SCALE = 32768.0
+_SAMPLE_WIDTH = {"s16": 2, "f32": 4}
+
+
+def _as_float(samples, use_numpy: bool):
+    """Return `samples` as a float32 ndarray (NumPy) or `array("f")` (fallback)."""
+    if use_numpy:
+        if isinstance(samples, (bytes, bytearray, memoryview)):
+            return np.frombuffer(samples, dtype="<f4")
+        return np.asarray(samples, dtype=np.float32)
+    if isinstance(samples, (bytes, bytearray, memoryview)):
+        return array("f", bytes(samples))
+    return samples if isinstance(samples, array) and samples.typecode == "f" else array("f", samples)
+
+
+def float32_to_pcm16(samples: bytes | Sequence[float], use_numpy: bool = True) -> bytes:
+    """
+    Convert float samples in [-1.0, 1.0] to PCM16 bytes, rounding and clipping to the int16 range.
+
+    Args:
+        samples (bytes | Sequence[float]): Raw little-endian float32 bytes, a float sequence or an ndarray.
+        use_numpy (bool, optional): Use the vectorized NumPy path if available. Defaults to True.
+
+    Returns:
+        bytes: PCM16 little-endian audio.
+    """
+    if use_numpy and np is not None:
+        data = _as_float(samples, use_numpy=True)
+        return np.clip(np.rint(data * _PCM16_SCALE), -32768, 32767).astype("<i2").tobytes()
+
+    data = _as_float(samples, use_numpy=False)
+    return array("h", [max(-32768, min(32767, round(s * _PCM16_SCALE))) for s in data]).tobytes()
+
+
+def pcm16_to_float32(pcm: bytes, use_numpy: bool = True) -> bytes:
+    """
+    Convert PCM16 little-endian bytes to float32 bytes in [-1.0, 1.0].
+
+    Args:
+        pcm (bytes): PCM16 little-endian audio.
+        use_numpy (bool, optional): Use the vectorized NumPy path if available. Defaults to True.
+
+    Returns:
+        bytes: Little-endian float32 audio.
+    """
+    if use_numpy and np is not None:
+        return (np.frombuffer(pcm, dtype="<i2").astype(np.float32) / _PCM16_SCALE).astype("<f4").tobytes()
+    return array("f", [s / _PCM16_SCALE for s in array("h", pcm)]).tobytes()
+
+
+def downmix(samples, channels: int, use_numpy: bool = True):
+    """
+    Average interleaved multi-channel samples down to mono.
+
+    Args:
+        samples: Interleaved float samples (ndarray, `array("f")` or sequence), length a multiple of `channels`.
+        channels (int): Number of interleaved channels.
+        use_numpy (bool, optional): Use the vectorized NumPy path if available. Defaults to True.
+
+    Returns:
+        The mono samples, an ndarray on the NumPy path and `array("f")` otherwise.
+    """
+    use_numpy = use_numpy and np is not None
+    data = _as_float(samples, use_numpy)
+    if channels == 1:
+        return data
+    if use_numpy:
+        return data.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    return array("f", [sum(data[i : i + channels]) / channels for i in range(0, len(data), channels)])
+
+
+def _kaiser(n: int, beta: float) -> list[float]:
+    def i0(x: float) -> float:
+        # power series for the zeroth order modified bessel function
+        total, term, k = 1.0, 1.0, 1
+        while term > 1e-12 * total:
+            term *= (x / (2 * k)) ** 2
+            total += term
+            k += 1
+        return total
+
+    denom = i0(beta)
+    return [i0(beta * math.sqrt(1 - (2 * i / (n - 1) - 1) ** 2)) / denom for i in range(n)]
+
+
+class Resampler:
+    """
+    Streaming polyphase resampler.
+
+    The rate change is reduced to `up / down` and a windowed-sinc low pass filter (at the upsampled rate) is split into
+    `up` phases, so every output sample costs a single `taps` long dot product. Filter history and the fractional
+    position are carried between calls so chunks can be fed as they arrive.
+    """
+
+    def __init__(
+        self,
+        src_rate: int,
+        dst_rate: int = DEFAULT_FREQUENCY,
+        zero_crossings: int = 16,
+        beta: float = 8.0,
+        use_numpy: bool = True,
+    ):
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self.use_numpy = use_numpy and np is not None
+
+        gcd = math.gcd(src_rate, dst_rate)
+        self.up, self.down = dst_rate // gcd, src_rate // gcd
+        self.passthrough = self.up == self.down
+
+        factor = max(self.up, self.down)
+        self.taps = math.ceil(2 * zero_crossings * factor / self.up)
+        length = self.taps * self.up
+        cutoff = 0.5 / factor
+        center = (length - 1) / 2
+        window = _kaiser(length, beta)
+        kernel = [
+            self.up * 2 * cutoff * (math.sin(x) / x if (x := 2 * math.pi * cutoff * (i - center)) else 1.0) * window[i]
+            for i in range(length)
+        ]
+        # phases[p][m] multiplies the m-th sample of the (oldest first) input window
+        self._phases = [[kernel[p + (self.taps - 1 - m) * self.up] for m in range(self.taps)] for p in range(self.up)]
+        if self.use_numpy:
+            self._phases = np.asarray(self._phases, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        """Drop the filter history, the next chunk starts a new stream."""
+        history = self.taps - 1
+        self._history = np.zeros(history, dtype=np.float32) if self.use_numpy else array("f", bytes(4 * history))
+        self._position = 0
+
+    def process(self, samples):
+        """
+        Resample a chunk of mono float samples.
+
+        Args:
+            samples: Float samples (ndarray, `array("f")`, float32 bytes or sequence).
+
+        Returns:
+            The resampled chunk, an ndarray on the NumPy path and `array("f")` otherwise.
+        """
+        data = _as_float(samples, self.use_numpy)
+        if self.passthrough:
+            return data
+
+        history = self.taps - 1
+        if self.use_numpy:
+            buf = np.concatenate((self._history, data))
+        else:
+            buf = self._history + data
+
+        # positions are in upsampled units relative to the first new sample
+        available = len(data) * self.up
+        count = max(0, -(-(available - self._position) // self.down))
+        stop = self._position + count * self.down
+
+        if self.use_numpy and not count:
+            # also avoids a sliding window over less than `taps` samples
+            out = np.zeros(0, dtype=np.float32)
+        elif self.use_numpy:
+            positions = np.arange(self._position, stop, self.down)
+            windows = np.lib.stride_tricks.sliding_window_view(buf, self.taps)
+            out = np.einsum("ij,ij->i", windows[positions // self.up], self._phases[positions % self.up])
+            out = out.astype(np.float32, copy=False)
+        else:
+            out = array("f")
+            for position in range(self._position, stop, self.down):
+                start, phase = divmod(position, self.up)
+                coeffs = self._phases[phase]
+                out.append(sum(c * s for c, s in zip(coeffs, buf[start : start + self.taps])))
+
+        self._position += count * self.down - available
+        self._history = buf[len(buf) - history :] if history else buf[:0]
+        return out
+
+    def flush(self):
+        """Push the samples still held in the filter through and reset the stream."""
+        if self.passthrough:
+            return self.process(b"")
+        zeros = self.taps // 2
+        out = self.process(np.zeros(zeros, dtype=np.float32) if self.use_numpy else array("f", bytes(4 * zeros)))
+        self.reset()
+        return out
+
+
+class AudioConverter:
+    """
+    Chunked converter from arbitrary PCM input to the api format (PCM16 mono at `DEFAULT_FREQUENCY`).
+
+    Chunks do not need to be aligned to whole samples or frames, leftovers are carried to the next call.
+
+        converter = AudioConverter(sample_rate=44_100, channels=2, sample_format="f32")
+        for chunk in source:
+            await api.send("input_audio_buffer.append", {"audio": converter.convert_base64(chunk)})
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        channels: int = 1,
+        sample_format: str = "s16",
+        dst_rate: int = DEFAULT_FREQUENCY,
+        use_numpy: bool = True,
+    ):
+        if sample_format not in _SAMPLE_WIDTH:
+            raise ValueError(f"Unsupported sample format {sample_format}, expected one of {list(_SAMPLE_WIDTH)}")
+
+        self.channels = channels
+        self.sample_format = sample_format
+        self.use_numpy = use_numpy and np is not None
+        self.resampler = Resampler(sample_rate, dst_rate, use_numpy=self.use_numpy)
+        self._frame_bytes = _SAMPLE_WIDTH[sample_format] * channels
+        self._remainder = b""
+
+    def _to_float(self, data: bytes):
+        if self.sample_format == "f32":
+            return _as_float(data, self.use_numpy)
+        if self.use_numpy:
+            return np.frombuffer(data, dtype="<i2").astype(np.float32) / np.float32(_PCM16_SCALE)
+        return array("f", [s / _PCM16_SCALE for s in array("h", data)])
+
+    def convert(self, data: bytes) -> bytes:
+        """
+        Convert a chunk of raw input audio.
+
+        Args:
+            data (bytes): Interleaved little-endian samples in `sample_format`.
+
+        Returns:
+            bytes: PCM16 little-endian mono audio at the destination rate.
+        """
+        data = self._remainder + data
+        usable = len(data) - len(data) % self._frame_bytes
+        self._remainder = data[usable:]
+
+        mono = downmix(self._to_float(data[:usable]), self.channels, self.use_numpy)
+        return float32_to_pcm16(self.resampler.process(mono), self.use_numpy)
+
+    def convert_base64(self, data: bytes) -> str:
+        """Convert a chunk and encode it for `input_audio_buffer.append`."""
+        return base64.b64encode(self.convert(data)).decode("ascii")
+
+    def flush(self) -> bytes:
+        """Return the audio still held in the resampler and reset the converter."""
+        self._remainder = b""
+        return float32_to_pcm16(self.resampler.flush(), self.use_numpy)
+
+
+def to_pcm16(
+    data: bytes,
+    sample_rate: int,
+    channels: int = 1,
+    sample_format: str = "s16",
+    chunk_size: int = 1 << 16,
+    use_numpy: bool = True,
+) -> bytes:
+    """
+    Convert a complete clip to the api format, working through it in chunks.
+
+    Args:
+        data (bytes): Interleaved little-endian samples in `sample_format` ("s16" or "f32").
+        sample_rate (int): Sample rate of `data`.
+        channels (int, optional): Number of interleaved channels. Defaults to 1.
+        sample_format (str, optional): The input sample format. Defaults to "s16".
+        chunk_size (int, optional): Bytes converted per step, bounds the temporary memory. Defaults to 64KiB.
+        use_numpy (bool, optional): Use the vectorized NumPy path if available. Defaults to True.
+
+    Returns:
+        bytes: PCM16 little-endian mono audio at `DEFAULT_FREQUENCY`.
+    """
+    converter = AudioConverter(sample_rate, channels, sample_format, use_numpy=use_numpy)
+    view = memoryview(data)
+    out = [converter.convert(bytes(view[i : i + chunk_size])) for i in range(0, len(view), chunk_size)]
+    out.append(converter.flush())
+    return b"".join(out)
@@ -0,0 +1,91 @@
+"""
+Cheap handling of `response.audio.delta` frames.
+
+Audio deltas are most of the frames (and nearly all of the bytes) a session receives. Instead of a full `json.loads`,
+the base64 `delta` is located by a substring search and sliced out, only the small remainder is parsed, and the audio
+is decoded once straight from the raw frame.
+"""
+
+import binascii
+import json
+import re
+from dataclasses import dataclass
+
+from pyoai_realtime.realtime_events import response_events
+
+AUDIO_DELTA_TYPE = response_events.AudioDelta.type
+
+# base64 never contains quotes or backslashes, so the value ends at the next quote
+_DELTA = re.compile(rb'"delta"\s*:\s*"')
+# the api sends compact json, a plain substring search is several times cheaper than the regex over a whole frame
+_COMPACT_DELTA = b'"delta":"'
+
+
+@dataclass(slots=True)
+class AudioDelta:
+    """
+    A decoded `response.audio.delta`, what audio sinks receive.
+
+    Attributes:
+        item_id (str): The assistant item the audio belongs to.
+        pcm (bytes): PCM16 mono audio at the session sample rate.
+        response_id (str): The response the item belongs to.
+        output_index (int): Index of the item in the response output.
+        content_index (int): Index of the content part in the item.
+        event_id (str): Id of the server event.
+    """
+
+    item_id: str
+    pcm: bytes
+    response_id: str = None
+    output_index: int = 0
+    content_index: int = 0
+    event_id: str = None
+
+    @classmethod
+    def from_header(cls, header: dict, pcm: bytes) -> "AudioDelta":
+        return cls(
+            header.get("item_id"),
+            pcm,
+            header.get("response_id"),
+            header.get("output_index", 0),
+            header.get("content_index", 0),
+            header.get("event_id"),
+        )
+
+
+def split_audio_delta(message: bytes) -> tuple[dict, memoryview] | None:
+    """
+    Split a raw `response.audio.delta` frame into its fields and the undecoded base64 audio.
+
+    Args:
+        message (bytes): The UTF-8 frame as received, e.g. from `recv(decode=False)`.
+
+    Returns:
+        tuple[dict, memoryview] | None: The event without `delta`, and the base64 audio as a view into `message`.
+            None if `message` is not an audio delta frame.
+    """
+    if b"response.audio.delta" not in message:
+        return None
+    if (key := message.find(_COMPACT_DELTA)) >= 0:
+        start = key + len(_COMPACT_DELTA)
+    elif (delta_match := _DELTA.search(message)) is not None:
+        key, start = delta_match.start(), delta_match.end()
+    else:
+        return None
+    if (end := message.find(b'"', start)) < 0:
+        return None
+    try:
+        # json.loads would detect the encoding of bytes first
+        header = json.loads(str(message[:key] + b'"delta":null' + message[end + 1 :], "utf-8"))
+    except ValueError:
+        return None
+    if header.get("type") != AUDIO_DELTA_TYPE:
+        # the type matched inside some other string
+        return None
+    return header, memoryview(message)[start:end]
+
+
+def decode_audio(delta: memoryview | bytes | str) -> bytes:
+    """Decode base64 audio to PCM bytes."""
+    return binascii.a2b_base64(delta)
@@ -0,0 +1,115 @@
+"""
+Binary audio frames between a `RealtimeRelay` and its clients (e.g. browsers).
+
+Base64 audio in json is a third larger than the PCM and has to be decoded on both ends. With `binary_audio` enabled
+the relay sends every upstream `response.audio.delta` as a binary websocket frame instead: a 6 byte little endian
+header followed by the PCM16 audio.
+
+    offset  size  field
+    0       2     item index, announced by a `relay.audio.item` text event before the item's first frame
+    2       4     sequence of the frame within the item, from 0
+
+The announcement carries what the header leaves out:
+
+    {"type": "relay.audio.item", "index": 0, "item_id": "item_...", "response_id": "resp_...",
+     "output_index": 0, "content_index": 0, "codec": "pcm16"}
+
+Indices are per connection and wrap around after 65535 items. In the other direction every binary frame a client
+sends is taken as PCM16 input audio and forwarded upstream as an `input_audio_buffer.append`. Text frames pass
+through unchanged both ways.
+
+With a `Transcoder` the frames carry one codec packet each instead of PCM16 (`codec` names it), in both directions.
+"""
+
+import base64
+import binascii
+import json
+import struct
+from typing import TYPE_CHECKING
+
+from pyoai_realtime.utils import generate_id
+
+if TYPE_CHECKING:
+    from pyoai_realtime.transcode import Transcoder
+
+HEADER = struct.Struct("<HI")
+AUDIO_ITEM_TYPE = "relay.audio.item"
+MAX_ITEMS = 0x10000
+
+
+class BinaryAudioEncoder:
+    """Turns the upstream audio deltas of one connection into announcements and binary frames."""
+
+    def __init__(self, transcoder: "Transcoder" = None):
+        """
+        Args:
+            transcoder (Transcoder, optional): Encodes the audio of every frame. Defaults to None, PCM16.
+        """
+        self.transcoder = transcoder
+        self.codec = transcoder.codec.name if transcoder is not None else "pcm16"
+        # item id -> [index, next sequence], and the item currently owning each index
+        self.items: dict[str, list[int]] = {}
+        self._owners: dict[int, str] = {}
+        self._next_index = 0
+
+    def encode(self, header: dict, delta: memoryview | bytes | str) -> tuple[str | None, list[bytes]]:
+        """
+        Encode a `response.audio.delta` split by `split_audio_delta`.
+
+        Args:
+            header (dict): The event without its `delta`.
+            delta (memoryview | bytes | str): The base64 audio.
+
+        Returns:
+            tuple[str | None, list[bytes]]: The `relay.audio.item` announcement to send first if this is the first
+                frame of the item, and the binary frames, one without a transcoder.
+        """
+        item_id = header.get("item_id")
+        announcement = None
+        if (state := self.items.get(item_id)) is None:
+            index = self._next_index
+            self._next_index = (index + 1) % MAX_ITEMS
+            # after wrapping around the index is taken from the item that had it
+            if (previous := self._owners.get(index)) is not None:
+                del self.items[previous]
+            self._owners[index] = item_id
+            state = self.items[item_id] = [index, 0]
+            announcement = json.dumps(
+                {
+                    "type": AUDIO_ITEM_TYPE,
+                    "index": index,
+                    "item_id": item_id,
+                    "response_id": header.get("response_id"),
+                    "output_index": header.get("output_index", 0),
+                    "content_index": header.get("content_index", 0),
+                    "codec": self.codec,
+                }
+            )
+        pcm = binascii.a2b_base64(delta)
+        if self.transcoder is None:
+            return announcement, [self._frame(state, pcm)]
+        return announcement, [self._frame(state, packet) for packet in self.transcoder.encode(pcm)]
+
+    def finish(self, item_id: str) -> list[bytes]:
+        """Frames for the audio the transcoder still holds once the item's audio is done."""
+        if self.transcoder is None or (state := self.items.get(item_id)) is None:
+            return []
+        return [self._frame(state, packet) for packet in self.transcoder.flush()]
+
+    @staticmethod
+    def _frame(state: list[int], payload: bytes) -> bytes:
+        index, sequence = state
+        state[1] = sequence + 1
+        return HEADER.pack(index, sequence) + payload
+
+
+def decode_audio_frame(frame: bytes) -> tuple[int, int, memoryview]:
+    """Split a binary audio frame into item index, sequence and a view of the audio."""
+    index, sequence = HEADER.unpack_from(frame)
+    return index, sequence, memoryview(frame)[HEADER.size :]
+
+
+def audio_append_frame(pcm: bytes) -> str:
+    """The `input_audio_buffer.append` frame for binary PCM16 received from a client."""
+    audio = base64.b64encode(pcm).decode("ascii")
+    return f'{{"event_id":"{generate_id("evt_")}","type":"input_audio_buffer.append","audio":"{audio}"}}'
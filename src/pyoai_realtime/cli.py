@@ -0,0 +1,356 @@
+"""Command line interface.
+
+`pyoai-realtime bench` load tests a relay (or anything speaking the realtime protocol) with simulated clients:
+
+    pyoai-realtime bench --clients 50 --responses 5  # against an in-process FakeRealtimeServer
+    pyoai-realtime bench --clients 50 --relay  # through an in-process RealtimeRelay in front of it
+    pyoai-realtime bench --url ws://relay-1:8081 --api-key TOKEN --audio speech.wav --realtime --ramp 10
+
+Every client connects with `start_session`, then for each response streams its input audio (`--audio`, or a
+synthetic tone), commits it, asks for a response and consumes the response audio through the audio fast path. The
+report covers connection setup time, time to the first audio delta and to `response.done` as percentiles, audio
+throughput in both directions, and the CPU time and peak RSS of this process, in-process servers included.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import math
+import sys
+import time
+import wave
+from array import array
+from collections import Counter
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from typing import Any, Sequence
+
+from pyoai_realtime.constants import DEFAULT_FREQUENCY, DEFAULT_MODEL
+from pyoai_realtime.utils import percentile as _percentile
+
+_BYTES_PER_SECOND = DEFAULT_FREQUENCY * 2
+
+
+@dataclass
+class BenchStats:
+    """
+    Results of a `bench` run, times in seconds and audio in bytes of PCM16.
+
+    Attributes:
+        clients (int): Simulated clients.
+        failed (int): Clients that hit an error, by class name in `errors`.
+        responses (int): Responses completed across all clients.
+        audio_sent (int): Input audio appended.
+        audio_received (int): Response audio received.
+        elapsed (float): Wall time from the first connection to the last client done.
+        cpu (float): CPU time of the process over the run.
+        max_rss (int): Peak resident set size of the process in bytes, None where unavailable.
+        setups (list[float]): Connection setup times, handshake to `session.created`.
+        first_audio (list[float]): Times from `response.create` to the first audio delta.
+        durations (list[float]): Times from `response.create` to `response.done`.
+        errors (Counter[str]): Failed clients by exception class.
+    """
+
+    clients: int = 0
+    failed: int = 0
+    responses: int = 0
+    audio_sent: int = 0
+    audio_received: int = 0
+    elapsed: float = 0.0
+    cpu: float = 0.0
+    max_rss: int = None
+    setups: list = field(default_factory=list)
+    first_audio: list = field(default_factory=list)
+    durations: list = field(default_factory=list)
+    errors: Counter = field(default_factory=Counter)
+
+    def setup_percentile(self, percentile: float) -> float:
+        """Connection setup time in seconds at `percentile` (0-100)."""
+        return _percentile(self.setups, percentile)
+
+    def first_audio_percentile(self, percentile: float) -> float:
+        """Time to the first audio delta in seconds at `percentile` (0-100)."""
+        return _percentile(self.first_audio, percentile)
+
+    def duration_percentile(self, percentile: float) -> float:
+        """Time to `response.done` in seconds at `percentile` (0-100)."""
+        return _percentile(self.durations, percentile)
+
+    def to_dict(self) -> dict:
+        """The counters and percentiles (p50, p90, p99, max in ms) as plain json types."""
+        summary = {
+            key: getattr(self, key)
+            for key in ("clients", "failed", "responses", "audio_sent", "audio_received", "elapsed", "cpu", "max_rss")
+        }
+        summary["errors"] = dict(self.errors)
+        for name in ("setup", "first_audio", "duration"):
+            percentile = getattr(self, f"{name}_percentile")
+            summary[f"{name}_ms"] = {f"p{p}": round(percentile(p) * 1e3, 3) for p in (50, 90, 99)}
+            summary[f"{name}_ms"]["max"] = round(percentile(100) * 1e3, 3)
+        return summary
+
+    def report(self) -> str:
+        elapsed = self.elapsed or math.inf
+        lines = [
+            f"clients      {self.clients} ({self.failed} failed{', ' if self.errors else ''}"
+            + ", ".join(f"{count} {name}" for name, count in self.errors.items())
+            + ")",
+            f"responses    {self.responses} in {self.elapsed:.2f} s, {self.responses / elapsed:.1f} per second",
+        ]
+        for label, size in (("audio out", self.audio_sent), ("audio in", self.audio_received)):
+            seconds = size / _BYTES_PER_SECOND
+            lines.append(
+                f"{label:<12} {seconds:.1f} s of audio, {seconds / elapsed:.1f} x realtime, "
+                f"{size / 2**20 / elapsed:.2f} MiB/s"
+            )
+        lines.append(f"{'':<12} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+        for label, name in (("setup", "setup"), ("first audio", "first_audio"), ("response", "duration")):
+            percentile = getattr(self, f"{name}_percentile")
+            lines.append(f"{label:<12}" + "".join(f" {percentile(p) * 1e3:6.1f} ms" for p in (50, 90, 99, 100)))
+        lines.append(f"cpu          {self.cpu:.2f} s, {self.cpu / elapsed * 100:.0f}% of one core")
+        if self.max_rss is not None:
+            lines.append(f"peak rss     {self.max_rss / 2**20:.1f} MiB")
+        return "\n".join(lines)
+
+
+def _peak_rss() -> int | None:
+    """Peak resident set size of the process in bytes, None without the `resource` module (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def synthetic_audio(seconds: float, frequency: float = 440.0) -> bytes:
+    """A sine tone at half scale as api PCM16."""
+    step = 2 * math.pi * frequency / DEFAULT_FREQUENCY
+    samples = array("h", (int(16384 * math.sin(i * step)) for i in range(int(seconds * DEFAULT_FREQUENCY))))
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples.tobytes()
+
+
+def load_audio(path: str) -> bytes:
+    """
+    Read recorded input audio as api PCM16.
+
+    Args:
+        path (str): A 16 bit wav file in any rate and channel count, anything else is taken as raw PCM16 mono at
+            `DEFAULT_FREQUENCY`.
+    """
+    if not path.lower().endswith(".wav"):
+        with open(path, "rb") as file:
+            return file.read()
+
+    from pyoai_realtime.audio import to_pcm16
+
+    with wave.open(path, "rb") as file:
+        if file.getsampwidth() != 2:
+            raise ValueError(f"{path} has {file.getsampwidth() * 8} bit samples, expected 16")
+        rate, channels = file.getframerate(), file.getnchannels()
+        data = file.readframes(file.getnframes())
+    if rate == DEFAULT_FREQUENCY and channels == 1:
+        return data
+    return to_pcm16(data, rate, channels)
+
+
+async def run_client(
+    url: str,
+    audio: list[tuple[str, int]],
+    stats: BenchStats,
+    responses: int = 1,
+    api_key: str = None,
+    model: str = DEFAULT_MODEL,
+    realtime: bool = False,
+    timeout: float = 30.0,
+):
+    """
+    One simulated client, results go into `stats`.
+
+    Args:
+        url (str): The websocket url to connect to.
+        audio (list[tuple[str, int]]): The input audio of every response, as base64 chunks with their PCM size.
+        stats (BenchStats): Shared by all clients of the run.
+        responses (int, optional): Responses to ask for. Defaults to 1.
+        api_key (str, optional): Sent as bearer token, the api key or a relay tenant token. Defaults to None.
+        model (str, optional): The model to connect with. Defaults to DEFAULT_MODEL.
+        realtime (bool, optional): Pace the input audio at playback speed instead of sending it at once.
+            Defaults to False.
+        timeout (float, optional): Seconds to wait for the session and for each response. Defaults to 30.0.
+    """
+    from pyoai_realtime.realtime_api import RealtimeAPI
+
+    class BenchAPI(RealtimeAPI):
+        # logging every event would cost more than the client itself
+        def log(self, *args: Any) -> bool:
+            return True
+
+    loop = asyncio.get_running_loop()
+    api = BenchAPI(url=url, api_key=api_key, audio_fast_path=True)
+    # time of the first audio delta of the current response
+    first_audio = None
+
+    def _sink(frame):
+        nonlocal first_audio
+        if first_audio is None:
+            first_audio = time.perf_counter()
+        stats.audio_received += len(frame.pcm)
+
+    api.add_audio_sink(_sink)
+    try:
+        start = time.perf_counter()
+        await api.start_session(model=model, timeout=timeout)
+        stats.setups.append(time.perf_counter() - start)
+
+        for _ in range(responses):
+            for chunk, size in audio:
+                await api.send("input_audio_buffer.append", {"audio": chunk})
+                stats.audio_sent += size
+                if realtime:
+                    await asyncio.sleep(size / _BYTES_PER_SECOND)
+            await api.send("input_audio_buffer.commit")
+
+            done = loop.create_future()
+            with api.subscribe("server.response.done", done.set_result, once=True):
+                first_audio = None
+                start = time.perf_counter()
+                await api.send("response.create")
+                async with asyncio.timeout(timeout):
+                    await done
+            stats.durations.append(time.perf_counter() - start)
+            if first_audio is not None:
+                stats.first_audio.append(first_audio - start)
+            stats.responses += 1
+    except Exception as err:
+        stats.failed += 1
+        stats.errors[type(err).__name__] += 1
+    finally:
+        await api.disconnect()
+
+
+async def bench(
+    url: str = None,
+    clients: int = 10,
+    responses: int = 3,
+    audio: bytes = None,
+    chunk_ms: int = 100,
+    ramp: float = 0.0,
+    relay: bool = False,
+    audio_chunks: int = 25,
+    **client_kwargs,
+) -> BenchStats:
+    """
+    Run `clients` simulated clients at once and collect their results.
+
+    Args:
+        url (str, optional): The relay or api to load. Defaults to None, an in-process `FakeRealtimeServer`.
+        clients (int, optional): Concurrent clients. Defaults to 10.
+        responses (int, optional): Responses per client. Defaults to 3.
+        audio (bytes, optional): Input audio per response as api PCM16. Defaults to a one second tone.
+        chunk_ms (int, optional): Length of each input audio append. Defaults to 100.
+        ramp (float, optional): Seconds over which the clients connect, 0 connects them all at once. Defaults to 0.0.
+        relay (bool, optional): Without a `url`, put an in-process `RealtimeRelay` in front of the fake server.
+            Defaults to False.
+        audio_chunks (int, optional): Without a `url`, 40 ms audio deltas per response of the fake server.
+            Defaults to 25.
+        client_kwargs: Passed on to `run_client`.
+    """
+    audio = synthetic_audio(1.0) if audio is None else audio
+    chunk_bytes = max(2, DEFAULT_FREQUENCY * chunk_ms // 1000 * 2)
+    # encoded once, the clients should not spend the cpu being measured on it
+    chunks = [
+        (base64.b64encode(audio[i : i + chunk_bytes]).decode("ascii"), len(audio[i : i + chunk_bytes]))
+        for i in range(0, len(audio), chunk_bytes)
+    ]
+
+    async with AsyncExitStack() as stack:
+        if url is None:
+            from pyoai_realtime.fake_server import FakeRealtimeServer
+
+            upstream = await stack.enter_async_context(FakeRealtimeServer(audio_chunks=audio_chunks, record=False))
+            url = upstream.url
+            if relay:
+                from pyoai_realtime.realtime_conversation import RealtimeRelay
+
+                server = await RealtimeRelay(upstream_url=url, model=None).serve(hostname="localhost", port=0)
+                stack.push_async_callback(server.wait_closed)
+                stack.callback(server.close)
+                url = f"ws://localhost:{server.sockets[0].getsockname()[1]}"
+
+        stats = BenchStats(clients=clients)
+
+        async def _client(delay: float):
+            await asyncio.sleep(delay)
+            await run_client(url, chunks, stats, responses, **client_kwargs)
+
+        cpu, start = time.process_time(), time.perf_counter()
+        await asyncio.gather(*(_client(ramp * i / clients) for i in range(clients)))
+        stats.elapsed = time.perf_counter() - start
+        stats.cpu = time.process_time() - cpu
+        stats.max_rss = _peak_rss()
+    return stats
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="pyoai-realtime", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bench_parser = commands.add_parser(
+        "bench",
+        help="load test a relay or the api with simulated clients",
+        description="Run simulated clients that stream input audio and consume response audio, and report "
+        "setup time, latency percentiles, throughput, CPU and RSS.",
+    )
+    target = bench_parser.add_argument_group("target")
+    target.add_argument("--url", help="websocket url of a relay or the api, default: an in-process fake server")
+    target.add_argument("--api-key", help="bearer token, an api key or a relay tenant token")
+    target.add_argument("--model", default=DEFAULT_MODEL, help="model to connect with (default: %(default)s)")
+    target.add_argument("--relay", action="store_true", help="without --url, put a relay in front of the fake server")
+    target.add_argument(
+        "--audio-chunks",
+        type=int,
+        default=25,
+        help="without --url, 40 ms audio deltas per response of the fake server (default: %(default)s)",
+    )
+
+    load = bench_parser.add_argument_group("load")
+    load.add_argument("-k", "--clients", type=int, default=10, help="concurrent clients (default: %(default)s)")
+    load.add_argument("-n", "--responses", type=int, default=3, help="responses per client (default: %(default)s)")
+    load.add_argument("--ramp", type=float, default=0.0, help="seconds over which the clients connect (default: 0)")
+    load.add_argument("--audio", help="input audio per response, a 16 bit wav or raw PCM16 at 24 kHz")
+    load.add_argument("--seconds", type=float, default=1.0, help="length of the synthetic input audio (default: 1)")
+    load.add_argument("--chunk-ms", type=int, default=100, help="length of each audio append (default: 100)")
+    load.add_argument("--realtime", action="store_true", help="send input audio at playback speed")
+    load.add_argument("--timeout", type=float, default=30.0, help="seconds per session setup and response")
+
+    bench_parser.add_argument("--json", action="store_true", help="print the results as json")
+    return parser
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """Entry point of the `pyoai-realtime` script, returns the exit status."""
+    args = _parser().parse_args(argv)
+
+    audio = load_audio(args.audio) if args.audio else synthetic_audio(args.seconds)
+    stats = asyncio.run(
+        bench(
+            url=args.url,
+            clients=args.clients,
+            responses=args.responses,
+            audio=audio,
+            chunk_ms=args.chunk_ms,
+            ramp=args.ramp,
+            relay=args.relay,
+            audio_chunks=args.audio_chunks,
+            api_key=args.api_key,
+            model=args.model,
+            realtime=args.realtime,
+            timeout=args.timeout,
+        )
+    )
+    print(json.dumps(stats.to_dict(), indent=2) if args.json else stats.report())
+    return 1 if stats.failed else 0
@@ -3,6 +3,9 @@ import os
 DEFAULT_MODEL = "gpt-4o-realtime-preview-2024-10-01"
 DEFAULT_URL = "wss://api.openai.com/v1/realtime"
 
+# the api only speaks PCM16 mono at this rate
+DEFAULT_FREQUENCY = 24_000  # 24,000 Hz
+
 
 # CAN OVERWRITE THESE IN YOUR ENVIRONMENT
 DEBUG = os.environ.get("DEBUG", False)
@@ -0,0 +1,57 @@
+"""permessage-deflate with per-direction control, used by `TransportConfig` when compression is enabled."""
+
+from websockets.extensions.permessage_deflate import (
+    ClientPerMessageDeflateFactory,
+    PerMessageDeflate,
+    ServerPerMessageDeflateFactory,
+)
+
+
+class DirectionalDeflate(PerMessageDeflate):
+    """
+    permessage-deflate that can leave outgoing messages uncompressed.
+
+    RFC 7692 lets either side send uncompressed messages once the extension is negotiated, so turning off outbound
+    compression only needs `encode` to pass frames through (with RSV1 unset). Incoming compressed messages are still
+    decoded.
+    """
+
+    def __init__(self, *args, compress_outbound: bool = True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compress_outbound = compress_outbound
+
+    @classmethod
+    def wrap(cls, extension: PerMessageDeflate, compress_outbound: bool) -> "DirectionalDeflate":
+        return cls(
+            extension.remote_no_context_takeover,
+            extension.local_no_context_takeover,
+            extension.remote_max_window_bits,
+            extension.local_max_window_bits,
+            extension.compress_settings,
+            compress_outbound=compress_outbound,
+        )
+
+    def encode(self, frame):
+        if not self.compress_outbound:
+            return frame
+        return super().encode(frame)
+
+
+class ClientDirectionalDeflateFactory(ClientPerMessageDeflateFactory):
+    def __init__(self, compress_outbound: bool = True, **kwargs):
+        super().__init__(**kwargs)
+        self.compress_outbound = compress_outbound
+
+    def process_response_params(self, params, accepted_extensions) -> DirectionalDeflate:
+        extension = super().process_response_params(params, accepted_extensions)
+        return DirectionalDeflate.wrap(extension, self.compress_outbound)
+
+
+class ServerDirectionalDeflateFactory(ServerPerMessageDeflateFactory):
+    def __init__(self, compress_outbound: bool = True, **kwargs):
+        super().__init__(**kwargs)
+        self.compress_outbound = compress_outbound
+
+    def process_request_params(self, params, accepted_extensions) -> tuple[list, DirectionalDeflate]:
+        response_params, extension = super().process_request_params(params, accepted_extensions)
+        return response_params, DirectionalDeflate.wrap(extension, self.compress_outbound)
@@ -0,0 +1,352 @@
+"""Error classification, retry policies and per-endpoint circuit breakers.
+
+Server `error` events and transport exceptions are sorted into three classes:
+
+- `RETRYABLE`: the endpoint or the network is at fault (timeouts, 5xx, dropped connections, rate limits), trying
+  again later can succeed.
+- `FATAL`: trying again can not succeed without outside help (bad credentials, exhausted quota, policy closes).
+- `CLIENT_BUG`: the request or our own handlers are wrong, retrying repeats the mistake.
+
+An `ErrorPolicy` retries only what is retryable, with full jitter exponential backoff, and keeps a `CircuitBreaker`
+per endpoint. Once an endpoint failed `failure_threshold` times in a row its breaker opens and further attempts fail
+immediately with `CircuitOpenError` until a single trial is let through after `reset_timeout`, so an outage does not
+turn into a reconnect storm.
+
+    api = RealtimeAPI(error_policy=ErrorPolicy())
+    await api.connect()  # retried with backoff, fails fast while the breaker is open
+"""
+
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Awaitable, Callable, TypeVar
+
+from websockets.exceptions import ConnectionClosed, InvalidStatus, InvalidURI
+
+T = TypeVar("T")
+
+
+class ErrorClass(Enum):
+    RETRYABLE = "retryable"
+    FATAL = "fatal"
+    CLIENT_BUG = "client_bug"
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of attempting a call while the endpoint's circuit breaker is open."""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"Circuit open for {endpoint}, retry in {retry_after:.1f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+# server `error` events, by `code` first and `type` second
+SERVER_ERROR_CODES = {
+    "rate_limit_exceeded": ErrorClass.RETRYABLE,
+    "session_expired": ErrorClass.RETRYABLE,
+    "server_error": ErrorClass.RETRYABLE,
+    "invalid_api_key": ErrorClass.FATAL,
+    "insufficient_quota": ErrorClass.FATAL,
+    "model_not_found": ErrorClass.FATAL,
+}
+SERVER_ERROR_TYPES = {
+    "server_error": ErrorClass.RETRYABLE,
+    "authentication_error": ErrorClass.FATAL,
+    "permission_error": ErrorClass.FATAL,
+    "invalid_request_error": ErrorClass.CLIENT_BUG,
+}
+
+# websocket close codes that are not worth a reconnect
+CLOSE_CODES = {
+    1002: ErrorClass.CLIENT_BUG,  # protocol error
+    1003: ErrorClass.CLIENT_BUG,  # unsupported data
+    1007: ErrorClass.CLIENT_BUG,  # invalid payload
+    1009: ErrorClass.CLIENT_BUG,  # message too big
+    1008: ErrorClass.FATAL,  # policy violation
+}
+
+
+def _classify_status(status: int) -> ErrorClass:
+    if status in (401, 403):
+        return ErrorClass.FATAL
+    if status in (408, 429) or status >= 500:
+        return ErrorClass.RETRYABLE
+    return ErrorClass.CLIENT_BUG
+
+
+def classify_error(error: dict | BaseException) -> ErrorClass:
+    """
+    Classify a server `error` event (or its `error` object) or an exception.
+
+    Unknown server errors are assumed retryable, unknown exceptions are assumed to come from a bug in the client or
+    its handlers.
+    """
+    if isinstance(error, dict):
+        error = error.get("error", error)
+        if (klass := SERVER_ERROR_CODES.get(error.get("code"))) is not None:
+            return klass
+        return SERVER_ERROR_TYPES.get(error.get("type"), ErrorClass.RETRYABLE)
+
+    match error:
+        case CircuitOpenError():
+            return ErrorClass.RETRYABLE
+        case InvalidStatus():
+            return _classify_status(error.response.status_code)
+        case ConnectionClosed():
+            return CLOSE_CODES.get(error.rcvd.code if error.rcvd else 1006, ErrorClass.RETRYABLE)
+        case InvalidURI() | json.JSONDecodeError():
+            return ErrorClass.CLIENT_BUG
+        case TimeoutError() | OSError() | EOFError():
+            return ErrorClass.RETRYABLE
+        case _:
+            return ErrorClass.CLIENT_BUG
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: attempt `n` waits a uniform random time up to
+    `min(max_delay, base_delay * multiplier ** n)`.
+
+    Attributes:
+        max_attempts (int): Attempts in total including the first, 1 never retries.
+        base_delay (float): Upper bound of the first delay in seconds.
+        max_delay (float): Upper bound of any delay in seconds.
+        multiplier (float): Growth of the bound per attempt.
+    """
+
+    max_attempts: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    multiplier: float = 2.0
+
+    def delay(self, attempt: int, rng: random.Random = random) -> float:
+        """Seconds to wait before retrying after failed attempt number `attempt` (0 based)."""
+        return rng.uniform(0, min(self.max_delay, self.base_delay * self.multiplier**attempt))
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+DEFAULT_POLICIES = {
+    ErrorClass.RETRYABLE: RetryPolicy(),
+    ErrorClass.FATAL: NO_RETRY,
+    ErrorClass.CLIENT_BUG: NO_RETRY,
+}
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Counts consecutive failures of an endpoint and stops calls to it while it is down.
+
+    After `failure_threshold` failures in a row the breaker opens. Once `reset_timeout` has passed it lets a single
+    trial through (half open), a success closes it again and a failure reopens it for another `reset_timeout`.
+    """
+
+    def __init__(
+        self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: float = None
+        self._trial = False
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(state={self.state.value}, failures={self.failures})"
+
+    @property
+    def state(self) -> CircuitState:
+        if self.opened_at is None:
+            return CircuitState.CLOSED
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return CircuitState.HALF_OPEN
+        return CircuitState.OPEN
+
+    @property
+    def retry_after(self) -> float:
+        """
+        Seconds until the breaker lets a call through, 0 if it does now.
+
+        While a half open trial is in flight its outcome is not known yet, callers are asked to check back after a
+        tenth of `reset_timeout`.
+        """
+        if self.opened_at is None:
+            return 0.0
+        if (remaining := self.opened_at + self.reset_timeout - self.clock()) > 0:
+            return remaining
+        return self.reset_timeout / 10 if self._trial else 0.0
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now, in the half open state only one trial at a time does."""
+        match self.state:
+            case CircuitState.CLOSED:
+                return True
+            case CircuitState.HALF_OPEN if not self._trial:
+                self._trial = True
+                return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial or self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+        self._trial = False
+
+    def release(self):
+        """Give up a trial without an outcome (e.g. cancelled), the next call may try instead."""
+        self._trial = False
+
+
+class CircuitBreakers:
+    """One `CircuitBreaker` per endpoint, created on first use with the same settings."""
+
+    def __init__(
+        self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def __getitem__(self, endpoint: str) -> CircuitBreaker:
+        if (breaker := self._breakers.get(endpoint)) is None:
+            breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout, self.clock)
+            self._breakers[endpoint] = breaker
+        return breaker
+
+    def __contains__(self, endpoint: str) -> bool:
+        return endpoint in self._breakers
+
+    def __len__(self) -> int:
+        return len(self._breakers)
+
+
+# shared by every `ErrorPolicy` in the process that is not given its own
+default_breakers = CircuitBreakers()
+
+
+@dataclass
+class ErrorStats:
+    """
+    Counters for an `ErrorPolicy`.
+
+    Attributes:
+        errors (Counter[ErrorClass]): Classified errors.
+        retries (int): Attempts repeated after a retryable error.
+        shed (int): Attempts refused because the endpoint's breaker was open.
+    """
+
+    errors: Counter = field(default_factory=Counter)
+    retries: int = 0
+    shed: int = 0
+
+
+class ErrorPolicy:
+    """Classifies errors, retries the retryable ones and keeps the per-endpoint circuit breakers up to date."""
+
+    def __init__(
+        self,
+        policies: dict[ErrorClass, RetryPolicy] = None,
+        breakers: CircuitBreakers = None,
+        classify: Callable[[dict | BaseException], ErrorClass] = classify_error,
+        rng: random.Random = None,
+    ):
+        """
+        Args:
+            policies (dict[ErrorClass, RetryPolicy], optional): Retry policy per class, merged over
+                DEFAULT_POLICIES. Defaults to None.
+            breakers (CircuitBreakers, optional): Breakers to use. Defaults to the process-wide `default_breakers`.
+            classify (Callable, optional): Classifier for errors. Defaults to classify_error.
+            rng (random.Random, optional): Source of the backoff jitter. Defaults to a new random.Random().
+        """
+        self.policies = {**DEFAULT_POLICIES, **(policies or {})}
+        self.breakers = default_breakers if breakers is None else breakers
+        self.classify = classify
+        self.rng = rng or random.Random()
+        self.stats = ErrorStats()
+
+    def observe(self, error: dict | BaseException) -> ErrorClass:
+        """Classify and count an error that says nothing about the endpoint's health, e.g. a server `error` event."""
+        klass = self.classify(error)
+        self.stats.errors[klass] += 1
+        return klass
+
+    def record(self, endpoint: str, error: dict | BaseException = None) -> ErrorClass | None:
+        """
+        Record the outcome of a call to `endpoint`, a success if `error` is None.
+
+        Only retryable errors count against the breaker, any other answer (a server error event, a close frame, a
+        handshake status) shows the endpoint is up. Other non-retryable exceptions happened locally and say nothing
+        about the endpoint, they are only counted.
+
+        Returns:
+            ErrorClass | None: The class of `error`.
+        """
+        breaker = self.breakers[endpoint]
+        if error is None:
+            breaker.record_success()
+            return None
+        klass = self.observe(error)
+        if klass is ErrorClass.RETRYABLE:
+            breaker.record_failure()
+        elif isinstance(error, (dict, ConnectionClosed, InvalidStatus)):
+            breaker.record_success()
+        return klass
+
+    async def run(self, endpoint: str, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await `call()` and retry it according to the class of the exception it raises.
+
+        Args:
+            endpoint (str): Key of the circuit breaker, e.g. the websocket url.
+            call (Callable[[], Awaitable[T]]): Makes one attempt.
+
+        Returns:
+            T: The result of the first successful attempt.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, before or between attempts.
+            Exception: The last error once it is not retryable or the attempts are used up.
+        """
+        breaker = self.breakers[endpoint]
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                self.stats.shed += 1
+                raise CircuitOpenError(endpoint, breaker.retry_after)
+            try:
+                result = await call()
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception as err:
+                policy = self.policies[self.record(endpoint, err)]
+                if attempt + 1 >= policy.max_attempts:
+                    raise
+                if breaker.opened_at is not None:
+                    # this failure tripped the breaker, no point in waiting for the next attempt
+                    self.stats.shed += 1
+                    raise CircuitOpenError(endpoint, breaker.retry_after) from err
+                await asyncio.sleep(policy.delay(attempt, self.rng))
+                attempt += 1
+                self.stats.retries += 1
+                continue
+            self.record(endpoint)
+            return result
@@ -1,6 +1,8 @@
 from array import array
 
-from pyoai_realtime.realtime_events import conversation_events
+from pyoai_realtime.constants import DEFAULT_FREQUENCY
+from pyoai_realtime.realtime_events import conversation_events, response_events
+from pyoai_realtime.text_builder import TextBuilder
 
 
 class ConversationInterface:
@@ -29,13 +31,16 @@ class ConversationInterface:
 class EventFunctionsMixin:
     conversation: ConversationInterface
     event_processor: dict[str, callable]
-    default_frequency: int
+    default_frequency: int = DEFAULT_FREQUENCY
 
     def _register_events(self, skip_event: list[str] = [], replace_event: dict[str, callable] = {}):
         event_mapping = [
             (conversation_events.Created.type, self._conversation_item_created),
             (conversation_events.Truncated.type, self._converstaion_item_truncated),
             (conversation_events.Deleted.type, self._conversation_item_deleted),
+            (conversation_events.Completed.type, self._input_audio_transcription_completed),
+            (response_events.TextDelta.type, self._response_text_delta),
+            (response_events.AudioTranscriptDelta.type, self._response_audio_transcript_delta),
         ]
 
         for event_type, handler in event_mapping:
@@ -44,31 +49,28 @@ class EventFunctionsMixin:
 
     def _conversation_item_created(self, event: conversation_events.Created):
         new_item = event.item
+        item_id = new_item["id"]
         convo: ConversationInterface = self.conversation
 
-        if new_item.id not in convo.item_lookup:
-            convo.item_lookup[new_item.id] = new_item
+        if item_id not in convo.item_lookup:
+            convo.item_lookup[item_id] = new_item
             convo.items.append(new_item)
 
         new_item["formatted"] = {
             "audio": [],
-            "text": "",
-            "transcript": "",
+            "text": TextBuilder(),
+            "transcript": TextBuilder(),
         }
 
-        if new_item.id in convo.queued_speech_items:
-            new_item["formatted"]["audio"] = convo.queued_speech_items[new_item.id]["audio"]
-            _ = convo.queued_speech_items.pop(new_item.id)
+        if item_id in convo.queued_speech_items:
+            new_item["formatted"]["audio"] = convo.queued_speech_items.pop(item_id)["audio"]
 
-        if "content" in new_item:
-            text_content = [c["type"] in ["text", "input_text"] for c in new_item["content"]]
-
-            for content in text_content:
+        for content in new_item.get("content", []):
+            if content["type"] in ["text", "input_text"]:
                 new_item["formatted"]["text"] += content["text"]
 
-        if new_item.id in convo.queued_transcript_items:
-            new_item["formatted"]["transcript"] = convo.queued_transcript_items["transcript"]
-            _ = convo.queued_transcript_items.pop(new_item.id)
+        if item_id in convo.queued_transcript_items:
+            new_item["formatted"]["transcript"] += convo.queued_transcript_items.pop(item_id)["transcript"]
 
         if new_item["type"] == "message":
             if new_item["role"] == "user":
@@ -100,8 +102,9 @@ class EventFunctionsMixin:
         if (item := convo.item_lookup.get(item_id)) is None:
             raise ValueError(f"item.truncated: Item {item_id} not found")
 
-        end_index = (audio_end_ms * self.default_frequency) / 1000
-        item["formatted"]["transcript"] = ""
+        # integer division, a float index can not slice the audio
+        end_index = audio_end_ms * self.default_frequency // 1000
+        item["formatted"]["transcript"].reset()
         item["formatted"]["audio"] = item["formatted"]["audio"][:end_index]
         return {"item": item, "delta": None}
 
@@ -120,3 +123,28 @@ class EventFunctionsMixin:
         #     convo.items[index, 1]
 
         return {"item": item, "delta": None}
+
+    def _input_audio_transcription_completed(self, event: conversation_events.Completed):
+        convo: ConversationInterface = self.conversation
+
+        if (item := convo.item_lookup.get(event.item_id)) is None:
+            # the transcript can arrive before the item, `_conversation_item_created` picks it up
+            convo.queued_transcript_items[event.item_id] = {"transcript": event.transcript}
+            return {"item": None, "delta": None}
+
+        item["formatted"]["transcript"].reset(event.transcript)
+        return {"item": item, "delta": {"transcript": event.transcript}}
+
+    def _response_text_delta(self, event: response_events.TextDelta):
+        if (item := self.conversation.item_lookup.get(event.item_id)) is None:
+            raise ValueError(f"response.text.delta: Item {event.item_id} not found")
+
+        item["formatted"]["text"] += event.delta
+        return {"item": item, "delta": {"text": event.delta}}
+
+    def _response_audio_transcript_delta(self, event: response_events.AudioTranscriptDelta):
+        if (item := self.conversation.item_lookup.get(event.item_id)) is None:
+            raise ValueError(f"response.audio_transcript.delta: Item {event.item_id} not found")
+
+        item["formatted"]["transcript"] += event.delta
+        return {"item": item, "delta": {"transcript": event.delta}}
@@ -1,25 +1,307 @@
 import asyncio
-from collections import defaultdict
-from typing import Any, Callable
+import inspect
+import weakref
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import TYPE_CHECKING, Any, Callable, Iterator
+
+from pyoai_realtime import log
+from pyoai_realtime.utils import percentile as _percentile
+
+if TYPE_CHECKING:
+    from pyoai_realtime.profiling import HandlerProfiler
+
+
+class HandlerPriority(IntEnum):
+    """
+    Dispatch lanes for persistent handlers.
+
+    `CRITICAL` handlers run inline before all others (audio playback, barge-in), `NORMAL` handlers run inline after
+    them, `BACKGROUND` handlers (analytics, persistence) are deferred and run one event per loop iteration once the
+    inline work is done.
+    """
+
+    CRITICAL = 0
+    NORMAL = 1
+    BACKGROUND = 2
+
+
+@dataclass
+class BackgroundStats:
+    """
+    Counters for the deferred `BACKGROUND` handlers of a `RealtimeEventHandler`.
+
+    Attributes:
+        queued (int): Events deferred to background handlers.
+        processed (int): Deferred events handled.
+        errors (int): Background handlers that raised, they are logged and skipped.
+        caught_up (int): Deferred events handled without yielding because they were older than the lag bound.
+        shed (int): Events whose handlers at or below `shed_priority` were skipped, deferred ones included.
+        max_lag (float): Highest lag seen in seconds.
+        lags (deque[float]): Seconds from dispatch to handling for the most recent deferred events.
+    """
+
+    queued: int = 0
+    processed: int = 0
+    errors: int = 0
+    caught_up: int = 0
+    shed: int = 0
+    max_lag: float = 0.0
+    lags: deque = field(default_factory=lambda: deque(maxlen=4096))
+
+    def lag_percentile(self, percentile: float) -> float:
+        """Dispatch-to-handled lag in seconds at `percentile` (0-100) over the recent deferred events."""
+        return _percentile(self.lags, percentile)
+
+
+async def _dead():
+    return None
+
+
+class _WeakCallback:
+    """Calls the target of a weak reference, or nothing once it has been collected."""
+
+    __slots__ = ("ref", "is_async")
+
+    def __init__(self, ref: weakref.ref, is_async: bool):
+        self.ref = ref
+        self.is_async = is_async
+
+    def __call__(self, event: Any):
+        if (fn := self.ref()) is None:
+            return _dead() if self.is_async else None
+        return fn(event)
+
+    def __repr__(self) -> str:
+        return f"weak({self.ref()!r})"
+
+    @property
+    def __wrapped__(self) -> Callable | None:
+        return self.ref()
+
+
+class Subscription:
+    """
+    Handle of a registered callback.
+
+    `cancel()` removes the callback in O(1), so does leaving a `with` block:
+
+        with api.subscribe("server.response.text.delta", widget.on_delta):
+            await api.wait_for_next("server.response.done")
+    """
+
+    __slots__ = ("event_name", "_handlers", "_callback")
+
+    def __init__(self, handlers: "HandlerList", event_name: str, callback: Callable | weakref.ref):
+        self._handlers = handlers
+        self.event_name = event_name
+        self._callback = callback
+
+    def __repr__(self) -> str:
+        state = "active" if self.active else "cancelled"
+        return f"{self.__class__.__name__}({self.event_name!r}, {self.callback!r}, {state})"
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc):
+        self.cancel()
+
+    @property
+    def callback(self) -> Callable | None:
+        """The callback, None if it was registered weakly and has been collected."""
+        return self._callback() if isinstance(self._callback, weakref.ref) else self._callback
+
+    @property
+    def active(self) -> bool:
+        return self._handlers is not None
+
+    def cancel(self) -> bool:
+        """Unregister the callback, False if it already was."""
+        if self._handlers is None:
+            return False
+        self._handlers._discard(self)
+        return True
+
+    def _on_collected(self, _ref: weakref.ref):
+        self.cancel()
+
+
+class HandlerList:
+    """
+    The callbacks of one event, in registration order.
+
+    Behaves like the list it replaces (iteration, `in`, `len`, `remove`, comparison with lists) but is keyed by
+    `Subscription`, so removal is O(1), and it caches the `(callback, is_async)` pairs dispatch iterates so a dispatch
+    does not copy the list or inspect the callbacks. Removing the last callback drops the list from its lane.
+    """
+
+    __slots__ = ("_lane", "_event_name", "_entries", "_index", "_snapshot")
+
+    def __init__(self, lane: "_Lane" = None, event_name: str = None):
+        self._lane = lane
+        self._event_name = event_name
+        self._entries: dict[Subscription, tuple[Callable, bool]] = {}
+        # strong callbacks to their subscriptions, for removal by callback
+        self._index: dict[Callable, list[Subscription]] = {}
+        self._snapshot: tuple[tuple[Callable, bool], ...] = ()
+
+    def __iter__(self) -> Iterator[Callable]:
+        return iter([callback for sub in tuple(self._entries) if (callback := sub.callback) is not None])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, callback: Callable) -> bool:
+        return callback in self._index or any(sub.callback == callback for sub in self._weak())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (HandlerList, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def _weak(self) -> list[Subscription]:
+        return [sub for sub in self._entries if isinstance(sub._callback, weakref.ref)]
+
+    def add(self, callback: Callable, weak: bool = False) -> Subscription:
+        """Register `callback`, held through a weak reference if `weak` so it does not keep its owner alive."""
+        is_async = asyncio.iscoroutinefunction(callback)
+        if weak:
+            sub = Subscription(self, self._event_name, None)
+            ref_type = weakref.WeakMethod if inspect.ismethod(callback) else weakref.ref
+            sub._callback = ref_type(callback, sub._on_collected)
+            self._entries[sub] = (_WeakCallback(sub._callback, is_async), is_async)
+        else:
+            sub = Subscription(self, self._event_name, callback)
+            self._entries[sub] = (callback, is_async)
+            self._index.setdefault(callback, []).append(sub)
+        self._snapshot = None
+        return sub
+
+    def append(self, callback: Callable):
+        self.add(callback)
+
+    def remove(self, callback: Callable):
+        """Remove the first registration of `callback`."""
+        if subs := self._index.get(callback):
+            return self._discard(subs[0])
+        for sub in self._weak():
+            if sub.callback == callback:
+                return self._discard(sub)
+        raise ValueError(f"{callback!r} is not registered")
+
+    def clear(self):
+        for sub in self._entries:
+            sub._handlers = None
+        self._entries.clear()
+        self._index.clear()
+        self._snapshot = ()
+        self._prune()
+
+    def snapshot(self) -> tuple[tuple[Callable, bool], ...]:
+        """The `(callback, is_async)` pairs to dispatch to, cached until the next change."""
+        if self._snapshot is None:
+            self._snapshot = tuple(self._entries.values())
+        return self._snapshot
+
+    def _discard(self, sub: Subscription):
+        if self._entries.pop(sub, None) is None:
+            return
+        sub._handlers = None
+        if not isinstance(sub._callback, weakref.ref):
+            subs = self._index[sub._callback]
+            subs.remove(sub)
+            if not subs:
+                del self._index[sub._callback]
+        self._snapshot = None
+        if not self._entries:
+            self._prune()
+
+    def _prune(self):
+        # event names come and go (per item, per response), empty lists would pile up in the lane
+        if self._lane is not None and self._lane.get(self._event_name) is self:
+            del self._lane[self._event_name]
+
+
+class _Lane(dict):
+    """Event name to `HandlerList`, created on first access like a `defaultdict`."""
+
+    def __missing__(self, event_name: str) -> HandlerList:
+        handlers = self[event_name] = HandlerList(self, event_name)
+        return handlers
+
+
+class SubscriptionScope:
+    """
+    Collects subscriptions to cancel them together, e.g. everything a widget or a single response registered.
+
+        with api.scope() as scope:
+            scope.on("server.response.text.delta", widget.on_delta)
+            scope.on("server.response.done", widget.on_done)
+    """
+
+    def __init__(self, handler: "RealtimeEventHandler"):
+        self.handler = handler
+        self.subscriptions: list[Subscription] = []
+
+    def __enter__(self) -> "SubscriptionScope":
+        return self
+
+    def __exit__(self, *exc):
+        self.cancel()
+
+    def on(
+        self,
+        event_name: str,
+        callback: Callable,
+        priority: HandlerPriority = HandlerPriority.NORMAL,
+        weak: bool = False,
+    ) -> Subscription:
+        sub = self.handler.subscribe(event_name, callback, priority, weak=weak)
+        self.subscriptions.append(sub)
+        return sub
+
+    def on_next(self, event_name: str, callback: Callable) -> Subscription:
+        sub = self.handler.subscribe(event_name, callback, once=True)
+        self.subscriptions.append(sub)
+        return sub
+
+    def cancel(self):
+        for sub in self.subscriptions:
+            sub.cancel()
+        self.subscriptions.clear()
 
 
 class RealtimeEventHandler:
     # should allow awaitable as well
-    event_handlers: dict[str, list[Callable]]
-    next_event_handlers: dict[str, list[Callable]]
-    background_tasks: dict[str, asyncio.Task] = {}
+    event_handlers: dict[str, HandlerList]
+    next_event_handlers: dict[str, HandlerList]
+    critical_handlers: dict[str, HandlerList]
+    deferred_handlers: dict[str, HandlerList]
+    background_tasks: dict[str, asyncio.Task]
+
+    # seconds a deferred event may wait, older ones are handled back to back until the backlog is within the bound
+    background_max_lag: float = 0.5
+    # set by `enable_profiling`
+    profiler: "HandlerProfiler" = None
+    # `BACKGROUND` or `NORMAL`: handlers of this priority and below are skipped while set, critical and one-shot
+    # handlers always run. Set by an overloaded `LoopMonitor`
+    shed_priority: HandlerPriority = None
 
     def __init__(self) -> None:
         """Initialize the event handler with empty dictionaries for event handlers."""
+        self.background_tasks = {}
+        self.background_stats = BackgroundStats()
+        self._deferred: deque[tuple[float, str, tuple[tuple[Callable, bool], ...], Any]] = deque()
         self.clear_event_handlers()
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}(" f"\n\t{self.event_handlers=}, " f"\n\t{self.next_event_handlers=}\n)"
 
-    def _handler_append(self, handler: dict, callback: Callable) -> Callable:
-        handler.append(callback)
-        return callback
-
     def _handler_remove(self, handler: dict, event_name: str, callback: Callable = None):
         """
         Remove event listeners.
@@ -40,8 +322,7 @@ class RealtimeEventHandler:
             raise ValueError(f"Could not turn off {_name} for {event_name}. No listeners")
 
         if callback and (callback in events):
-            idx = events.index(callback)
-            _ = events.pop(idx)
+            events.remove(callback)
         else:
             events.clear()
 
@@ -52,16 +333,33 @@ class RealtimeEventHandler:
         Clear all event handlers.
 
         This method resets the `event_handlers` and `next_event_handlers` attributes
-        to empty default dictionaries with lists as the default factory.
+        (and the other priority lanes) to empty dictionaries that create a `HandlerList` per event on first access.
 
         Returns:
             bool: Always returns True to indicate the handlers have been cleared.
         """
-        self.event_handlers = defaultdict(list)
-        self.next_event_handlers = defaultdict(list)
+        self.event_handlers = _Lane()
+        self.next_event_handlers = _Lane()
+        self.critical_handlers = _Lane()
+        self.deferred_handlers = _Lane()
         return True
 
-    def on(self, event_name: str, callback: Callable) -> Callable:
+    def _lane(self, priority: HandlerPriority) -> dict[str, HandlerList]:
+        match priority:
+            case HandlerPriority.CRITICAL:
+                return self.critical_handlers
+            case HandlerPriority.BACKGROUND:
+                return self.deferred_handlers
+        return self.event_handlers
+
+    def has_handlers(self, event_name: str) -> bool:
+        """Whether dispatching `event_name` would call anything."""
+        return any(lane.get(event_name) for lane in self._lanes()) or bool(self.next_event_handlers.get(event_name))
+
+    def _lanes(self) -> tuple[dict[str, HandlerList], ...]:
+        return (self.critical_handlers, self.event_handlers, self.deferred_handlers)
+
+    def on(self, event_name: str, callback: Callable, priority: HandlerPriority = HandlerPriority.NORMAL) -> Callable:
         """
         Register a callback to listen to a specific event.
 
@@ -72,11 +370,14 @@ class RealtimeEventHandler:
         Args:
             event_name (str): The name of the event to listen to.
             callback (Callable): The function to call when the event occurs.
+            priority (HandlerPriority, optional): `CRITICAL` runs before other handlers, `BACKGROUND` defers the
+                callback until the loop is idle. Defaults to `NORMAL`.
 
         Returns:
             Callable: The callback function.
         """
-        return self._handler_append(self.event_handlers[event_name], callback)
+        self.subscribe(event_name, callback, priority)
+        return callback
 
     def on_next(self, event_name: str, callback: Callable) -> Callable:
         """
@@ -89,11 +390,41 @@ class RealtimeEventHandler:
         Returns:
             Callable: The callback function.
         """
-        return self._handler_append(self.next_event_handlers[event_name], callback)
+        self.subscribe(event_name, callback, once=True)
+        return callback
+
+    def subscribe(
+        self,
+        event_name: str,
+        callback: Callable,
+        priority: HandlerPriority = HandlerPriority.NORMAL,
+        weak: bool = False,
+        once: bool = False,
+    ) -> Subscription:
+        """
+        Register a callback like `on` and return a handle to remove it with.
+
+        Args:
+            event_name (str): The name of the event to listen to.
+            callback (Callable): The function to call when the event occurs.
+            priority (HandlerPriority, optional): The dispatch lane. Defaults to `NORMAL`.
+            weak (bool, optional): Hold the callback (or the instance of a bound method) through a weak reference, it
+                is unregistered once collected. Defaults to False.
+            once (bool, optional): Only for the next occurrence, like `on_next`. Defaults to False.
+
+        Returns:
+            Subscription: Cancels the registration in O(1), also as a context manager.
+        """
+        lane = self.next_event_handlers if once else self._lane(priority)
+        return lane[event_name].add(callback, weak=weak)
+
+    def scope(self) -> SubscriptionScope:
+        """A group of subscriptions that are cancelled together, e.g. at the end of a `with` block."""
+        return SubscriptionScope(self)
 
     def off(self, event_name: str, callback: Callable = None):
         """
-        Remove a callback from the event listeners.
+        Remove a callback from the event listeners, whatever its priority.
 
         Args:
             event_name (str): The name of the event.
@@ -105,7 +436,13 @@ class RealtimeEventHandler:
         Raises:
             ValueError: If no listeners are found for the given event name.
         """
-        return self._handler_remove(self.event_handlers, event_name, callback)
+        if not (lanes := [lane for lane in self._lanes() if lane.get(event_name)]):
+            return self._handler_remove(self.event_handlers, event_name, callback)
+        # like `_handler_remove`, an unknown callback removes everything
+        owner = next((lane for lane in lanes if callback is not None and callback in lane[event_name]), None)
+        for lane in lanes if owner is None else [owner]:
+            self._handler_remove(lane, event_name, callback)
+        return True
 
     def off_next(self, event_name: str, callback: Callable = None) -> bool:
         """
@@ -145,18 +482,16 @@ class RealtimeEventHandler:
             result["data"] = event_data
             event.set()
 
-        self.on_next(event_name, callback)
-        try:
-            async with asyncio.timeout(timeout):
-                await event.wait()
-                next_event = result.get("data")
-
-            # await asyncio.wait_for(event.wait(), timeout=timeout)
-            # next_event = result.get("data")
-        except TimeoutError:
-            next_event = None
-        except Exception as err:
-            raise err
+        # cancelled on the way out, a timed out wait must not leave its callback behind
+        with self.subscribe(event_name, callback, once=True):
+            try:
+                async with asyncio.timeout(timeout):
+                    await event.wait()
+                    next_event = result.get("data")
+            except TimeoutError:
+                next_event = None
+            except Exception as err:
+                raise err
         return next_event
 
     async def dispatch(self, event_name: str, event: Any) -> bool:
@@ -171,17 +506,107 @@ class RealtimeEventHandler:
             bool: True if successful.
         """
 
-        async def _handle(fns: list[Callable]):
-            for fn in fns:
-                _ = await fn(event) if asyncio.iscoroutinefunction(fn) else fn(event)
+        if (profiler := self.profiler) is None:
+
+            async def _handle(fns: tuple[tuple[Callable, bool], ...]):
+                for fn, is_async in fns:
+                    _ = await fn(event) if is_async else fn(event)
+
+        else:
+            profiler.mark(event_name)
+
+            async def _handle(fns: tuple[tuple[Callable, bool], ...]):
+                for fn, is_async in fns:
+                    await profiler.call(event_name, fn, is_async, event)
+
+        # use get to avoid creating a list per event name. snapshots are immutable so a callback can call `off`
+        if handlers := self.critical_handlers.get(event_name):
+            await _handle(handlers.snapshot())
 
-        # use get to avoid adding key to defaultdict
+        shed, skipped = self.shed_priority, False
         if handlers := self.event_handlers.get(event_name):
-            await _handle(handlers)
-            handlers.clear()
+            if shed is None or shed is HandlerPriority.BACKGROUND:
+                await _handle(handlers.snapshot())
+            else:
+                skipped = True
 
+        # one-shot handlers are awaited by someone, they are never shed
         if next_handlers := self.next_event_handlers.get(event_name):
-            await _handle(next_handlers)
+            await _handle(next_handlers.snapshot())
             next_handlers.clear()
 
+        if handlers := self.deferred_handlers.get(event_name):
+            if shed is None:
+                self._defer(event_name, handlers.snapshot(), event)
+            else:
+                skipped = True
+
+        if skipped:
+            self.background_stats.shed += 1
+
         return True
+
+    def _defer(self, event_name: str, handlers: tuple[tuple[Callable, bool], ...], event: Any):
+        loop = asyncio.get_running_loop()
+        self._deferred.append((loop.time(), event_name, handlers, event))
+        self.background_stats.queued += 1
+        task = self.background_tasks.get("background_dispatch")
+        if task is None or task.done():
+            self.background_tasks["background_dispatch"] = loop.create_task(
+                self._run_deferred(), name="background_dispatch"
+            )
+
+    async def _run_deferred(self):
+        """Handle deferred events oldest first, yielding to the loop after each unless the backlog is too old."""
+        loop = asyncio.get_running_loop()
+        stats = self.background_stats
+        while self._deferred:
+            if self.shed_priority is not None:
+                # shedding drops the backlog as well, it is what keeps the loop busy
+                stats.shed += len(self._deferred)
+                self._deferred.clear()
+                return
+            enqueued, event_name, handlers, event = self._deferred.popleft()
+            lag = loop.time() - enqueued
+            stats.lags.append(lag)
+            stats.max_lag = max(stats.max_lag, lag)
+            for fn, is_async in handlers:
+                try:
+                    if (profiler := self.profiler) is not None:
+                        await profiler.call(event_name, fn, is_async, event)
+                    else:
+                        _ = await fn(event) if is_async else fn(event)
+                except Exception as err:
+                    stats.errors += 1
+                    log.warn(f"Background handler {fn!r} for {event_name} failed: {err!r}")
+            stats.processed += 1
+            if lag > self.background_max_lag:
+                stats.caught_up += 1
+            else:
+                await asyncio.sleep(0)
+
+    def enable_profiling(self, slow_threshold: float = 0.005, warn: bool = True) -> "HandlerProfiler":
+        """
+        Time every callback `dispatch` runs and the loop lag per event name, see `pyoai_realtime.profiling`.
+
+        Args:
+            slow_threshold (float, optional): Seconds after which a callback is reported as slow. Defaults to 0.005.
+            warn (bool, optional): Log a warning for every slow callback. Defaults to True.
+
+        Returns:
+            HandlerProfiler: The profiler, with the report and the folded stacks.
+        """
+        from pyoai_realtime.profiling import HandlerProfiler
+
+        self.profiler = HandlerProfiler(slow_threshold, warn)
+        return self.profiler
+
+    def disable_profiling(self) -> "HandlerProfiler":
+        """Stop profiling, returns the profiler with what was recorded."""
+        profiler, self.profiler = self.profiler, None
+        return profiler
+
+    async def flush_background(self):
+        """Wait until every deferred event dispatched so far has been handled."""
+        while (task := self.background_tasks.get("background_dispatch")) is not None and not task.done():
+            await asyncio.shield(task)
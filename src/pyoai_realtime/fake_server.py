@@ -0,0 +1,185 @@
+"""A local stand-in for the realtime api, used by the tests and benchmarks.
+
+It speaks just enough of the protocol to exercise the client: `session.created` on connect, `session.updated` for
+`session.update`, committed/truncated acknowledgements and a stream of audio deltas for every `response.create`,
+optionally behind a request rate limit.
+"""
+
+import asyncio
+import base64
+import json
+import random
+import time
+
+from websockets.asyncio.server import ServerConnection, serve
+
+from pyoai_realtime.constants import DEFAULT_FREQUENCY
+from pyoai_realtime.utils import generate_id
+
+
+class FakeRealtimeServer:
+    """
+    Minimal realtime server.
+
+        async with FakeRealtimeServer() as server:
+            api = RealtimeAPI(url=server.url)
+            await api.connect()
+    """
+
+    def __init__(
+        self,
+        hostname: str = "localhost",
+        port: int = 0,
+        audio_chunks: int = 10,
+        chunk_ms: int = 40,
+        chunk_interval: float = 0.0,
+        latency: float = 0.0,
+        request_limit: int = 0,
+        limit_window: float = 60.0,
+        record: bool = True,
+        **serve_kwargs,
+    ):
+        """
+        Args:
+            hostname (str, optional): Interface to listen on. Defaults to "localhost".
+            port (int, optional): Port to listen on, 0 picks a free one. Defaults to 0.
+            audio_chunks (int, optional): Audio deltas streamed per response. Defaults to 10.
+            chunk_ms (int, optional): Length of each audio delta. Defaults to 40.
+            chunk_interval (float, optional): Seconds between audio deltas, 0 sends them in a burst. Defaults to 0.0.
+            latency (float, optional): Seconds every server event is held back before it is written, a stand-in for
+                the network round trip. Events stay in order and are not delayed by each other. Defaults to 0.0.
+            request_limit (int, optional): `response.create` allowed per `limit_window` across all connections,
+                answered with `rate_limits.updated` or a `rate_limit_exceeded` error. 0 disables it. Defaults to 0.
+            limit_window (float, optional): Seconds the request limit refills over. Defaults to 60.0.
+            record (bool, optional): Keep every client event in `received`, off for long load tests.
+                Defaults to True.
+            serve_kwargs: Passed on to `websockets.asyncio.server.serve`.
+        """
+        self.hostname = hostname
+        self.port = port
+        self.audio_chunks = audio_chunks
+        self.chunk_interval = chunk_interval
+        self.latency = latency
+        self.request_limit = request_limit
+        self.limit_window = limit_window
+        self.rate_limited = 0
+        self._requests = float(request_limit)
+        self._requests_updated = time.monotonic()
+        self.record = record
+        self.serve_kwargs = serve_kwargs
+        self.received: list[dict] = []
+        self.connections = 0
+        self.server = None
+        self._outbox: dict[ServerConnection, asyncio.Queue] = {}
+        # noise rather than silence, so compression sees something close to real audio
+        noise = random.Random(0).randbytes(DEFAULT_FREQUENCY * chunk_ms // 1000 * 2)
+        self._delta = base64.b64encode(noise).decode("ascii")
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.hostname}:{self.port}"
+
+    async def start(self) -> str:
+        """Start listening and return the url to connect to."""
+        self.server = await serve(self._handler, self.hostname, self.port, **self.serve_kwargs)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.url
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def __aenter__(self) -> "FakeRealtimeServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _send(self, websocket: ServerConnection, event_type: str, **data):
+        message = json.dumps({"event_id": generate_id("event_"), "type": event_type, **data})
+        if self.latency:
+            self._outbox[websocket].put_nowait((asyncio.get_running_loop().time() + self.latency, message))
+        else:
+            await websocket.send(message)
+
+    async def _delayed_writer(self, websocket: ServerConnection, outbox: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            due, message = await outbox.get()
+            if (delay := due - loop.time()) > 0:
+                await asyncio.sleep(delay)
+            await websocket.send(message)
+
+    async def _take_request(self, websocket: ServerConnection) -> bool:
+        """Refill the request limit linearly over the window and take one request from it if available."""
+        now = time.monotonic()
+        limit, window = self.request_limit, self.limit_window
+        self._requests = min(limit, self._requests + (now - self._requests_updated) * limit / window)
+        self._requests_updated = now
+        if self._requests < 1:
+            self.rate_limited += 1
+            error = {"type": "invalid_request_error", "code": "rate_limit_exceeded", "message": "Rate limit reached"}
+            await self._send(websocket, "error", error=error)
+            return False
+        self._requests -= 1
+        reset_seconds = round((limit - self._requests) * window / limit, 3)
+        remaining = int(self._requests)
+        limits = [{"name": "requests", "limit": limit, "remaining": remaining, "reset_seconds": reset_seconds}]
+        await self._send(websocket, "rate_limits.updated", rate_limits=limits)
+        return True
+
+    async def _stream_response(self, websocket: ServerConnection, cancelled: asyncio.Event):
+        response_id, item_id = generate_id("resp_"), generate_id("item_")
+        ids = {"response_id": response_id, "item_id": item_id, "output_index": 0, "content_index": 0}
+        await self._send(websocket, "response.created", response={"id": response_id, "status": "in_progress"})
+        for _ in range(self.audio_chunks):
+            if cancelled.is_set():
+                break
+            await self._send(websocket, "response.audio.delta", delta=self._delta, **ids)
+            if self.chunk_interval:
+                await asyncio.sleep(self.chunk_interval)
+        await self._send(websocket, "response.audio.done", **ids)
+        status = "cancelled" if cancelled.is_set() else "completed"
+        await self._send(websocket, "response.done", response={"id": response_id, "status": status})
+
+    async def _handler(self, websocket: ServerConnection):
+        self.connections += 1
+        session = {"id": generate_id("sess_"), "modalities": ["text", "audio"]}
+        cancelled = asyncio.Event()
+        responses = set()
+        if self.latency:
+            self._outbox[websocket] = asyncio.Queue()
+            responses.add(asyncio.create_task(self._delayed_writer(websocket, self._outbox[websocket])))
+        await self._send(websocket, "session.created", session=session)
+
+        async for message in websocket:
+            event = json.loads(message)
+            if self.record:
+                self.received.append(event)
+            match event.get("type"):
+                case "session.update":
+                    session.update(event.get("session", {}))
+                    await self._send(websocket, "session.updated", session=session)
+                case "input_audio_buffer.commit":
+                    await self._send(websocket, "input_audio_buffer.committed", item_id=generate_id("item_"))
+                case "input_audio_buffer.clear":
+                    await self._send(websocket, "input_audio_buffer.cleared")
+                case "conversation.item.truncate":
+                    fields = {key: event.get(key) for key in ("item_id", "content_index", "audio_end_ms")}
+                    await self._send(websocket, "conversation.item.truncated", **fields)
+                case "response.create":
+                    if self.request_limit and not await self._take_request(websocket):
+                        continue
+                    cancelled.clear()
+                    task = asyncio.create_task(self._stream_response(websocket, cancelled))
+                    responses.add(task)
+                    task.add_done_callback(responses.discard)
+                case "response.cancel":
+                    cancelled.set()
+
+        for task in responses:
+            task.cancel()
+        self._outbox.pop(websocket, None)
@@ -0,0 +1,196 @@
+"""Barge-in handling: cancel and truncate the assistant as soon as the user starts talking."""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from pyoai_realtime.audio_fast_path import AudioDelta
+from pyoai_realtime.constants import DEFAULT_FREQUENCY
+from pyoai_realtime.event_functions import EventFunctionsMixin
+from pyoai_realtime.event_handler import HandlerPriority
+from pyoai_realtime.realtime_events import Registry, conversation_events, input_audio_buffer_events, response_events
+from pyoai_realtime.utils import generate_id
+
+
+def base64_decoded_size(data: str) -> int:
+    """Size in bytes of the decoded base64 `data`, without decoding it."""
+    padding = 2 if data.endswith("==") else 1 if data.endswith("=") else 0
+    return len(data) * 3 // 4 - padding
+
+
+@dataclass
+class PlaybackPosition:
+    """
+    Audio accounting for a single assistant item.
+
+    Attributes:
+        item_id (str): The item the audio belongs to.
+        content_index (int): The content part holding the audio.
+        received (int): Samples received through `response.audio.delta`.
+        played (int): Samples the playback sink reported as played out.
+    """
+
+    item_id: str
+    content_index: int = 0
+    received: int = 0
+    played: int = 0
+
+    @property
+    def pending(self) -> int:
+        return self.received - self.played
+
+
+class InterruptionController:
+    """
+    Tracks assistant playback per item and interrupts it when `input_audio_buffer.speech_started` arrives.
+
+    The playback sink reports what it actually played with `played` (received audio is tracked from the audio deltas),
+    on speech start `response.cancel` and `conversation.item.truncate` are sent right away with `audio_end_ms` set
+    to the played out position, so the server side transcript matches what the user heard.
+
+        controller = InterruptionController(api, on_interrupt=lambda item_id, end_ms: jitter_buffer.clear())
+        controller.attach()
+        ...
+        controller.played(item_id, len(frame) // 2)
+    """
+
+    def __init__(
+        self,
+        api,
+        sample_rate: int = DEFAULT_FREQUENCY,
+        processor: EventFunctionsMixin = None,
+        on_interrupt: Callable[[str, int], Any] = None,
+    ):
+        """
+        Args:
+            api (RealtimeAPI): The api used to receive server events and send the cancel/truncate.
+            sample_rate (int, optional): Sample rate of the assistant audio. Defaults to DEFAULT_FREQUENCY.
+            processor (EventFunctionsMixin, optional): Conversation state to truncate locally without waiting for
+                `conversation.item.truncated`. Defaults to None.
+            on_interrupt (Callable[[str, int], Any], optional): Called (or awaited) with the item id and
+                `audio_end_ms` once an interruption was sent, e.g. to flush the playback buffer. Defaults to None.
+        """
+        self.api = api
+        self.sample_rate = sample_rate
+        self.processor = processor
+        self.on_interrupt = on_interrupt
+        self.positions: dict[str, PlaybackPosition] = {}
+        self.responding = False
+        self.interruptions = 0
+        self._playing: PlaybackPosition = None
+        self._latest: PlaybackPosition = None
+
+    def attach(self) -> "InterruptionController":
+        """Register the controller on the api's server events."""
+        self.api.on(f"server.{response_events.Created.type}", self._on_response_created, HandlerPriority.CRITICAL)
+        self.api.on(f"server.{response_events.Done.type}", self._on_response_done, HandlerPriority.CRITICAL)
+        if getattr(self.api, "audio_fast_path", False):
+            self.api.add_audio_sink(self._on_audio_frame)
+        else:
+            self.api.on(f"server.{response_events.AudioDelta.type}", self._on_audio_delta, HandlerPriority.CRITICAL)
+        self.api.on(
+            f"server.{input_audio_buffer_events.SpeechStarted.type}", self._on_speech_started, HandlerPriority.CRITICAL
+        )
+        return self
+
+    def detach(self):
+        """Remove the handlers registered by `attach`."""
+        self.api.off(f"server.{response_events.Created.type}", self._on_response_created)
+        self.api.off(f"server.{response_events.Done.type}", self._on_response_done)
+        if getattr(self.api, "audio_fast_path", False):
+            self.api.remove_audio_sink(self._on_audio_frame)
+        else:
+            self.api.off(f"server.{response_events.AudioDelta.type}", self._on_audio_delta)
+        self.api.off(f"server.{input_audio_buffer_events.SpeechStarted.type}", self._on_speech_started)
+
+    def _on_response_created(self, event: dict):
+        self.responding = True
+
+    def _on_response_done(self, event: dict):
+        self.responding = False
+
+    def _on_audio_delta(self, event: dict):
+        self.received(event["item_id"], base64_decoded_size(event["delta"]) // 2, event.get("content_index", 0))
+
+    def _on_audio_frame(self, frame: AudioDelta):
+        self.received(frame.item_id, len(frame.pcm) // 2, frame.content_index)
+
+    async def _on_speech_started(self, event: dict):
+        await self.interrupt()
+
+    def _position(self, item_id: str, content_index: int = 0) -> PlaybackPosition:
+        if (position := self.positions.get(item_id)) is None:
+            position = self.positions[item_id] = PlaybackPosition(item_id, content_index)
+        return position
+
+    def received(self, item_id: str, n_samples: int, content_index: int = 0):
+        """Account for `n_samples` of assistant audio received for `item_id`."""
+        position = self._position(item_id, content_index)
+        position.received += n_samples
+        self._latest = position
+
+    def played(self, item_id: str, n_samples: int):
+        """Account for `n_samples` of `item_id` played out by the sink."""
+        position = self._position(item_id)
+        position.played += n_samples
+        self._playing = position
+
+    def audio_end_ms(self, item_id: str) -> int:
+        """The played out position of `item_id` in milliseconds."""
+        if (position := self.positions.get(item_id)) is None:
+            return 0
+        return position.played * 1000 // self.sample_rate
+
+    @property
+    def interruptible(self) -> bool:
+        """True while a response is being generated or received audio is still waiting to be played."""
+        return self.responding or self._target() is not None
+
+    def _target(self) -> PlaybackPosition | None:
+        # the item being heard, or the newest one if the sink has not started on it yet. an item that played out
+        # completely is left alone, e.g. the previous one while a new response has no audio yet
+        for position in (self._playing, self._latest):
+            if position is not None and position.pending > 0:
+                return position
+        return None
+
+    async def interrupt(self) -> bool:
+        """
+        Cancel the active response and truncate the audible item at its played out position.
+
+        Returns:
+            bool: True if anything was interrupted.
+        """
+        if not self.interruptible:
+            return False
+
+        target = self._target()
+        sends = []
+        if self.responding:
+            sends.append(self.api.send(response_events.Cancel.type))
+            self.responding = False
+
+        audio_end_ms = 0
+        if target is not None:
+            audio_end_ms = self.audio_end_ms(target.item_id)
+            truncate = {"item_id": target.item_id, "content_index": target.content_index, "audio_end_ms": audio_end_ms}
+            sends.append(self.api.send(conversation_events.Truncate.type, truncate))
+            self._truncate_local(truncate)
+            target.received = target.played
+
+        await asyncio.gather(*sends)
+        self.interruptions += 1
+
+        if self.on_interrupt and target is not None:
+            if asyncio.iscoroutine(out := self.on_interrupt(target.item_id, audio_end_ms)):
+                await out
+        return True
+
+    def _truncate_local(self, truncate: dict):
+        if self.processor is None or truncate["item_id"] not in self.processor.conversation.item_lookup:
+            return
+        event = Registry.factory(
+            {"event_id": generate_id("evt_"), "type": conversation_events.Truncated.type, **truncate},
+            as_copy=False,
+        )
+        self.processor._converstaion_item_truncated(event)
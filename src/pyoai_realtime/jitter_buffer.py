@@ -0,0 +1,296 @@
+"""Jitter buffer that turns bursty `response.audio.delta` events into a steady playback feed."""
+
+import asyncio
+import base64
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable
+
+from pyoai_realtime.audio_fast_path import AudioDelta
+from pyoai_realtime.constants import DEFAULT_FREQUENCY
+from pyoai_realtime.event_handler import HandlerPriority
+from pyoai_realtime.realtime_events import response_events
+
+
+@dataclass
+class JitterBufferStats:
+    """
+    Counters for a `JitterBuffer`.
+
+    Attributes:
+        underruns (int): Reads that ran dry while more audio was expected.
+        overruns (int): Pushes that overflowed the capacity and dropped the oldest audio.
+        samples_read (int): Audio samples handed to the sink (silence excluded).
+        samples_dropped (int): Audio samples discarded by overruns.
+        silence_samples (int): Silence samples handed out while prebuffering or after an underrun.
+        target_delay_ms (int): The current adaptive target delay.
+    """
+
+    underruns: int = 0
+    overruns: int = 0
+    samples_read: int = 0
+    samples_dropped: int = 0
+    silence_samples: int = 0
+    target_delay_ms: int = 0
+
+
+@dataclass
+class _ItemAudio:
+    data: bytearray = field(default_factory=bytearray)
+    offset: int = 0
+    done: bool = False
+    next_seq: int = 0
+    pending: dict[int, bytes] = field(default_factory=dict)
+
+    @property
+    def available(self) -> int:
+        return len(self.data) - self.offset
+
+    def take(self, n_bytes: int) -> memoryview:
+        chunk = memoryview(self.data)[self.offset : self.offset + n_bytes]
+        self.offset += len(chunk)
+        return chunk
+
+    def compact(self):
+        # drop consumed bytes once they make up most of the buffer, keeps appends amortized O(1)
+        if self.offset and self.offset >= len(self.data) // 2:
+            del self.data[: self.offset]
+            self.offset = 0
+
+
+class JitterBuffer:
+    """
+    Per item playback buffer with an adaptive target delay.
+
+    Deltas are accumulated per item (optionally reordered by sequence number) and items play back in the order they
+    started. Playback only starts once `target_delay_ms` of audio is buffered, every underrun raises the target delay
+    by a frame and a long run without underruns lowers it again. Sinks pull fixed size frames with `read`, or iterate
+    `frames` for a paced 20ms cadence.
+
+        buffer = JitterBuffer(on_played=controller.played).attach(api)
+        frame = buffer.read(480)  # memoryview with 20ms of PCM16 at 24kHz
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = DEFAULT_FREQUENCY,
+        frame_ms: int = 20,
+        target_delay_ms: int = 60,
+        min_delay_ms: int = 20,
+        max_delay_ms: int = 500,
+        capacity_ms: int = 30_000,
+        relax_after_frames: int = 250,
+        on_played: Callable[[str, int], Any] = None,
+    ):
+        """
+        Args:
+            sample_rate (int, optional): Sample rate of the PCM16 audio. Defaults to DEFAULT_FREQUENCY.
+            frame_ms (int, optional): Frame length for `frames` and the delay adaptation step. Defaults to 20.
+            target_delay_ms (int, optional): Initial amount of audio buffered before playback starts. Defaults to 60.
+            min_delay_ms (int, optional): Lower bound for the adaptive delay. Defaults to 20.
+            max_delay_ms (int, optional): Upper bound for the adaptive delay. Defaults to 500.
+            capacity_ms (int, optional): Buffered audio above this is an overrun, the oldest audio is dropped.
+                Defaults to 30_000.
+            relax_after_frames (int, optional): Frames without an underrun before the delay is lowered a step.
+                Defaults to 250 (5 seconds of 20ms frames).
+            on_played (Callable[[str, int], Any], optional): Called with `(item_id, n_samples)` for the audio handed
+                out by `read`, e.g. `InterruptionController.played`. Defaults to None.
+        """
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.frame_ms = frame_ms
+        self.min_delay_ms = min_delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.capacity_ms = capacity_ms
+        self.relax_after_frames = relax_after_frames
+        self.on_played = on_played
+        self.stats = JitterBufferStats(target_delay_ms=target_delay_ms)
+        self.items: OrderedDict[str, _ItemAudio] = OrderedDict()
+        self.playing = False
+        self._out = bytearray()
+        self._frames_since_underrun = 0
+        self._buffered = 0  # bytes
+
+    def attach(self, api) -> "JitterBuffer":
+        """Feed the buffer from an api's audio delta events."""
+        self.api = api
+        if getattr(api, "audio_fast_path", False):
+            api.add_audio_sink(self._on_audio_frame)
+        else:
+            api.on(f"server.{response_events.AudioDelta.type}", self._on_audio_delta, HandlerPriority.CRITICAL)
+        api.on(f"server.{response_events.AudioDone.type}", self._on_audio_done, HandlerPriority.CRITICAL)
+        return self
+
+    def detach(self):
+        """Remove the handlers registered by `attach`."""
+        if getattr(self.api, "audio_fast_path", False):
+            self.api.remove_audio_sink(self._on_audio_frame)
+        else:
+            self.api.off(f"server.{response_events.AudioDelta.type}", self._on_audio_delta)
+        self.api.off(f"server.{response_events.AudioDone.type}", self._on_audio_done)
+
+    def _on_audio_delta(self, event: dict):
+        self.push(event["item_id"], base64.b64decode(event["delta"]))
+
+    def _on_audio_frame(self, frame: AudioDelta):
+        self.push(frame.item_id, frame.pcm)
+
+    def _on_audio_done(self, event: dict):
+        self.end_item(event["item_id"])
+
+    @property
+    def target_delay_ms(self) -> int:
+        return self.stats.target_delay_ms
+
+    @property
+    def buffered_ms(self) -> int:
+        """Milliseconds of audio waiting to be read."""
+        return self._buffered // 2 * 1000 // self.sample_rate
+
+    def _ms_to_bytes(self, ms: int) -> int:
+        return self.sample_rate * ms // 1000 * 2
+
+    def push(self, item_id: str, pcm: bytes, seq: int = None):
+        """
+        Add PCM16 audio for an item.
+
+        Args:
+            item_id (str): The item the audio belongs to.
+            pcm (bytes): PCM16 little-endian mono audio.
+            seq (int, optional): Sequence number of the chunk within the item, chunks arriving ahead of a gap are
+                held until the gap is filled. Defaults to None (arrival order).
+        """
+        if (item := self.items.get(item_id)) is None:
+            item = self.items[item_id] = _ItemAudio()
+
+        if seq is None:
+            item.data += pcm
+            self._buffered += len(pcm)
+        elif seq >= item.next_seq:
+            item.pending[seq] = pcm
+            while (chunk := item.pending.pop(item.next_seq, None)) is not None:
+                item.data += chunk
+                self._buffered += len(chunk)
+                item.next_seq += 1
+
+        if (overflow := self._buffered - self._ms_to_bytes(self.capacity_ms)) > 0:
+            self._drop(overflow)
+
+    def end_item(self, item_id: str):
+        """Mark an item complete, playback moves on to the next item once it is drained."""
+        if item := self.items.get(item_id):
+            item.done = True
+            # anything still held back by a gap is not coming anymore
+            for seq in sorted(item.pending):
+                chunk = item.pending.pop(seq)
+                item.data += chunk
+                self._buffered += len(chunk)
+
+    def _drop(self, n_bytes: int):
+        self.stats.overruns += 1
+        n_bytes += n_bytes % 2
+        for item in self.items.values():
+            dropped = min(n_bytes, item.available)
+            item.offset += dropped
+            item.compact()
+            self._buffered -= dropped
+            self.stats.samples_dropped += dropped // 2
+            n_bytes -= dropped
+            if not n_bytes:
+                break
+
+    def clear(self, item_id: str = None):
+        """
+        Drop buffered audio, e.g. after an interruption.
+
+        Args:
+            item_id (str, optional): Only drop this item. Defaults to None (everything).
+        """
+        for key in [item_id] if item_id else list(self.items):
+            if item := self.items.pop(key, None):
+                self._buffered -= item.available
+        if not self.items:
+            self.playing = False
+
+    def _adapt(self, underrun: bool):
+        if underrun:
+            self.stats.underruns += 1
+            self.stats.target_delay_ms = min(self.stats.target_delay_ms + self.frame_ms, self.max_delay_ms)
+            self._frames_since_underrun = 0
+            self.playing = False
+            return
+
+        self._frames_since_underrun += 1
+        if self._frames_since_underrun >= self.relax_after_frames:
+            self.stats.target_delay_ms = max(self.stats.target_delay_ms - self.frame_ms, self.min_delay_ms)
+            self._frames_since_underrun = 0
+
+    def read(self, n_samples: int) -> memoryview:
+        """
+        Pull the next `n_samples` of playback audio, padded with silence while prebuffering or on underrun.
+
+        Args:
+            n_samples (int): Number of samples the sink wants.
+
+        Returns:
+            memoryview: `n_samples` of PCM16 audio. The view is only valid until the next `read`.
+        """
+        n_bytes = n_samples * 2
+        if len(self._out) != n_bytes:
+            self._out = bytearray(n_bytes)
+        out = memoryview(self._out)
+
+        if not self.playing and self._buffered >= self._ms_to_bytes(self.stats.target_delay_ms):
+            self.playing = True
+        elif not self.playing and self.items and all(item.done for item in self.items.values()):
+            # short responses that never reach the target delay still get played
+            self.playing = True
+
+        written = 0
+        if self.playing:
+            while written < n_bytes and self.items:
+                item_id, item = next(iter(self.items.items()))
+                with item.take(n_bytes - written) as chunk:
+                    size = len(chunk)
+                    out[written : written + size] = chunk
+                written += size
+                self._buffered -= size
+                if self.on_played and size:
+                    self.on_played(item_id, size // 2)
+
+                if not item.available:
+                    if not item.done:
+                        break
+                    self.items.popitem(last=False)
+                else:
+                    item.compact()
+
+            self.stats.samples_read += written // 2
+            if written < n_bytes:
+                # ran dry mid-item means the network fell behind, ran out of items means playback finished
+                self._adapt(underrun=bool(self.items))
+                if not self.items:
+                    self.playing = False
+            else:
+                self._adapt(underrun=False)
+
+        if written < n_bytes:
+            out[written:] = bytes(n_bytes - written)
+            self.stats.silence_samples += (n_bytes - written) // 2
+        return out
+
+    async def frames(self, frame_ms: int = None) -> AsyncIterator[memoryview]:
+        """
+        Yield frames at a steady real time cadence, for sinks without a clock of their own.
+
+        Args:
+            frame_ms (int, optional): Frame length. Defaults to the buffer's `frame_ms`.
+        """
+        frame_ms = frame_ms or self.frame_ms
+        n_samples = self.sample_rate * frame_ms // 1000
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            yield self.read(n_samples)
+            deadline += frame_ms / 1000
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
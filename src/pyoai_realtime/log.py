@@ -1,10 +1,9 @@
 import datetime
+import functools
 import json
 import os
 from enum import StrEnum, auto
 
-from rich.console import Console
-
 
 # Log levels
 class LogLevel(StrEnum):
@@ -29,10 +28,24 @@ class LogLevel(StrEnum):
         return levels.index(self) <= levels.index(other)
 
 
-console = Console()
 LEVEL = LogLevel(os.environ.get("LOGLEVEL", LogLevel.INFO))
 
 
+@functools.cache
+def get_console():
+    """The shared rich console, created (and rich imported) on first use."""
+    from rich.console import Console
+
+    return Console()
+
+
+def __getattr__(name: str):
+    # `log.console` still works, without paying for rich on import
+    if name == "console":
+        return get_console()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def print(*args, _stack_offset: int = 2, **kwargs):
     """Print a message.
 
@@ -40,7 +53,7 @@ def print(*args, _stack_offset: int = 2, **kwargs):
         msg: The message to print.
         kwargs: Keyword arguments to pass to the print function.
     """
-    console.log(*args, _stack_offset=_stack_offset, **kwargs)
+    get_console().log(*args, _stack_offset=_stack_offset, **kwargs)
 
 
 def debug(*args, **kwargs):
@@ -65,6 +78,17 @@ def info(*args, _stack_offset: int = 3, **kwargs):
         print(f"[cyan]Info: {args}[/cyan]", _stack_offset=_stack_offset, **kwargs)
 
 
+def warn(*args, _stack_offset: int = 3, **kwargs):
+    """Print a warning message.
+
+    Args:
+        msg: The warning message.
+        kwargs: Keyword arguments to pass to the print function.
+    """
+    if LEVEL <= LogLevel.WARNING:
+        print(f"[yellow]Warning: {args}[/yellow]", _stack_offset=_stack_offset, **kwargs)
+
+
 def success(*args, **kwargs):
     """Print a success message.
 
@@ -84,7 +108,7 @@ def log(*args, _stack_offset: int = 2, **kwargs):
         kwargs: Keyword arguments to pass to the print function.
     """
     if LEVEL <= LogLevel.INFO:
-        console.log(*args, _stack_offset=_stack_offset, **kwargs)
+        get_console().log(*args, _stack_offset=_stack_offset, **kwargs)
 
 
 def _log(debug: bool = False, *args, **kwargs):
@@ -0,0 +1,250 @@
+"""Event loop lag and websocket buffer monitoring for `RealtimeAPI` and `RealtimeRelay`.
+
+Latency in a busy process usually comes from one of two places: the event loop is saturated (every callback runs
+late) or a websocket's write buffer backs up (the peer or the network does not keep up). A `LoopMonitor` samples both
+every `interval` seconds, together with the frames waiting in each connection's receive queue and the inbound frame
+rate per session, and hands each `MonitorSample` to its hooks.
+
+    monitor = LoopMonitor(interval=1.0, lag_threshold=0.05)
+    monitor.attach(api)  # or a RealtimeRelay, whose client connections are sampled while it serves
+    monitor.add_hook(lambda sample: gauge("loop_lag", sample.loop_lag))
+    monitor.start()
+
+With a `lag_threshold` the monitor is adaptive: while the lag is above it the attached apis skip their non-critical
+handlers (`shed_priority`, background handlers by default), once it falls below `recover_threshold` they are
+restored. Critical and one-shot handlers keep running either way.
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from pyoai_realtime import log
+from pyoai_realtime.event_handler import HandlerPriority, RealtimeEventHandler
+from pyoai_realtime.realtime_conversation import RealtimeRelay
+from pyoai_realtime.utils import percentile as _percentile
+
+MonitorHook = Callable[["MonitorSample"], Any]
+
+
+def _peer_name(address: Any) -> str:
+    # (host, port, ...) for tcp peers, a path (often empty) for unix sockets
+    if isinstance(address, tuple) and len(address) >= 2:
+        return f"{address[0]}:{address[1]}"
+    return address or "unix"
+
+
+@dataclass
+class ConnectionSample:
+    """
+    One websocket connection at sampling time.
+
+    Attributes:
+        name (str): The url of an api, the peer address of a relay client.
+        write_buffer (int): Bytes queued in the transport and not yet accepted by the socket.
+        receive_queue (int): Frames received and not read by the application yet.
+        reading_paused (bool): The receive queue is above its high watermark and reading from the socket stopped.
+        frame_rate (float): Frames read by the application per second since the previous sample.
+    """
+
+    name: str
+    write_buffer: int
+    receive_queue: int
+    reading_paused: bool
+    frame_rate: float
+
+
+@dataclass
+class MonitorSample:
+    """
+    Attributes:
+        time (float): `time.time()` of the sample.
+        loop_lag (float): Seconds the monitor's sleep overran, i.e. how late the loop runs callbacks.
+        connections (list[ConnectionSample]): The sampled connections.
+        shedding (bool): Non-critical handlers are being skipped.
+    """
+
+    time: float
+    loop_lag: float
+    connections: list[ConnectionSample] = field(default_factory=list)
+    shedding: bool = False
+
+    @property
+    def write_buffer(self) -> int:
+        """Bytes waiting to be written across all connections."""
+        return sum(connection.write_buffer for connection in self.connections)
+
+    @property
+    def receive_queue(self) -> int:
+        """Frames waiting to be read across all connections."""
+        return sum(connection.receive_queue for connection in self.connections)
+
+
+@dataclass
+class MonitorStats:
+    """
+    Counters for a `LoopMonitor`.
+
+    Attributes:
+        samples (int): Samples taken.
+        max_lag (float): Highest loop lag seen in seconds.
+        max_write_buffer (int): Largest write buffer of a single connection in bytes.
+        shed (int): Times the monitor started shedding handlers.
+        hook_errors (int): Hooks that raised, they are logged and skipped.
+        lags (deque[float]): The loop lag of the most recent samples.
+    """
+
+    samples: int = 0
+    max_lag: float = 0.0
+    max_write_buffer: int = 0
+    shed: int = 0
+    hook_errors: int = 0
+    lags: deque = field(default_factory=lambda: deque(maxlen=4096))
+
+    def lag_percentile(self, percentile: float) -> float:
+        """Loop lag in seconds at `percentile` (0-100) over the recent samples."""
+        return _percentile(self.lags, percentile)
+
+
+class LoopMonitor:
+    """Samples loop lag and websocket buffers of the attached apis and relays, and sheds handlers under load."""
+
+    def __init__(
+        self,
+        interval: float = 1.0,
+        lag_threshold: float = None,
+        recover_threshold: float = None,
+        shed_priority: HandlerPriority = HandlerPriority.BACKGROUND,
+    ):
+        """
+        Args:
+            interval (float, optional): Seconds between samples. Defaults to 1.0.
+            lag_threshold (float, optional): Loop lag in seconds above which non-critical handlers are shed, None
+                only samples. Defaults to None.
+            recover_threshold (float, optional): Loop lag in seconds below which shed handlers are restored.
+                Defaults to half of `lag_threshold`.
+            shed_priority (HandlerPriority, optional): `BACKGROUND` sheds the deferred handlers, `NORMAL` the inline
+                ones as well. Defaults to `BACKGROUND`.
+        """
+        if shed_priority is HandlerPriority.CRITICAL:
+            raise ValueError("Critical handlers can not be shed")
+        self.interval = interval
+        self.lag_threshold = lag_threshold
+        self.recover_threshold = recover_threshold if recover_threshold is not None else (lag_threshold or 0) / 2
+        self.shed_priority = shed_priority
+        self.targets: list[RealtimeEventHandler | RealtimeRelay] = []
+        self.hooks: list[MonitorHook] = []
+        self.stats = MonitorStats()
+        self.shedding = False
+        self.task: asyncio.Task = None
+        # frames seen per connection at the previous sample, for the rates
+        self._frames: dict[Any, tuple[int, float]] = {}
+
+    def attach(self, target: RealtimeEventHandler | RealtimeRelay):
+        """Sample `target`'s connections, and shed its handlers while overloaded if it is an api."""
+        if target not in self.targets:
+            self.targets.append(target)
+            if self.shedding and isinstance(target, RealtimeEventHandler):
+                target.shed_priority = self.shed_priority
+
+    def detach(self, target: RealtimeEventHandler | RealtimeRelay):
+        if target in self.targets:
+            self.targets.remove(target)
+            if isinstance(target, RealtimeEventHandler):
+                target.shed_priority = None
+
+    def add_hook(self, hook: MonitorHook) -> MonitorHook:
+        """Call (or await) `hook` with every `MonitorSample`."""
+        self.hooks.append(hook)
+        return hook
+
+    def remove_hook(self, hook: MonitorHook):
+        self.hooks.remove(hook)
+
+    def start(self) -> asyncio.Task:
+        """Start sampling in a task on the running loop."""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run(), name="loop_monitor")
+        return self.task
+
+    async def stop(self):
+        """Stop sampling and restore any shed handlers."""
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        self._shed(False)
+
+    async def run(self):
+        """Sample every `interval` seconds until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            await self.emit(self.sample(max(0.0, loop.time() - start - self.interval)))
+
+    def sample(self, loop_lag: float) -> MonitorSample:
+        """Sample the attached connections, record `loop_lag` and shed or restore handlers accordingly."""
+        now = time.monotonic()
+        connections = []
+        seen = set()
+        for target in self.targets:
+            if isinstance(target, RealtimeRelay):
+                for websocket, session in target.sessions.items():
+                    name = _peer_name(websocket.remote_address)
+                    connections.append(self._connection(websocket, websocket, name, session.frames_received, now))
+                    seen.add(websocket)
+            elif (websocket := getattr(target, "ws", None)) is not None:
+                connections.append(self._connection(target, websocket, target.url, target.frames_received, now))
+                seen.add(target)
+        # forget connections that are gone
+        for key in self._frames.keys() - seen:
+            del self._frames[key]
+
+        stats = self.stats
+        stats.samples += 1
+        stats.lags.append(loop_lag)
+        stats.max_lag = max(stats.max_lag, loop_lag)
+        for connection in connections:
+            stats.max_write_buffer = max(stats.max_write_buffer, connection.write_buffer)
+
+        if self.lag_threshold is not None:
+            if loop_lag > self.lag_threshold and not self.shedding:
+                log.warn(f"Loop lag {loop_lag * 1000:.1f} ms, shedding {self.shed_priority.name} handlers")
+                stats.shed += 1
+                self._shed(True)
+            elif loop_lag < self.recover_threshold and self.shedding:
+                self._shed(False)
+        return MonitorSample(time.time(), loop_lag, connections, self.shedding)
+
+    def _connection(self, key: Any, websocket: Any, name: str, frames: int, now: float) -> ConnectionSample:
+        previous, then = self._frames.get(key, (frames, now))
+        self._frames[key] = (frames, now)
+        transport = getattr(websocket, "transport", None)
+        # the receive queue is internal to websockets' asyncio implementation, report it empty where it differs
+        messages = getattr(websocket, "recv_messages", None)
+        frames_queue = getattr(messages, "frames", None)
+        return ConnectionSample(
+            name=name,
+            write_buffer=transport.get_write_buffer_size() if transport is not None else 0,
+            receive_queue=len(frames_queue) if frames_queue is not None else 0,
+            reading_paused=bool(getattr(messages, "paused", False)),
+            frame_rate=(frames - previous) / (now - then) if now > then else 0.0,
+        )
+
+    def _shed(self, shedding: bool):
+        self.shedding = shedding
+        for target in self.targets:
+            if isinstance(target, RealtimeEventHandler):
+                target.shed_priority = self.shed_priority if shedding else None
+
+    async def emit(self, sample: MonitorSample):
+        """Hand `sample` to every hook."""
+        for hook in tuple(self.hooks):
+            try:
+                _ = await hook(sample) if asyncio.iscoroutinefunction(hook) else hook(sample)
+            except Exception as err:
+                self.stats.hook_errors += 1
+                log.warn(f"Monitor hook {hook!r} failed: {err!r}")
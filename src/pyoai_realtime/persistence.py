@@ -0,0 +1,413 @@
+"""Durable conversation state: an append-only journal of applied events plus periodic checkpoints.
+
+`ConversationJournal` sits in front of an `EventFunctionsMixin` processor. Every event it applies is appended to a
+`ConversationStore`, and every `checkpoint_every` events the whole conversation is written as a checkpoint. Resuming
+a session (after a worker crash, or in another process) loads the latest checkpoint and replays only the events
+journaled after it, instead of the whole websocket history.
+
+    store = SQLiteStore("conversations.db")
+    journal = ConversationJournal(store, session_id, processor).attach(api)
+    ...
+    journal = ConversationJournal.resume(store, session_id, processor)
+"""
+
+import base64
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from typing import Any, Iterable, Iterator
+
+from pyoai_realtime import log
+from pyoai_realtime.event_functions import ConversationInterface, EventFunctionsMixin
+from pyoai_realtime.event_handler import HandlerPriority
+from pyoai_realtime.realtime_events import Registry
+from pyoai_realtime.text_builder import TextBuilder
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, TextBuilder):
+        return {"$text": value.text}
+    if isinstance(value, array):
+        return {"$pcm16": base64.b64encode(value.tobytes()).decode("ascii")}
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"$bytes": base64.b64encode(value).decode("ascii")}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode(obj: dict) -> Any:
+    if len(obj) == 1:
+        if "$text" in obj:
+            return TextBuilder(obj["$text"])
+        if "$pcm16" in obj:
+            return array("h", base64.b64decode(obj["$pcm16"]))
+        if "$bytes" in obj:
+            return base64.b64decode(obj["$bytes"])
+    return obj
+
+
+def dump_conversation(convo: ConversationInterface) -> str:
+    """Serialize a conversation to json, text builders and audio included."""
+    state = {
+        "items": convo.items,
+        "item_ids": list(convo.item_lookup),
+        "responses": convo.responses,
+        "queued_speech_items": convo.queued_speech_items,
+        "queued_transcript_items": convo.queued_transcript_items,
+        "queued_input_audio": convo.queued_input_audio,
+    }
+    return json.dumps(state, default=_encode, separators=(",", ":"))
+
+
+def load_conversation(data: str, convo: ConversationInterface = None) -> ConversationInterface:
+    """Restore a conversation from `dump_conversation` output, into `convo` if given."""
+    state = json.loads(data, object_hook=_decode)
+    convo = convo or ConversationInterface()
+    convo.clear()
+    convo.items = state["items"]
+    by_id = {item["id"]: item for item in convo.items}
+    # deleted items stay in `items` but leave the lookup
+    convo.item_lookup = {item_id: by_id[item_id] for item_id in state["item_ids"]}
+    convo.responses = state["responses"]
+    convo.response_lookup = {response["id"]: response for response in convo.responses}
+    convo.queued_speech_items = state["queued_speech_items"]
+    convo.queued_transcript_items = state["queued_transcript_items"]
+    convo.queued_input_audio = state["queued_input_audio"]
+    return convo
+
+
+class ConversationStore(ABC):
+    """
+    Storage for journaled events and checkpoints, keyed by session id.
+
+    Sequence numbers start at 1 and increase by one per appended event within a session.
+    """
+
+    @abstractmethod
+    def append(self, session_id: str, events: list[dict]) -> int:
+        """Append `events` to the session journal and return the sequence number of the last one."""
+
+    @abstractmethod
+    def events(self, session_id: str, after: int = 0) -> Iterator[tuple[int, dict]]:
+        """Yield `(seq, event)` for the events journaled after sequence number `after`, in order."""
+
+    @abstractmethod
+    def save_checkpoint(self, session_id: str, seq: int, state: str, compact: bool = False):
+        """Store the serialized conversation as of `seq`, drop the events it covers when `compact` is set."""
+
+    @abstractmethod
+    def load_checkpoint(self, session_id: str) -> tuple[int, str] | None:
+        """The latest `(seq, state)` checkpoint of a session, None if there is none."""
+
+    @abstractmethod
+    def last_seq(self, session_id: str) -> int:
+        """Sequence number of the last journaled event, 0 for a new session."""
+
+    @abstractmethod
+    def sessions(self) -> list[str]:
+        """Ids of the sessions with a journal or a checkpoint, sorted."""
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Remove the journal and checkpoint of a session."""
+
+    def close(self):
+        pass
+
+
+class MemoryStore(ConversationStore):
+    """In-process store, for tests and for migrating sessions between loops of one process."""
+
+    def __init__(self):
+        self._events: dict[str, list[tuple[int, dict]]] = {}
+        self._checkpoints: dict[str, tuple[int, str]] = {}
+        self._last: dict[str, int] = {}
+
+    def append(self, session_id: str, events: list[dict]) -> int:
+        journal = self._events.setdefault(session_id, [])
+        seq = self._last.get(session_id, 0)
+        for event in events:
+            seq += 1
+            journal.append((seq, json.loads(json.dumps(event))))
+        self._last[session_id] = seq
+        return seq
+
+    def events(self, session_id: str, after: int = 0) -> Iterator[tuple[int, dict]]:
+        for seq, event in self._events.get(session_id, []):
+            if seq > after:
+                yield seq, event
+
+    def save_checkpoint(self, session_id: str, seq: int, state: str, compact: bool = False):
+        self._checkpoints[session_id] = (seq, state)
+        if compact:
+            self._events[session_id] = [entry for entry in self._events.get(session_id, []) if entry[0] > seq]
+
+    def load_checkpoint(self, session_id: str) -> tuple[int, str] | None:
+        return self._checkpoints.get(session_id)
+
+    def last_seq(self, session_id: str) -> int:
+        return self._last.get(session_id, 0)
+
+    def sessions(self) -> list[str]:
+        return sorted(self._last.keys() | self._checkpoints.keys())
+
+    def delete(self, session_id: str):
+        for table in (self._events, self._checkpoints, self._last):
+            table.pop(session_id, None)
+
+
+class SQLiteStore(ConversationStore):
+    """
+    SQLite backed store.
+
+    The journal is a `WITHOUT ROWID` table clustered on `(session_id, seq)`, so appends and replays of a session are
+    sequential b-tree scans. WAL mode with `synchronous=NORMAL` keeps an append to a single fsync-free write, a crash
+    can lose the last transactions but never corrupts the journal.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS events (
+            session_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (session_id, seq)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            session_id TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL,
+            state TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        """
+        Args:
+            path (str, optional): Database file, shared by all sessions. Defaults to ":memory:".
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(self.SCHEMA)
+
+    def append(self, session_id: str, events: list[dict]) -> int:
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                seq = self._last_seq(session_id)
+                rows = []
+                for event in events:
+                    seq += 1
+                    rows.append((session_id, seq, event.get("type", ""), json.dumps(event, separators=(",", ":"))))
+                self.db.executemany("INSERT INTO events VALUES (?, ?, ?, ?)", rows)
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+        return seq
+
+    def events(self, session_id: str, after: int = 0) -> Iterator[tuple[int, dict]]:
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT seq, data FROM events WHERE session_id = ? AND seq > ? ORDER BY seq", (session_id, after)
+            ).fetchall()
+        for seq, data in rows:
+            yield seq, json.loads(data)
+
+    def save_checkpoint(self, session_id: str, seq: int, state: str, compact: bool = False):
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                self.db.execute(
+                    "INSERT INTO checkpoints VALUES (?, ?, ?) "
+                    "ON CONFLICT (session_id) DO UPDATE SET seq = excluded.seq, state = excluded.state",
+                    (session_id, seq, state),
+                )
+                if compact:
+                    # the checkpoint row carries the sequence number forward
+                    self.db.execute("DELETE FROM events WHERE session_id = ? AND seq <= ?", (session_id, seq))
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+
+    def load_checkpoint(self, session_id: str) -> tuple[int, str] | None:
+        with self._lock:
+            row = self.db.execute("SELECT seq, state FROM checkpoints WHERE session_id = ?", (session_id,)).fetchone()
+        return tuple(row) if row else None
+
+    def _last_seq(self, session_id: str) -> int:
+        row = self.db.execute("SELECT MAX(seq) FROM events WHERE session_id = ?", (session_id,)).fetchone()
+        checkpoint = self.db.execute("SELECT seq FROM checkpoints WHERE session_id = ?", (session_id,)).fetchone()
+        return max(row[0] or 0, checkpoint[0] if checkpoint else 0)
+
+    def last_seq(self, session_id: str) -> int:
+        with self._lock:
+            return self._last_seq(session_id)
+
+    def sessions(self) -> list[str]:
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT session_id FROM events UNION SELECT session_id FROM checkpoints ORDER BY session_id"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                self.db.execute("DELETE FROM events WHERE session_id = ?", (session_id,))
+                self.db.execute("DELETE FROM checkpoints WHERE session_id = ?", (session_id,))
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+
+class ConversationJournal:
+    """
+    Applies server events to a processor's conversation and journals them.
+
+    Only events the processor handles (its `event_processor` table) change the conversation, so only those are
+    journaled. Appends are batched: the buffer is written every `flush_every` events, on `flush()` and before every
+    checkpoint. Events still in the buffer are lost if the process dies.
+
+    Response audio is not part of it: the processor has no `response.audio.delta` handler, so keep audio that has to
+    survive a resume yourself, e.g. with an audio sink. Input audio queued on the conversation is kept.
+    """
+
+    def __init__(
+        self,
+        store: ConversationStore,
+        session_id: str,
+        processor: EventFunctionsMixin,
+        checkpoint_every: int = 1000,
+        flush_every: int = 32,
+        compact: bool = True,
+    ):
+        """
+        Args:
+            store (ConversationStore): Where events and checkpoints go.
+            session_id (str): Key of this conversation in the store.
+            processor (EventFunctionsMixin): Applies events to `processor.conversation`, with its `event_processor`
+                table registered.
+            checkpoint_every (int, optional): Events between checkpoints, 0 disables automatic checkpoints.
+                Defaults to 1000.
+            flush_every (int, optional): Events buffered before they are appended to the store. Defaults to 32.
+            compact (bool, optional): Drop journaled events once a checkpoint covers them. Defaults to True.
+        """
+        self.store = store
+        self.session_id = session_id
+        self.processor = processor
+        self.checkpoint_every = checkpoint_every
+        self.flush_every = flush_every
+        self.compact = compact
+        self.api = None
+        self.seq = store.last_seq(session_id)
+        self._checkpoint_seq = self.seq
+        self._pending: list[dict] = []
+
+    @property
+    def conversation(self) -> ConversationInterface:
+        return self.processor.conversation
+
+    @classmethod
+    def resume(cls, store: ConversationStore, session_id: str, processor: EventFunctionsMixin, **kwargs):
+        """
+        Rebuild `processor.conversation` from the latest checkpoint plus the events journaled after it.
+
+        Returns:
+            ConversationJournal: A journal that continues the session.
+        """
+        after = 0
+        if checkpoint := store.load_checkpoint(session_id):
+            after, state = checkpoint
+            load_conversation(state, processor.conversation)
+        else:
+            processor.conversation.clear()
+
+        for _, event in store.events(session_id, after):
+            cls._apply(processor, event)
+
+        journal = cls(store, session_id, processor, **kwargs)
+        journal._checkpoint_seq = after
+        return journal
+
+    @staticmethod
+    def _apply(processor: EventFunctionsMixin, event: dict) -> dict | None:
+        if (handler := processor.event_processor.get(event["type"])) is None:
+            return None
+        return handler(Registry.factory(event, as_copy=False))
+
+    def apply(self, event: dict) -> dict | None:
+        """
+        Apply a server event to the conversation and journal it.
+
+        Returns:
+            dict | None: The processor's `{"item": ..., "delta": ...}` result, None for events it ignores.
+        """
+        if (handler := self.processor.event_processor.get(event["type"])) is None:
+            return None
+        # the factory copies the event, so the journal keeps it as it arrived
+        result = handler(Registry.factory(event))
+        self._pending.append(event)
+        self.seq += 1
+
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+        if self.checkpoint_every and self.seq - self._checkpoint_seq >= self.checkpoint_every:
+            self.checkpoint()
+        return result
+
+    def extend(self, events: Iterable[dict]):
+        for event in events:
+            self.apply(event)
+
+    def flush(self) -> int:
+        """Append the buffered events to the store, returns the last journaled sequence number."""
+        if self._pending:
+            self.seq = self.store.append(self.session_id, self._pending)
+            self._pending = []
+        return self.seq
+
+    def checkpoint(self):
+        """Write the whole conversation as of now, later resumes replay only what follows."""
+        seq = self.flush()
+        self.store.save_checkpoint(self.session_id, seq, dump_conversation(self.conversation), compact=self.compact)
+        self._checkpoint_seq = seq
+
+    def attach(self, api, priority: HandlerPriority = HandlerPriority.NORMAL) -> "ConversationJournal":
+        """
+        Journal every server event of `api`.
+
+        With `HandlerPriority.BACKGROUND` events are journaled once the loop is idle instead of inline, in order.
+        """
+        self.api = api
+        api.on("server.*", self._on_event, priority)
+        return self
+
+    def detach(self):
+        """Stop journaling and write what is buffered."""
+        self.api.off("server.*", self._on_event)
+        self.flush()
+
+    def _on_event(self, event: dict):
+        # an event the conversation can not take (e.g. a delta for an unknown item) must not end the receive loop
+        try:
+            self.apply(event)
+        except ValueError as err:
+            log.warn(f"Journal {self.session_id} skipped {event.get('type')}: {err}")
+
+    def clear(self):
+        """Forget the conversation, in memory and in the store."""
+        self._pending = []
+        self.store.delete(self.session_id)
+        self.conversation.clear()
+        self.seq = self._checkpoint_seq = 0
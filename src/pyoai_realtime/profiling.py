@@ -0,0 +1,180 @@
+"""Opt-in profiling of event handlers, to find the callback behind a stuttering session.
+
+    profiler = api.enable_profiling(slow_threshold=0.005)
+    ...
+    print(profiler.report())
+    profiler.dump_folded("handlers.folded")  # flamegraph.pl / speedscope / inferno
+
+While enabled every callback run by `dispatch` (inline and background) is timed, per event name and callback, and
+callbacks slower than `slow_threshold` are logged. The time is how long the callback held the loop: a coroutine is
+timed per step and the time it spends suspended (waiting for a socket, a lock, a sleep) does not count. Loop lag is
+measured per event name as the time from the start of a dispatch until the loop gets around to a callback scheduled
+at that moment, i.e. how long the loop was blocked while the event was being handled. Only one probe per event name
+waits for the loop at a time, events dispatched back to back without yielding share it. When disabled `dispatch`
+only checks that `profiler` is None.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from pyoai_realtime import log
+
+
+@dataclass
+class TimingStats:
+    """
+    Accumulated timings in seconds.
+
+    Attributes:
+        calls (int): Measurements.
+        total (float): Sum of all measurements.
+        max (float): Longest measurement.
+        slow (int): Measurements above the profiler's `slow_threshold`.
+    """
+
+    calls: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    slow: int = 0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.calls if self.calls else 0.0
+
+    def add(self, elapsed: float):
+        self.calls += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+
+class _Steps:
+    """Awaits `awaitable` and adds up the time each of its steps runs, not the time it is suspended."""
+
+    __slots__ = ("_steps", "elapsed")
+
+    def __init__(self, awaitable: Awaitable):
+        self._steps = awaitable.__await__()
+        self.elapsed = 0.0
+
+    def __await__(self):
+        steps, value, error = self._steps, None, None
+        while True:
+            start = time.perf_counter()
+            try:
+                yielded = steps.send(value) if error is None else steps.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.elapsed += time.perf_counter() - start
+            # hand whatever the coroutine waits on to the task and its answer (or cancellation) back
+            try:
+                value, error = (yield yielded), None
+            except GeneratorExit:
+                steps.close()
+                raise
+            except BaseException as err:
+                value, error = None, err
+
+
+def callback_name(fn: Callable) -> str:
+    """`module.qualname` of a callback, looking through weak references and partials."""
+    fn = getattr(fn, "__wrapped__", None) or fn
+    fn = getattr(fn, "func", fn)
+    qualname = getattr(fn, "__qualname__", None) or type(fn).__qualname__
+    module = getattr(fn, "__module__", None)
+    return f"{module}.{qualname}" if module else qualname
+
+
+class HandlerProfiler:
+    """Per callback time on the loop, call counts and per event loop lag for a `RealtimeEventHandler`."""
+
+    def __init__(self, slow_threshold: float = 0.005, warn: bool = True):
+        """
+        Args:
+            slow_threshold (float, optional): Seconds after which a callback counts as slow. Defaults to 0.005.
+            warn (bool, optional): Log a warning for every slow callback. Defaults to True.
+        """
+        self.slow_threshold = slow_threshold
+        self.warn = warn
+        self.handlers: dict[tuple[str, str], TimingStats] = {}
+        self.loop_lag: dict[str, TimingStats] = {}
+        self._probes: set[str] = set()
+
+    def reset(self):
+        self.handlers.clear()
+        self.loop_lag.clear()
+
+    async def call(self, event_name: str, fn: Callable, is_async: bool, event: Any) -> Any:
+        """Run a callback like `dispatch` does and record how long it held the loop."""
+        if is_async:
+            steps = _Steps(fn(event))
+            try:
+                return await steps
+            finally:
+                self._record(event_name, fn, steps.elapsed)
+        start = time.perf_counter()
+        try:
+            return fn(event)
+        finally:
+            self._record(event_name, fn, time.perf_counter() - start)
+
+    def _record(self, event_name: str, fn: Callable, elapsed: float):
+        key = (event_name, callback_name(fn))
+        if (stats := self.handlers.get(key)) is None:
+            stats = self.handlers[key] = TimingStats()
+        stats.add(elapsed)
+        if elapsed > self.slow_threshold:
+            stats.slow += 1
+            if self.warn:
+                log.warn(f"Slow handler {key[1]} for {event_name}: {elapsed * 1000:.1f} ms")
+
+    def mark(self, event_name: str):
+        """Start a loop lag measurement for a dispatch of `event_name`, unless one is already waiting for the loop."""
+        if event_name not in self._probes:
+            self._probes.add(event_name)
+            asyncio.get_running_loop().call_soon(self._lag, event_name, time.perf_counter())
+
+    def _lag(self, event_name: str, start: float):
+        self._probes.discard(event_name)
+        if (stats := self.loop_lag.get(event_name)) is None:
+            stats = self.loop_lag[event_name] = TimingStats()
+        stats.add(time.perf_counter() - start)
+
+    def report(self, sort: str = "total", limit: int = 20) -> str:
+        """
+        The slowest callbacks and the events with the most loop lag as text tables.
+
+        Args:
+            sort (str, optional): TimingStats attribute to sort by (`total`, `max`, `mean`, `calls`, `slow`).
+                Defaults to "total".
+            limit (int, optional): Rows per table. Defaults to 20.
+        """
+        lines = [f"{'total ms':>10} {'calls':>8} {'mean us':>9} {'max ms':>8} {'slow':>5}  event / callback"]
+        ranked = sorted(self.handlers.items(), key=lambda item: getattr(item[1], sort), reverse=True)
+        for (event_name, name), stats in ranked[:limit]:
+            lines.append(
+                f"{stats.total * 1e3:10.2f} {stats.calls:8d} {stats.mean * 1e6:9.1f} {stats.max * 1e3:8.2f}"
+                f" {stats.slow:5d}  {event_name} / {name}"
+            )
+        lines += ["", f"{'lag ms':>10} {'events':>8} {'mean us':>9} {'max ms':>8}  event"]
+        ranked = sorted(self.loop_lag.items(), key=lambda item: item[1].total, reverse=True)
+        for event_name, stats in ranked[:limit]:
+            lines.append(
+                f"{stats.total * 1e3:10.2f} {stats.calls:8d} {stats.mean * 1e6:9.1f} {stats.max * 1e3:8.2f}"
+                f"  {event_name}"
+            )
+        return "\n".join(lines)
+
+    def folded(self) -> str:
+        """Collapsed stacks (`dispatch;event;callback microseconds`) as read by flamegraph tools."""
+        return "\n".join(
+            f"dispatch;{event_name};{name} {round(stats.total * 1e6)}"
+            for (event_name, name), stats in sorted(self.handlers.items())
+        )
+
+    def dump_folded(self, path: str):
+        with open(path, "w") as file:
+            file.write(self.folded() + "\n")
@@ -0,0 +1,262 @@
+"""Client-side rate limiting driven by the server's `rate_limits.updated` events.
+
+Sessions under the same api key share its request and token limits, the server reports what is left after every
+`response.create`. A `RateLimitScheduler` shared by all `RealtimeAPI` instances of a process keeps a token bucket per
+reported limit, refills it at the rate the server resets it and makes `response.create` (and optionally new
+connections) wait for capacity instead of running into `rate_limit_exceeded` errors.
+
+    scheduler = RateLimitScheduler(connections_per_second=5)
+    api = RealtimeAPI(rate_limiter=scheduler)
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable
+
+from pyoai_realtime.realtime_events import other_events, response_events
+from pyoai_realtime.utils import percentile as _percentile
+
+RATE_LIMIT_ERROR_CODE = "rate_limit_exceeded"
+
+
+class TokenBucket:
+    """
+    A token bucket that refills continuously at `rate` tokens per second up to `capacity`.
+
+    Costs above the capacity are clamped to it, so a single large request waits for a full bucket instead of
+    waiting forever.
+    """
+
+    __slots__ = ("capacity", "rate", "tokens", "updated", "clock")
+
+    def __init__(self, capacity: float, rate: float, tokens: float = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            capacity (float): Maximum number of tokens.
+            rate (float): Tokens added per second.
+            tokens (float, optional): Tokens available now. Defaults to `capacity`.
+            clock (Callable[[], float], optional): Monotonic time in seconds. Defaults to time.monotonic.
+        """
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity if tokens is None else tokens
+        self.clock = clock
+        self.updated = clock()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(tokens={self.available:.1f}/{self.capacity}, rate={self.rate:.2f}/s)"
+
+    def _refill(self) -> float:
+        now = self.clock()
+        if (elapsed := now - self.updated) > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+        return self.tokens
+
+    @property
+    def available(self) -> float:
+        return self._refill()
+
+    def delay(self, cost: float = 1) -> float:
+        """Seconds until `cost` tokens are available, 0 if they are now."""
+        missing = min(cost, self.capacity) - self._refill()
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else math.inf
+
+    def take(self, cost: float = 1) -> bool:
+        """Take `cost` tokens if available."""
+        cost = min(cost, self.capacity)
+        if self._refill() < cost:
+            return False
+        self.tokens -= cost
+        return True
+
+    def consume(self, cost: float):
+        """Take `cost` tokens unconditionally, the balance may go negative (e.g. for usage reported afterwards)."""
+        self._refill()
+        self.tokens -= cost
+
+    def set(self, capacity: float, tokens: float, rate: float = None):
+        """Replace the state with authoritative values, e.g. from the server."""
+        self._refill()
+        self.capacity = capacity
+        self.tokens = min(capacity, tokens)
+        if rate is not None:
+            self.rate = rate
+
+
+@dataclass
+class RateLimitStats:
+    """
+    Counters for a `RateLimitScheduler`.
+
+    Attributes:
+        acquired (int): Requests and connections let through.
+        delayed (int): How many of those had to wait for capacity.
+        updates (int): `rate_limits.updated` events ingested.
+        rate_limited (int): `rate_limit_exceeded` errors seen despite the scheduler.
+        latencies (deque[float]): Seconds spent waiting for capacity by the most recent acquisitions.
+    """
+
+    acquired: int = 0
+    delayed: int = 0
+    updates: int = 0
+    rate_limited: int = 0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=4096))
+
+    def latency_percentile(self, percentile: float) -> float:
+        """Queueing latency in seconds at `percentile` (0-100) over the recent acquisitions."""
+        return _percentile(self.latencies, percentile)
+
+
+class RateLimitScheduler:
+    """
+    Process-wide gate for `response.create` and new connections.
+
+    Every attached api feeds its `rate_limits.updated` events in, the latest one wins since the limits belong to the
+    api key, not to a session. Until the server has reported a limit nothing is held back. Waiters are served in
+    arrival order and are woken early when an update brings capacity back.
+    """
+
+    def __init__(
+        self,
+        connections_per_second: float = None,
+        connection_burst: int = 1,
+        response_tokens: int = 1_000,
+        window: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            connections_per_second (float, optional): Rate of new connections, None does not limit them.
+                Defaults to None.
+            connection_burst (int, optional): Connections that may be opened back to back. Defaults to 1.
+            response_tokens (int, optional): Initial estimate of the tokens a response costs, replaced by a running
+                average of the usage reported in `response.done`. Defaults to 1000.
+            window (float, optional): Seconds a limit refills over when the server reports it untouched, the api
+                limits are per minute. Defaults to 60.0.
+            clock (Callable[[], float], optional): Monotonic time in seconds. Defaults to time.monotonic.
+        """
+        self.clock = clock
+        self.window = window
+        self.response_tokens = float(response_tokens)
+        self.buckets: dict[str, TokenBucket] = {}
+        self.connections = (
+            TokenBucket(connection_burst, connections_per_second, clock=clock) if connections_per_second else None
+        )
+        self.stats = RateLimitStats()
+        self.apis = []
+        self.waiting = 0
+        self._locks = {"response": asyncio.Lock(), "connection": asyncio.Lock()}
+        self._changed = asyncio.Event()
+
+    def attach(self, api) -> "RateLimitScheduler":
+        """Ingest the rate limits, usage and errors of `api`, and gate its `response.create` and `connect`."""
+        api.rate_limiter = self
+        api.on(f"server.{other_events.RateLimitsUpdated.type}", self._on_rate_limits)
+        api.on(f"server.{response_events.Done.type}", self._on_response_done)
+        api.on(f"server.{other_events.Error.type}", self._on_error)
+        self.apis.append(api)
+        return self
+
+    def detach(self, api):
+        """Remove the handlers registered by `attach`."""
+        api.off(f"server.{other_events.RateLimitsUpdated.type}", self._on_rate_limits)
+        api.off(f"server.{response_events.Done.type}", self._on_response_done)
+        api.off(f"server.{other_events.Error.type}", self._on_error)
+        api.rate_limiter = None
+        self.apis.remove(api)
+
+    def update(self, rate_limits: list[dict]):
+        """
+        Apply the limits of a `rate_limits.updated` event.
+
+        Each limit refills at the rate that brings it back to `limit` in `reset_seconds`.
+        """
+        for limit in rate_limits:
+            capacity, remaining = float(limit["limit"]), float(limit["remaining"])
+            reset = float(limit.get("reset_seconds") or 0)
+            rate = (capacity - remaining) / reset if reset > 0 and remaining < capacity else None
+            if (bucket := self.buckets.get(limit["name"])) is None:
+                self.buckets[limit["name"]] = TokenBucket(
+                    capacity, rate or capacity / self.window, remaining, clock=self.clock
+                )
+            else:
+                bucket.set(capacity, remaining, rate)
+        self.stats.updates += 1
+        self._wake()
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _on_rate_limits(self, event: dict):
+        self.update(event.get("rate_limits") or [])
+
+    def _on_response_done(self, event: dict):
+        usage = (event.get("response") or {}).get("usage") or {}
+        if total := usage.get("total_tokens"):
+            self.response_tokens += (total - self.response_tokens) * 0.2
+
+    def _on_error(self, event: dict):
+        if (event.get("error") or {}).get("code") != RATE_LIMIT_ERROR_CODE:
+            return
+        self.stats.rate_limited += 1
+        # the server knows better, nothing is left until the buckets refill
+        for bucket in self.buckets.values():
+            bucket.set(bucket.capacity, min(bucket.available, 0))
+
+    def _costs(self) -> list[tuple[TokenBucket, float]]:
+        costs = {"requests": 1, "tokens": self.response_tokens}
+        return [(bucket, costs.get(name, 1)) for name, bucket in self.buckets.items()]
+
+    async def _acquire(self, gate: str, costs: Callable[[], list[tuple[TokenBucket, float]]]) -> float:
+        start = self.clock()
+        lock = self._locks[gate]
+        delayed = lock.locked()
+        self.waiting += 1
+        try:
+            async with lock:
+                while True:
+                    needed = costs()
+                    if (delay := max((bucket.delay(cost) for bucket, cost in needed), default=0.0)) <= 0:
+                        for bucket, cost in needed:
+                            bucket.take(cost)
+                        break
+                    delayed = True
+                    try:
+                        async with asyncio.timeout(None if math.isinf(delay) else delay):
+                            await self._changed.wait()
+                    except TimeoutError:
+                        pass
+        finally:
+            self.waiting -= 1
+        waited = self.clock() - start if delayed else 0.0
+        self.stats.acquired += 1
+        self.stats.delayed += delayed
+        self.stats.latencies.append(waited)
+        return waited
+
+    async def acquire_response(self) -> float:
+        """
+        Wait until a response fits the reported request and token limits, and reserve it.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        return await self._acquire("response", self._costs)
+
+    async def acquire_connection(self) -> float:
+        """
+        Wait until a new connection may be opened.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        if self.connections is None:
+            return 0.0
+        return await self._acquire("connection", lambda: [(self.connections, 1)])
@@ -1,16 +1,26 @@
 import asyncio
+import base64
 import json
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterable, Callable, Dict, Iterable, Optional
 
 import websockets
 import websockets.protocol
 from websockets.asyncio.client import ClientConnection, connect
 
 from pyoai_realtime import log
+from pyoai_realtime.audio_fast_path import AUDIO_DELTA_TYPE, AudioDelta, decode_audio, split_audio_delta
 from pyoai_realtime.constants import DEBUG, DEFAULT_MODEL, DEFAULT_URL
+from pyoai_realtime.errors import ErrorClass, ErrorPolicy, classify_error
 from pyoai_realtime.event_handler import RealtimeEventHandler
+from pyoai_realtime.rate_limit import RateLimitScheduler
+from pyoai_realtime.realtime_events import response_events
+from pyoai_realtime.send_queue import SendPriority, SendQueue
+from pyoai_realtime.session_config import SessionConfig, default_registry
+from pyoai_realtime.transport import TransportConfig
 from pyoai_realtime.utils import generate_id
 
+AudioSink = Callable[[AudioDelta], Any]
+
 
 class RealtimeAPI(RealtimeEventHandler):
     """
@@ -24,12 +34,58 @@ class RealtimeAPI(RealtimeEventHandler):
         url: str = DEFAULT_URL,
         api_key: str = None,
         debug: bool = DEBUG,
+        send_queue: bool = False,
+        id_generator: Callable[[str], str] = generate_id,
+        transport: TransportConfig = None,
+        audio_fast_path: bool = False,
+        rate_limiter: RateLimitScheduler = None,
+        error_policy: ErrorPolicy = None,
+        log_events: bool = True,
     ):
+        """
+        Args:
+            url (str, optional): The websocket url. Defaults to DEFAULT_URL.
+            api_key (str, optional): The api key. Defaults to None.
+            debug (bool, optional): Enable debug logging. Defaults to DEBUG.
+            send_queue (bool, optional): Write through a single `SendQueue` task instead of awaiting the socket in
+                every `send`, concurrent senders then no longer contend on the socket, urgent events jump ahead of
+                queued audio and adjacent audio appends are coalesced. An event waits for the writer's next turn on
+                the loop, so while the socket keeps up the time until it is written goes up, the p99 only improves
+                once the socket applies backpressure. Defaults to False.
+            id_generator (Callable[[str], str], optional): Creates the `event_id` of sent events, pass
+                `generate_monotonic_id` for time sortable ids. Defaults to generate_id.
+            transport (TransportConfig, optional): Websocket settings (compression, buffer limits, keepalive).
+                Defaults to TransportConfig().
+            audio_fast_path (bool, optional): Handle `response.audio.delta` frames without a full parse, see
+                `add_audio_sink`. Defaults to False.
+            rate_limiter (RateLimitScheduler, optional): Shared scheduler that holds back `response.create` and
+                `connect` while the api key is out of capacity. Defaults to None.
+            error_policy (ErrorPolicy, optional): Retries failed handshakes by error class and keeps a circuit
+                breaker for the url, dropped connections count against it. Defaults to None.
+            log_events (bool, optional): Log every sent and received event. Formatting the line costs far more
+                than handling the event, turn it off when throughput matters. Defaults to True.
+        """
         super().__init__()
         self.ws = None
         self.url = url or DEFAULT_URL
         self.api_key = api_key
         self.debug = debug
+        self.send_queue = SendQueue(self._write) if send_queue else None
+        self.id_generator = id_generator
+        self.transport = transport or TransportConfig()
+        self.audio_fast_path = audio_fast_path
+        self.audio_sinks: list[AudioSink] = []
+        self.session_config: SessionConfig = None
+        self.session: dict = None
+        # server frames handled on any connection, sampled by `LoopMonitor` for the inbound frame rate
+        self.frames_received = 0
+        self.rate_limiter: RateLimitScheduler = None
+        if rate_limiter is not None:
+            rate_limiter.attach(self)
+        self.error_policy = error_policy
+        self.log_events = log_events
+        if error_policy is not None:
+            self.on("server.error", error_policy.observe)
 
     @property
     def connected(self) -> bool:
@@ -52,20 +108,96 @@ class RealtimeAPI(RealtimeEventHandler):
         return True
 
     async def _receive_loop(self):
-        async def _err_done(msg: str):
+        async def _err_done(msg: str, err: Exception):
             self.log(msg)
+            if self.error_policy is not None:
+                error_class = self.error_policy.record(self.url, err)
+            else:
+                error_class = classify_error(err)
             await self.disconnect()
-            await self.dispatch("close", {"error": True})
+            await self.dispatch("close", {"error": True, "error_class": error_class.value})
 
         try:
-            async for message in self.ws:
-                json_data = json.loads(message)
-                await self.receive(json_data.get("type"), json_data)
+            if self.audio_fast_path:
+                # raw bytes, so audio deltas skip the utf-8 decode of their payload as well
+                while True:
+                    try:
+                        message = await self.ws.recv(decode=False)
+                    except websockets.ConnectionClosedOK:
+                        break
+                    await self._handle_safely(message)
+            else:
+                async for message in self.ws:
+                    await self._handle_safely(message)
 
         except websockets.ConnectionClosed as err:
-            await _err_done(f"Connection closed: {err}")
+            await _err_done(f"Connection closed: {err}", err)
+        except Exception as err:
+            await _err_done(f"Error: {err}", err)
+
+    async def _handle_safely(self, message: str | bytes):
+        # a bug in a handler (or a frame that does not parse) costs that event, not the session
+        try:
+            await self._handle_message(message)
         except Exception as err:
-            await _err_done(f"Error: {err}")
+            classify = self.error_policy.classify if self.error_policy is not None else classify_error
+            if classify(err) is not ErrorClass.CLIENT_BUG:
+                raise
+            if self.error_policy is not None:
+                self.error_policy.observe(err)
+            log.warn(f"Handling a server event from {self.url} failed: {err!r}")
+
+    async def _handle_message(self, message: str | bytes):
+        self.frames_received += 1
+        if self.audio_fast_path and (audio := split_audio_delta(message)) is not None:
+            await self._receive_audio(*audio)
+            return
+        json_data = json.loads(message)
+        await self.receive(json_data.get("type"), json_data)
+
+    async def _receive_audio(self, header: dict, delta: memoryview):
+        if self.audio_sinks:
+            await self._deliver_audio(AudioDelta.from_header(header, decode_audio(delta)))
+
+        # the event dict (and the base64 string in it) is only built when a handler wants it
+        event_name = f"server.{AUDIO_DELTA_TYPE}"
+        if self.has_handlers(event_name) or self.has_handlers("server.*"):
+            header["delta"] = str(delta, "ascii")
+            await self.dispatch(event_name, header)
+            await self.dispatch("server.*", header)
+
+    def add_audio_sink(self, sink: AudioSink) -> AudioSink:
+        """
+        Receive the decoded audio of every `response.audio.delta`.
+
+        With `audio_fast_path` enabled audio deltas are split without parsing the audio, decoded once and handed to
+        the sinks as `AudioDelta`. They are not logged, and the event dict is only built when there are handlers on
+        `server.response.audio.delta` or `server.*`, which then get it as usual. Without the fast path sinks are fed
+        from that event instead.
+
+        Args:
+            sink (AudioSink): Called (or awaited) with each `AudioDelta`.
+
+        Returns:
+            AudioSink: The sink.
+        """
+        if not self.audio_sinks and not self.audio_fast_path:
+            self.on(f"server.{AUDIO_DELTA_TYPE}", self._feed_audio_sinks)
+        self.audio_sinks.append(sink)
+        return sink
+
+    def remove_audio_sink(self, sink: AudioSink):
+        """Stop feeding `sink`."""
+        self.audio_sinks.remove(sink)
+        if not self.audio_sinks and not self.audio_fast_path:
+            self.off(f"server.{AUDIO_DELTA_TYPE}", self._feed_audio_sinks)
+
+    async def _feed_audio_sinks(self, event: dict):
+        await self._deliver_audio(AudioDelta.from_header(event, decode_audio(event["delta"])))
+
+    async def _deliver_audio(self, frame: AudioDelta):
+        for sink in tuple(self.audio_sinks):
+            _ = await sink(frame) if asyncio.iscoroutinefunction(sink) else sink(frame)
 
     async def connect(self, model: str = DEFAULT_MODEL, done_cb: callable = None) -> bool:
         """
@@ -78,6 +210,8 @@ class RealtimeAPI(RealtimeEventHandler):
             bool: True if connection is successful, False otherwise.
         """
         self._check_ws_setup(self.url, self.api_key, model)
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_connection()
 
         url = f"{self.url}?model={model}" if model else self.url
 
@@ -86,22 +220,145 @@ class RealtimeAPI(RealtimeEventHandler):
             headers["Authorization"] = f"Bearer {self.api_key}"
 
         try:
-            self.ws = await connect(url, additional_headers=headers)
+            if self.error_policy is not None:
+                self.ws = await self.error_policy.run(self.url, lambda: self._open(url, headers))
+            else:
+                self.ws = await self._open(url, headers)
+            # a new connection is a new session, nothing has been applied yet
+            self.session_config = None
             recv_task = asyncio.create_task(self._receive_loop(), name="receive_loop")
 
             if done_cb:
                 recv_task.add_done_callback(done_cb)
 
             self.background_tasks["receive_loop"] = recv_task
+
+            if self.send_queue is not None:
+                # events sent before the writer task gets to run are queued for it
+                self.send_queue.reopen()
+                self.background_tasks["send_loop"] = asyncio.create_task(self.send_queue.run(), name="send_loop")
             return True
         except Exception as err:
             raise err
 
+    async def _open(self, url: str, headers: dict) -> ClientConnection:
+        return await connect(url, additional_headers=headers, **self.transport.client_kwargs())
+
+    async def start_session(
+        self,
+        config: SessionConfig | dict = None,
+        initial_audio: bytes | Iterable[bytes] | AsyncIterable[bytes] = None,
+        model: str = DEFAULT_MODEL,
+        timeout: float = 10.0,
+    ) -> dict:
+        """
+        Connect and configure a session without waiting a round trip between the steps.
+
+        The `session.update` goes out right after the handshake instead of after `session.created`, and input audio
+        follows it right away, the server applies them in order. Audio produced by an async iterable (e.g. a
+        microphone) while the connection is still being set up is buffered and sent as a single append once the
+        update is written, after that chunks are appended as they come. `session.created` and `session.updated` are
+        awaited last, to confirm the session. If the setup fails or is cancelled the connection is closed again.
+
+        Args:
+            config (SessionConfig | dict, optional): The session config to apply. Defaults to None.
+            initial_audio (bytes | Iterable[bytes] | AsyncIterable[bytes], optional): PCM16 input audio to append.
+                Defaults to None.
+            model (str, optional): The model to connect with. Defaults to DEFAULT_MODEL.
+            timeout (float, optional): Seconds to wait for `session.created` and `session.updated`.
+                Defaults to 10.0.
+
+        Returns:
+            dict: The session as confirmed by the server.
+
+        Raises:
+            TimeoutError: If the server does not confirm the session in time.
+            RuntimeError: If the server answers with an error before confirming the session.
+        """
+        loop = asyncio.get_running_loop()
+        confirmations = {"session.created": loop.create_future()}
+        if config is not None:
+            confirmations["session.updated"] = loop.create_future()
+
+        def _confirm(event: dict):
+            if (future := confirmations.get(event.get("type"))) is not None and not future.done():
+                future.set_result(event)
+
+        def _fail(event: dict):
+            for future in confirmations.values():
+                if not future.done():
+                    future.set_exception(RuntimeError(f"session setup failed: {event.get('error')}"))
+
+        # registered before connecting, `session.created` can arrive before `connect` returns
+        subscriptions = [self.subscribe(f"server.{event_type}", _confirm, once=True) for event_type in confirmations]
+        subscriptions.append(self.subscribe("server.error", _fail, once=True))
+
+        # audio is collected from the start, it is only sent once the update is out
+        audio = asyncio.Queue()
+        if initial_audio is not None and hasattr(initial_audio, "__aiter__"):
+            self.background_tasks["initial_audio_reader"] = asyncio.create_task(
+                self._read_audio(initial_audio, audio), name="initial_audio_reader"
+            )
+        else:
+            chunks = [initial_audio] if isinstance(initial_audio, (bytes, bytearray, memoryview)) else initial_audio
+            for chunk in chunks or ():
+                audio.put_nowait(chunk)
+            audio.put_nowait(None)
+
+        opened = False
+        try:
+            await self.connect(model)
+            opened = True
+            if config is not None:
+                await self.update_session(config)
+            self.background_tasks["initial_audio"] = asyncio.create_task(self._send_audio(audio), name="initial_audio")
+
+            async with asyncio.timeout(timeout):
+                confirmed = [await future for future in confirmations.values()]
+        except BaseException:
+            for name in ("initial_audio", "initial_audio_reader"):
+                if task := self.background_tasks.pop(name, None):
+                    task.cancel()
+            # a half set up session is of no use, the caller starts over with a new one
+            if opened:
+                await self.disconnect()
+            raise
+        finally:
+            for subscription in subscriptions:
+                subscription.cancel()
+
+        self.session = confirmed[-1].get("session")
+        return self.session
+
+    @staticmethod
+    async def _read_audio(source: AsyncIterable[bytes], queue: asyncio.Queue):
+        try:
+            async for chunk in source:
+                queue.put_nowait(chunk)
+        finally:
+            queue.put_nowait(None)
+
+    async def _send_audio(self, queue: asyncio.Queue):
+        """Append queued PCM chunks, whatever piled up since the last append goes out as one."""
+        while True:
+            chunks = [await queue.get()]
+            while not queue.empty():
+                chunks.append(queue.get_nowait())
+            if pcm := b"".join(chunk for chunk in chunks if chunk is not None):
+                await self.send("input_audio_buffer.append", {"audio": base64.b64encode(pcm).decode("ascii")})
+            if chunks[-1] is None:
+                return
+
     async def disconnect(self) -> bool:
         """Close the WebSocket connection if it exists."""
-        if recv_task := self.background_tasks.get("receive_loop"):
+        # the receive loop disconnects itself on errors, it must not cancel its own "close" dispatch
+        if (recv_task := self.background_tasks.get("receive_loop")) and recv_task is not asyncio.current_task():
             recv_task.cancel()
 
+        for name in ("send_loop", "initial_audio", "initial_audio_reader"):
+            if task := self.background_tasks.pop(name, None):
+                task.cancel()
+
         if self.ws:
             await self.ws.close()
             self.ws = None
@@ -119,22 +376,36 @@ class RealtimeAPI(RealtimeEventHandler):
         Returns:
             bool: Always returns True.
 
-        Logs the received event, dispatches it to specific and wildcard handlers.
+        Logs the received event (unless `log_events` is off), dispatches it to specific and wildcard handlers.
         """
-        self.log("RECEIVED:", event_name, event)
+        if self.log_events:
+            self.log("RECEIVED:", event_name, event)
         await self.dispatch(f"server.{event_name}", event)
         await self.dispatch("server.*", event)
         return True
 
-    async def send(self, event_name: str, data: Optional[Dict[str, Any]] | None = None) -> bool:
+    async def _write(self, data: str):
+        await self.ws.send(data)
+
+    async def send(
+        self,
+        event_name: str,
+        data: Optional[Dict[str, Any]] | None = None,
+        priority: SendPriority = None,
+        wait: bool = False,
+    ) -> bool:
         """Send an event to the server.
 
         Args:
             event_name (str): Name of the event to send.
             data (Optional[Dict[str, Any]], optional): Data to send with the event. Defaults to None.
+            priority (SendPriority, optional): Lane to queue the event in when the send queue is enabled.
+                Defaults to None (urgent for `response.cancel` and `conversation.item.truncate`).
+            wait (bool, optional): With the send queue enabled, wait until the event is written instead of
+                returning once it is queued. Defaults to False.
 
         Returns:
-            bool: True if the event was sent successfully.
+            bool: True if the event was sent (or queued) successfully.
 
         Raises:
             Exception: If RealtimeAPI is not connected.
@@ -143,12 +414,61 @@ class RealtimeAPI(RealtimeEventHandler):
             raise RuntimeError("RealtimeAPI is not connected")
 
         data = data or {}
+        if self.rate_limiter is not None and event_name == response_events.Create.type:
+            await self.rate_limiter.acquire_response()
 
-        event = {**data, "event_id": generate_id("evt_"), "type": event_name}
+        event = {**data, "event_id": self.id_generator("evt_"), "type": event_name}
+        return await self._send_event(event, priority=priority, wait=wait)
 
+    async def _send_event(
+        self, event: dict, frame: str = None, priority: SendPriority = None, wait: bool = False
+    ) -> bool:
+        event_name = event["type"]
         await self.dispatch(f"client.{event_name}", event)
         await self.dispatch("client.*", event)
-        self.log("SENT:", event_name, event)
-        json_data = json.dumps(event)
-        await self.ws.send(json_data)
+        if self.log_events:
+            self.log("SENT:", event_name, event)
+
+        if self.send_queue is not None:
+            if future := self.send_queue.put(event, priority, wait=wait, frame=frame):
+                await future
+            return True
+
+        await self._write(frame if frame is not None else json.dumps(event))
+        return True
+
+    async def update_session(self, config: SessionConfig | dict, force: bool = False, wait: bool = False) -> bool:
+        """
+        Send a `session.update` with only the fields that changed since the last one on this connection.
+
+        The first update after `connect` sends the whole config. The frame is built from the json cached in the
+        `SessionConfig`, plain dicts are interned in the shared `default_registry` first.
+
+        Args:
+            config (SessionConfig | dict): The desired session config.
+            force (bool, optional): Send every field even if unchanged. Defaults to False.
+            wait (bool, optional): With the send queue enabled, wait until the update is written. Defaults to False.
+
+        Returns:
+            bool: True if an update was sent, False if nothing changed.
+        """
+        if not self.connected:
+            raise RuntimeError("RealtimeAPI is not connected")
+
+        if not isinstance(config, SessionConfig):
+            config = default_registry.register(config)
+
+        fields = config.fields if force else config.changed_fields(self.session_config)
+        if not fields:
+            return False
+
+        event_id = self.id_generator("evt_")
+        await self._send_event(config.event(event_id, fields), frame=config.frame(event_id, fields), wait=wait)
+        self.session_config = config
+        return True
+
+    async def flush(self) -> bool:
+        """Wait until every event queued with `send` has been written, a no-op without the send queue."""
+        if self.send_queue is not None:
+            await self.send_queue.flush()
         return True
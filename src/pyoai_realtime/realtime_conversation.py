@@ -1,17 +1,46 @@
 import asyncio
 import json
+import time
 from array import array
 from dataclasses import dataclass, field
-from typing import Any, Awaitable, Callable
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
 
-from websockets.asyncio.server import ServerConnection, serve
-
-from pyoai_realtime.constants import HOSTNAME, PORT
+from pyoai_realtime.audio_fast_path import split_audio_delta
+from pyoai_realtime.binary_audio import BinaryAudioEncoder, audio_append_frame
+from pyoai_realtime.constants import DEFAULT_FREQUENCY, DEFAULT_MODEL, HOSTNAME, PORT
 from pyoai_realtime.event_functions import ConversationInterface, EventFunctionsMixin
 from pyoai_realtime.realtime_events import RealtimeEvent, conversation_events
+from pyoai_realtime.transport import TransportConfig
+
+if TYPE_CHECKING:
+    from websockets.asyncio.client import ClientConnection
+    from websockets.asyncio.server import Server, ServerConnection
+
+    from pyoai_realtime.routing import Tenant, TenantRouter
+    from pyoai_realtime.transcode import Transcoder
 
 HandlerType = Callable[[Any], Awaitable[None]]
 
+_AUDIO_DONE = b'"response.audio.done"'
+
+
+@dataclass
+class RelaySession:
+    """
+    A client connection of a running `RealtimeRelay`.
+
+    Attributes:
+        websocket (ServerConnection): The client connection.
+        frames_received (int): Messages read by the relay's message loop.
+        opened (float): `time.monotonic()` when the client connected.
+        tenant (Tenant): The client's tenant with a `router`, otherwise None.
+    """
+
+    websocket: "ServerConnection"
+    frames_received: int = 0
+    opened: float = field(default_factory=time.monotonic)
+    tenant: "Tenant" = None
+
 
 class EventProcessor(EventFunctionsMixin):
     def __init__(self, conversation: ConversationInterface):
@@ -38,7 +67,7 @@ class EventProcessor(EventFunctionsMixin):
 
 
 class RealtimeConversation:
-    default_frequency = 24_000  # 24,000 Hz
+    default_frequency = DEFAULT_FREQUENCY
 
     def __init__(self):
         self.conversation = ConversationInterface()
@@ -58,23 +87,59 @@ class RealtimeRelay:
         # not used now but planning for later
         json_func: callable = None,
         send_func: callable = None,
+        transport: TransportConfig = None,
+        upstream_url: str = None,
+        api_key: str = None,
+        model: str = DEFAULT_MODEL,
+        binary_audio: bool = False,
+        transcoder: Callable[[], "Transcoder"] = None,
+        router: "TenantRouter" = None,
     ):
+        """
+        Args:
+            hostname (str, optional): Interface to listen on. Defaults to HOSTNAME.
+            port (int, optional): Port to listen on. Defaults to PORT.
+            handler (HandlerType, optional): Serves a client connection. Defaults to `proxy` with an `upstream_url`,
+                otherwise to a message loop answering each message.
+            transport (TransportConfig, optional): Websocket settings for client and upstream connections.
+                Defaults to TransportConfig().
+            upstream_url (str, optional): Realtime api every client is proxied to. Defaults to None.
+            api_key (str, optional): The api key for the upstream connections. Defaults to None.
+            model (str, optional): The model of the upstream connections. Defaults to DEFAULT_MODEL.
+            binary_audio (bool, optional): Exchange audio with clients as binary frames instead of base64 json, see
+                `pyoai_realtime.binary_audio`. Defaults to False.
+            transcoder (Callable[[], Transcoder], optional): Creates the `Transcoder` of a client connection, binary
+                frames then carry codec packets instead of PCM16, implies `binary_audio`. Defaults to None.
+            router (TenantRouter, optional): Authenticates clients, applies per tenant upstream credentials and
+                quotas and pins sessions to relays, see `pyoai_realtime.routing`. Defaults to None.
+        """
         self.hostname = hostname
+        self.transport = transport or TransportConfig()
         self.port = port
         self._json_func = json_func
         self._send_func = send_func
-        self.handler = handler or self._handler
+        self.upstream_url = upstream_url
+        self.api_key = api_key
+        self.model = model
+        self.binary_audio = binary_audio or transcoder is not None
+        self.transcoder = transcoder
+        self.router = router
+        self.handler = handler or (self.proxy if upstream_url else self._handler)
+        # the open client connections, registered by `run`
+        self.sessions: dict["ServerConnection", RelaySession] = {}
 
     async def _default_handler(self, msg: dict) -> dict:
         return msg
 
-    async def _handler(self, websocket: ServerConnection, handler: dict | Callable):
+    async def _handler(self, websocket: "ServerConnection", handler: dict | Callable = None):
+        handler = handler or self._default_handler
+
         async def fn(msg):
             # allow for a dict of functions
             fn = handler.get(msg["type"], self._default_handler) if isinstance(handler, dict) else handler
 
             if asyncio.iscoroutine(out := fn(msg)):
-                await out
+                out = await out
             return out
 
         # allow for overriding the message loading/dumping (e.g. for logging/customization)
@@ -85,16 +150,135 @@ class RealtimeRelay:
 
         _send_func = self._send_func or _send_func
 
+        session = self.sessions.get(websocket)
         async for message in websocket:
+            if session is not None:
+                session.frames_received += 1
             message = msg_load(message)
             message = await fn(message)
             message = msg_dump(message)
             await websocket.send(message)
 
-    async def run(self, handler: HandlerType = None, hostname: str = None, port: int = None, **kwargs):
+    async def _open_upstream(self, websocket: "ServerConnection") -> "ClientConnection":
+        from websockets.asyncio.client import connect
+
+        upstream_url, api_key, model = self.upstream_url, self.api_key, self.model
+        if self.router is not None and (route := self.router.routes.get(websocket)) is not None:
+            if route.upstream is not None:
+                # a resumed session continues on its parked connection
+                return route.upstream
+            tenant = route.tenant
+            upstream_url = tenant.upstream_url or upstream_url
+            api_key = tenant.api_key or api_key
+            model = tenant.model or model
+
+        url = f"{upstream_url}?model={model}" if model else upstream_url
+        headers = {"OpenAI-Beta": "realtime=v1"}
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+        return await connect(url, additional_headers=headers, **self.transport.client_kwargs())
+
+    async def proxy(self, websocket: "ServerConnection"):
+        """
+        Serve a client by relaying its frames to a new upstream connection and back, until either side closes.
+
+        With a `router` the upstream connection of a client with a session key is parked for it to resume instead
+        of being closed.
+        """
+        transcoder = self.transcoder() if self.transcoder is not None else None
+        upstream = await self._open_upstream(websocket)
+        pumps = [
+            asyncio.create_task(self._client_to_upstream(websocket, upstream, transcoder)),
+            asyncio.create_task(self._upstream_to_client(upstream, websocket, transcoder)),
+        ]
+        try:
+            await asyncio.wait(pumps, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for pump in pumps:
+                pump.cancel()
+            await asyncio.gather(*pumps, return_exceptions=True)
+            if self.router is None or not self.router.release(websocket, upstream):
+                await upstream.close()
+
+    async def _client_to_upstream(
+        self, websocket: "ServerConnection", upstream: "ClientConnection", transcoder: "Transcoder" = None
+    ):
+        session = self.sessions.get(websocket)
+        router = self.router
+        async for message in websocket:
+            if session is not None:
+                session.frames_received += 1
+            if router is not None:
+                await router.throttle(websocket, len(message))
+            if isinstance(message, bytes) and self.binary_audio:
+                if transcoder is not None and not (message := transcoder.decode(message)):
+                    continue
+                message = audio_append_frame(message)
+            await upstream.send(message)
+
+    async def _upstream_to_client(
+        self, upstream: "ClientConnection", websocket: "ServerConnection", transcoder: "Transcoder" = None
+    ):
+        from websockets.exceptions import ConnectionClosedOK
+
+        encoder = BinaryAudioEncoder(transcoder) if self.binary_audio else None
+        router = self.router
+        while True:
+            try:
+                # raw bytes, text frames are passed on without decoding them
+                message = await upstream.recv(decode=False)
+            except ConnectionClosedOK:
+                return
+            if router is not None:
+                await router.throttle(websocket, len(message))
+            if encoder is None:
+                await websocket.send(message, text=True)
+            elif (audio := split_audio_delta(message)) is not None:
+                announcement, frames = encoder.encode(*audio)
+                if announcement is not None:
+                    await websocket.send(announcement)
+                for frame in frames:
+                    await websocket.send(frame)
+            else:
+                if transcoder is not None and _AUDIO_DONE in message:
+                    # the codec's partial frame goes out before the done event
+                    for frame in encoder.finish(json.loads(message).get("item_id")):
+                        await websocket.send(frame)
+                await websocket.send(message, text=True)
+
+    async def serve(self, handler: HandlerType = None, hostname: str = None, port: int = None, **kwargs) -> "Server":
+        """
+        Start accepting clients and return the started server, `run` serves until cancelled.
+
+        Every client connection is registered in `sessions` while its handler runs. With a `router` its
+        `process_request` and `process_response` screen the handshakes, unless `kwargs` bring their own.
+        """
+        # the server side of websockets is only needed once a relay actually runs
+        from websockets.asyncio.server import serve
+
         handler = handler or self.handler
         hostname = hostname or self.hostname
-        port = port or self.port
+        port = self.port if port is None else port
+
+        router = self.router
 
-        server = await serve(handler, hostname, port, **kwargs)
+        async def _track(websocket: "ServerConnection"):
+            route = router.routes.get(websocket) if router is not None else None
+            self.sessions[websocket] = RelaySession(websocket, tenant=route.tenant if route is not None else None)
+            try:
+                await handler(websocket)
+            finally:
+                del self.sessions[websocket]
+                if router is not None:
+                    # frees the session slot if the handler did not park the upstream connection
+                    router.release(websocket)
+
+        if router is not None:
+            kwargs.setdefault("process_request", router.process_request)
+            kwargs.setdefault("process_response", router.process_response)
+        # transport settings (no compression, larger frames and queues by default), kwargs take precedence
+        return await serve(_track, hostname, port, **{**self.transport.server_kwargs(), **kwargs})
+
+    async def run(self, handler: HandlerType = None, hostname: str = None, port: int = None, **kwargs):
+        server = await self.serve(handler, hostname, port, **kwargs)
         await server.serve_forever()
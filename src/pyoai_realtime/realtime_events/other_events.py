@@ -38,9 +38,9 @@ class RateLimitsUpdated(RealtimeEvent):
 
     Attributes:
         rate_limits (dict): A dictionary containing rate limit details.
-        type (str): The type of the event, always set to "rate_limits_updated" for this class.
+        type (str): The type of the event, always set to "rate_limits.updated" for this class.
     """
 
-    type = "rate_limits_updated"
+    type = "rate_limits.updated"
 
     rate_limits: list[dict] = None
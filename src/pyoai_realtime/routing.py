@@ -0,0 +1,279 @@
+"""Multi-tenant routing for a fleet of `RealtimeRelay` instances.
+
+A `TenantRouter` sits in the relay's opening handshake. It authenticates the client (a bearer token in the
+`Authorization` header, or a `token` query parameter for browsers), maps it to a `Tenant` with its own upstream
+credentials and quotas, and decides where the session lives:
+
+- Clients that pass a session key (`X-Session-Key` header or `session` query parameter) are pinned to one relay of the
+  fleet by consistent hashing of tenant and key. A relay that does not own the key redirects the handshake to the one
+  that does, so a reconnecting client always lands where its conversation is. Websocket clients drop the
+  `Authorization` header on a redirect to another origin, clients of a fleet pass `token` in the query instead.
+- When such a client disconnects, the relay keeps its upstream connection open for `resume_timeout` seconds. A
+  reconnect with the same key picks it up again, server events that arrived meanwhile are waiting in its receive
+  queue.
+- Concurrent sessions (parked ones included) are limited per tenant, and the bytes relayed in both directions go
+  through a per tenant `TokenBucket`, frames wait when the tenant is over its bandwidth.
+
+    tenants = {"secret-token": Tenant("acme", api_key=ACME_KEY, max_sessions=100, bandwidth=2**20)}
+    router = TenantRouter(tenants, node="relay-1", nodes={"relay-1": "ws://10.0.0.1:8081", ...})
+    await RealtimeRelay(upstream_url=DEFAULT_URL, router=router).run()
+"""
+
+import asyncio
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Callable
+from urllib.parse import parse_qs, urlsplit
+
+from pyoai_realtime.rate_limit import TokenBucket
+from pyoai_realtime.workers import ConsistentHashRing
+
+if TYPE_CHECKING:
+    from websockets.asyncio.client import ClientConnection
+    from websockets.asyncio.server import ServerConnection
+    from websockets.http11 import Request, Response
+
+
+@dataclass(frozen=True)
+class Tenant:
+    """
+    A customer of the relay.
+
+    Attributes:
+        name (str): Unique name, the key of the tenant's quotas.
+        api_key (str): Upstream api key of the tenant's sessions, None uses the relay's.
+        upstream_url (str): Upstream url, None uses the relay's.
+        model (str): Upstream model, None uses the relay's.
+        max_sessions (int): Concurrent sessions, parked ones included. None for no limit.
+        bandwidth (float): Bytes per second relayed in both directions together. None for no limit.
+        burst (float): Bytes that may be relayed at once. Defaults to one second of `bandwidth`.
+    """
+
+    name: str
+    api_key: str = None
+    upstream_url: str = None
+    model: str = None
+    max_sessions: int = None
+    bandwidth: float = None
+    burst: float = None
+
+
+@dataclass
+class RouterStats:
+    """
+    Counters for a `TenantRouter`.
+
+    Attributes:
+        accepted (int): Handshakes let through.
+        rejected (Counter[int]): Handshakes refused, by http status.
+        redirected (int): Handshakes sent to the relay owning their session key.
+        resumed (int): Sessions that picked up their parked upstream connection.
+        expired (int): Parked upstream connections closed after `resume_timeout`.
+        throttled (float): Seconds frames were held back for bandwidth.
+    """
+
+    accepted: int = 0
+    rejected: Counter = field(default_factory=Counter)
+    redirected: int = 0
+    resumed: int = 0
+    expired: int = 0
+    throttled: float = 0.0
+
+
+@dataclass
+class Route:
+    """
+    Where a client connection goes.
+
+    Attributes:
+        tenant (Tenant): The authenticated tenant.
+        session_key (str): The client's session key, if it passed one.
+        upstream (ClientConnection): The parked upstream connection being resumed, if any.
+    """
+
+    tenant: Tenant
+    session_key: str = None
+    upstream: "ClientConnection" = None
+
+
+class TenantRouter:
+    """Authenticates relay clients, enforces per tenant quotas and pins sessions to relays."""
+
+    def __init__(
+        self,
+        tenants: dict[str, Tenant] = None,
+        authenticate: Callable[["Request"], Tenant | None] = None,
+        node: str = None,
+        nodes: dict[str, str] = None,
+        resume_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            tenants (dict[str, Tenant], optional): Tenant by bearer token. Defaults to None.
+            authenticate (Callable[[Request], Tenant | None], optional): Finds the tenant of a handshake request,
+                None refuses it. Defaults to looking up the bearer token in `tenants`.
+            node (str, optional): The name of this relay in `nodes`. Defaults to None.
+            nodes (dict[str, str], optional): Base websocket url of every relay of the fleet by name, session keys are
+                spread over them. Defaults to None, a single relay.
+            resume_timeout (float, optional): Seconds an upstream connection is kept for a client with a session key
+                to reconnect, 0 closes it right away. Defaults to 30.0.
+            clock (Callable[[], float], optional): Monotonic time in seconds for the bandwidth buckets.
+                Defaults to time.monotonic.
+        """
+        self.tenants = tenants or {}
+        self.authenticate = authenticate or self._authenticate_token
+        self.node = node
+        self.nodes = nodes or {}
+        self.ring = ConsistentHashRing(list(self.nodes)) if self.nodes else None
+        self.resume_timeout = resume_timeout
+        self.clock = clock
+        self.stats = RouterStats()
+        self.routes: dict["ServerConnection", Route] = {}
+        # session slots per tenant name, live and parked
+        self.sessions: Counter = Counter()
+        self.buckets: dict[str, TokenBucket] = {}
+        self._live: set[tuple[str, str]] = set()
+        self._parked: dict[tuple[str, str], tuple["ClientConnection", asyncio.TimerHandle]] = {}
+        self._closing: set[asyncio.Task] = set()
+
+    @staticmethod
+    def _param(request: "Request", header: str, query: str) -> str | None:
+        if value := request.headers.get(header):
+            return value
+        values = parse_qs(urlsplit(request.path).query).get(query)
+        return values[0] if values else None
+
+    def _authenticate_token(self, request: "Request") -> Tenant | None:
+        token = self._param(request, "Authorization", "token")
+        if token and token.startswith("Bearer "):
+            token = token[len("Bearer ") :]
+        return self.tenants.get(token)
+
+    def add_node(self, name: str, url: str):
+        """Add a relay to the fleet, it takes over its share of the session keys."""
+        self.nodes[name] = url
+        if self.ring is None:
+            self.ring = ConsistentHashRing()
+        self.ring.add(name)
+
+    def remove_node(self, name: str):
+        """Remove a relay from the fleet, its session keys move to the others."""
+        del self.nodes[name]
+        self.ring.remove(name)
+        if not self.nodes:
+            self.ring = None
+
+    def owner(self, tenant: Tenant, session_key: str) -> str | None:
+        """The relay owning a session key, None without a fleet."""
+        return self.ring.get(f"{tenant.name}:{session_key}") if self.ring is not None else None
+
+    def _refuse(self, connection: "ServerConnection", status: HTTPStatus, reason: str) -> "Response":
+        self.stats.rejected[status.value] += 1
+        return connection.respond(status, f"{reason}\n")
+
+    def process_request(self, connection: "ServerConnection", request: "Request") -> "Response | None":
+        """
+        The `process_request` hook of the relay's server: authenticate, redirect to the owning relay, claim a
+        parked upstream connection or a session slot.
+
+        Returns:
+            Response | None: The refusal or redirect, None to go ahead with the handshake.
+        """
+        if (tenant := self.authenticate(request)) is None:
+            return self._refuse(connection, HTTPStatus.UNAUTHORIZED, "Unknown token")
+
+        session_key = self._param(request, "X-Session-Key", "session")
+        if session_key and (owner := self.owner(tenant, session_key)) not in (None, self.node):
+            self.stats.redirected += 1
+            response = connection.respond(HTTPStatus.TEMPORARY_REDIRECT, "")
+            response.headers["Location"] = self.nodes[owner].rstrip("/") + request.path
+            return response
+
+        slot = (tenant.name, session_key)
+        if session_key and slot in self._live:
+            return self._refuse(connection, HTTPStatus.CONFLICT, "Session in use")
+
+        route = Route(tenant, session_key)
+        if session_key and (parked := self._parked.pop(slot, None)) is not None:
+            # the parked session keeps its slot
+            route.upstream, expiry = parked
+            expiry.cancel()
+            self.stats.resumed += 1
+        elif tenant.max_sessions is not None and self.sessions[tenant.name] >= tenant.max_sessions:
+            return self._refuse(connection, HTTPStatus.TOO_MANY_REQUESTS, "Session quota exceeded")
+        else:
+            self.sessions[tenant.name] += 1
+
+        if session_key:
+            self._live.add(slot)
+        self.routes[connection] = route
+        self.stats.accepted += 1
+        return None
+
+    def process_response(self, connection: "ServerConnection", request: "Request", response: "Response") -> None:
+        """
+        The `process_response` hook of the relay's server: hand back the slot claimed by `process_request` if the
+        handshake failed after all (e.g. a plain http request), the connection handler never runs then.
+        """
+        if response.status_code == 101 or (route := self.routes.get(connection)) is None:
+            return
+        self.stats.accepted -= 1
+        self.stats.rejected[response.status_code] += 1
+        # a resumed upstream connection goes back to waiting for its client
+        if not self.release(connection, route.upstream) and route.upstream is not None:
+            self._close(route.upstream)
+
+    def release(self, connection: "ServerConnection", upstream: "ClientConnection" = None) -> bool:
+        """
+        End a client connection, parking its upstream connection if the client can come back for it.
+
+        Returns:
+            bool: True if `upstream` was parked, otherwise the caller closes it.
+        """
+        from websockets.protocol import State
+
+        if (route := self.routes.pop(connection, None)) is None:
+            return False
+        slot = (route.tenant.name, route.session_key)
+        self._live.discard(slot)
+        if route.session_key and upstream is not None and upstream.state is State.OPEN and self.resume_timeout > 0:
+            expiry = asyncio.get_running_loop().call_later(self.resume_timeout, self._expire, slot)
+            self._parked[slot] = (upstream, expiry)
+            return True
+        self.sessions[route.tenant.name] -= 1
+        return False
+
+    def _expire(self, slot: tuple[str, str]):
+        if (parked := self._parked.pop(slot, None)) is None:
+            return
+        self.sessions[slot[0]] -= 1
+        self.stats.expired += 1
+        self._close(parked[0])
+
+    def _close(self, upstream: "ClientConnection"):
+        task = asyncio.create_task(upstream.close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def throttle(self, connection: "ServerConnection", size: int):
+        """Wait until the connection's tenant may relay `size` more bytes, and count them."""
+        if (route := self.routes.get(connection)) is None or (bandwidth := route.tenant.bandwidth) is None:
+            return
+        if (bucket := self.buckets.get(route.tenant.name)) is None:
+            bucket = TokenBucket(route.tenant.burst or bandwidth, bandwidth, clock=self.clock)
+            self.buckets[route.tenant.name] = bucket
+        if (delay := bucket.delay(size)) > 0:
+            self.stats.throttled += delay
+            await asyncio.sleep(delay)
+        bucket.consume(size)
+
+    async def close(self):
+        """Close every parked upstream connection."""
+        for slot in list(self._parked):
+            self._parked[slot][1].cancel()
+            self._expire(slot)
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
@@ -0,0 +1,45 @@
+"""Event loop and websocket setup for realtime workloads.
+
+    from pyoai_realtime import runtime
+
+    runtime.run(main())
+
+`run` uses uvloop when it is installed (`pip install uvloop`) and the plain asyncio loop otherwise. Websocket settings
+live in `pyoai_realtime.transport.TransportConfig`.
+"""
+
+import asyncio
+from typing import Any, Coroutine
+
+try:
+    import uvloop
+except ImportError:  # uvloop is optional
+    uvloop = None
+
+
+def loop_name(use_uvloop: bool = True) -> str:
+    """Name of the event loop `run` would use."""
+    return "uvloop" if (use_uvloop and uvloop is not None) else "asyncio"
+
+
+def new_event_loop(use_uvloop: bool = True) -> asyncio.AbstractEventLoop:
+    """Create a uvloop loop if available (and wanted), an asyncio loop otherwise."""
+    if use_uvloop and uvloop is not None:
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+
+def run(main: Coroutine, use_uvloop: bool = True, debug: bool = None) -> Any:
+    """
+    Run `main` to completion on a new event loop, like `asyncio.run`.
+
+    Args:
+        main (Coroutine): The coroutine to run.
+        use_uvloop (bool, optional): Use uvloop when it is installed. Defaults to True.
+        debug (bool, optional): Run the loop in debug mode. Defaults to None.
+
+    Returns:
+        Any: The result of `main`.
+    """
+    with asyncio.Runner(debug=debug, loop_factory=lambda: new_event_loop(use_uvloop)) as runner:
+        return runner.run(main)
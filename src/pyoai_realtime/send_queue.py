@@ -0,0 +1,234 @@
+"""Outbound writer for `RealtimeAPI` with priority lanes and write coalescing."""
+
+import asyncio
+import base64
+import json
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Awaitable, Callable
+
+from pyoai_realtime.realtime_events import conversation_events, input_audio_buffer_events, response_events
+from pyoai_realtime.utils import percentile as _percentile
+
+
+class SendPriority(IntEnum):
+    """
+    Send lanes, lower values are written first.
+
+    Only events that do not depend on the order of earlier events belong in `URGENT`, everything else stays in
+    `NORMAL` so that e.g. an `input_audio_buffer.commit` is never written ahead of the appends before it. Urgent
+    events only overtake queued `input_audio_buffer.append` events, a `response.cancel` still goes out after the
+    `response.create` queued before it.
+    """
+
+    URGENT = 0
+    NORMAL = 1
+
+
+URGENT_EVENTS = frozenset({response_events.Cancel.type, conversation_events.Truncate.type})
+
+
+def default_priority(event_name: str) -> SendPriority:
+    return SendPriority.URGENT if event_name in URGENT_EVENTS else SendPriority.NORMAL
+
+
+def merge_audio(chunks: list[str]) -> str:
+    """Join base64 audio chunks into a single base64 string."""
+    # unpadded base64 concatenates as is, only padded chunks need the round trip
+    if all(len(chunk) % 4 == 0 and not chunk.endswith("=") for chunk in chunks[:-1]):
+        return "".join(chunks)
+    return base64.b64encode(b"".join(base64.b64decode(chunk) for chunk in chunks)).decode("ascii")
+
+
+@dataclass
+class SendQueueStats:
+    """
+    Counters for a `SendQueue`.
+
+    Attributes:
+        events (int): Events queued.
+        frames (int): Websocket frames written.
+        coalesced (int): Events merged into an earlier frame instead of being written on their own.
+        latencies (deque[float]): Seconds from queueing to written for the most recent events.
+    """
+
+    events: int = 0
+    frames: int = 0
+    coalesced: int = 0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=4096))
+
+    def latency_percentile(self, percentile: float) -> float:
+        """Queue-to-written latency in seconds at `percentile` (0-100) over the recent events."""
+        return _percentile(self.latencies, percentile)
+
+
+@dataclass
+class _Queued:
+    event: dict
+    enqueued: float
+    future: asyncio.Future = None
+    frame: str = None
+
+
+class SendQueue:
+    """
+    Single writer for a websocket.
+
+    Senders enqueue events and return right away (or await their frame with `wait=True`), one task owns the socket
+    and writes lane by lane. Back-to-back `input_audio_buffer.append` events in the same lane are merged into a single
+    frame up to `coalesce_bytes` of base64 audio.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[str], Awaitable],
+        dumps: Callable[[dict], str] = json.dumps,
+        coalesce_bytes: int = 32 * 1024,
+    ):
+        """
+        Args:
+            write (Callable[[str], Awaitable]): Writes a single frame, e.g. `ws.send`.
+            dumps (Callable[[dict], str], optional): Serializes an event. Defaults to json.dumps.
+            coalesce_bytes (int, optional): Upper bound for the merged audio of a single append, 0 disables
+                coalescing. Defaults to 32KiB.
+        """
+        self.write = write
+        self.dumps = dumps
+        self.coalesce_bytes = coalesce_bytes
+        self.lanes: tuple[deque[_Queued], ...] = tuple(deque() for _ in SendPriority)
+        self.stats = SendQueueStats()
+        self._wakeup = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._unsent = 0
+        # the error the writer stopped with, new events fail with it until `run` starts again
+        self.closed: Exception = None
+
+    def __len__(self) -> int:
+        return self._unsent
+
+    def put(
+        self, event: dict, priority: SendPriority = None, wait: bool = False, frame: str = None
+    ) -> asyncio.Future | None:
+        """
+        Queue an event for the writer.
+
+        Args:
+            event (dict): The complete event, including `type` and `event_id`.
+            priority (SendPriority, optional): The lane to use. Defaults to `default_priority(event["type"])`.
+            wait (bool, optional): Return a future that resolves once the event is written. Defaults to False.
+            frame (str, optional): The event already serialized, written as is instead of `dumps(event)`.
+                Defaults to None.
+
+        Returns:
+            asyncio.Future | None: The future if `wait` was requested, failed right away once the queue is closed.
+
+        Raises:
+            ConnectionError: If the queue is closed and `wait` was not requested.
+        """
+        future = asyncio.get_running_loop().create_future() if wait else None
+        if self.closed is not None:
+            if future is None:
+                raise self.closed
+            future.set_exception(self.closed)
+            return future
+
+        priority = default_priority(event["type"]) if priority is None else priority
+        queued = _Queued(event, time.perf_counter(), future, frame)
+        if priority is SendPriority.URGENT:
+            self._put_urgent(queued)
+        else:
+            self.lanes[priority].append(queued)
+        self.stats.events += 1
+        self._unsent += 1
+        self._drained.clear()
+        self._wakeup.set()
+        return future
+
+    def _put_urgent(self, queued: _Queued):
+        # jump the queued audio, but stay behind the last other event, e.g. the response.create a cancel refers to
+        normal = self.lanes[SendPriority.NORMAL]
+        for index in range(len(normal) - 1, -1, -1):
+            if normal[index].event["type"] != input_audio_buffer_events.Append.type:
+                normal.insert(index + 1, queued)
+                return
+        self.lanes[SendPriority.URGENT].append(queued)
+
+    async def flush(self):
+        """Wait until everything queued so far has been written."""
+        await self._drained.wait()
+
+    def _next_batch(self) -> list[_Queued]:
+        lane = next(lane for lane in self.lanes if lane)
+        batch = [lane.popleft()]
+        if batch[0].event["type"] != input_audio_buffer_events.Append.type or not self.coalesce_bytes:
+            return batch
+
+        size = len(batch[0].event["audio"])
+        while lane and lane[0].event["type"] == input_audio_buffer_events.Append.type:
+            if (size := size + len(lane[0].event["audio"])) > self.coalesce_bytes:
+                break
+            batch.append(lane.popleft())
+        return batch
+
+    def _frame(self, batch: list[_Queued]) -> str:
+        if len(batch) == 1:
+            queued = batch[0]
+            return queued.frame if queued.frame is not None else self.dumps(queued.event)
+        # the merged append keeps the first event id, the others were already dispatched as client events
+        self.stats.coalesced += len(batch) - 1
+        audio = merge_audio([queued.event["audio"] for queued in batch])
+        return self.dumps({**batch[0].event, "audio": audio})
+
+    def _done(self, batch: list[_Queued], err: Exception = None):
+        now = time.perf_counter()
+        for queued in batch:
+            self.stats.latencies.append(now - queued.enqueued)
+            if queued.future is None or queued.future.done():
+                continue
+            if err:
+                queued.future.set_exception(err)
+            else:
+                queued.future.set_result(True)
+        self._unsent -= len(batch)
+        if not self._unsent:
+            self._drained.set()
+
+    async def run(self):
+        """Writer loop, runs until cancelled or a write fails, the queue is closed afterwards."""
+        self.reopen()
+        err = None
+        try:
+            while True:
+                if not self._unsent:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                batch = self._next_batch()
+                try:
+                    await self.write(self._frame(batch))
+                except Exception as write_err:
+                    err = write_err
+                    self._done(batch, err)
+                    raise
+                self.stats.frames += 1
+                self._done(batch)
+        finally:
+            self.close(err)
+
+    def reopen(self):
+        """Accept events again after `close`, `run` does so when it starts."""
+        self.closed = None
+
+    def close(self, err: Exception = None):
+        """Fail everything still queued and every event queued later, e.g. once the connection is gone."""
+        err = ConnectionError(f"send queue closed: {err!r}" if err else "send queue closed")
+        self.closed = err
+        for lane in self.lanes:
+            batch = list(lane)
+            lane.clear()
+            self._done(batch, err)
+        self._drained.set()
@@ -0,0 +1,142 @@
+"""Pre-serialized `session.update` configs, shared across sessions.
+
+Most deployments open every session with the same large config (instructions, tool json schemas, voice settings).
+A `SessionConfig` serializes it once, field by field, and hashes each field, so sending it again only formats the
+event envelope around the cached json and an update to a running session sends just the fields that changed.
+
+    config = registry.register({"instructions": ..., "tools": [...], "voice": "alloy"}, name="support")
+    await api.update_session(config)  # the full config
+    await api.update_session(config.replace(voice="verse"))  # only "voice"
+"""
+
+import copy
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any
+
+from pyoai_realtime.realtime_events import session_events
+
+SESSION_UPDATE_TYPE = session_events.Update.type
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def _digest(data: str) -> bytes:
+    return hashlib.blake2b(data.encode(), digest_size=16).digest()
+
+
+class SessionConfig:
+    """
+    An immutable session config with its json cached per field.
+
+    Attributes:
+        session (dict): A private copy of the config, treat it as read only.
+        encoded (str): The whole config as canonical json (sorted keys, no whitespace).
+        digest (str): Hex digest of `encoded`, equal for equal configs.
+    """
+
+    __slots__ = ("session", "encoded", "digest", "_fragments", "_digests")
+
+    def __init__(self, session: dict):
+        self.session = copy.deepcopy(session)
+        self._fragments = {key: f"{json.dumps(key)}:{_dumps(value)}" for key, value in sorted(self.session.items())}
+        self._digests = {key: _digest(fragment) for key, fragment in self._fragments.items()}
+        self.encoded = "{" + ",".join(self._fragments.values()) + "}"
+        self.digest = _digest(self.encoded).hex()
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, SessionConfig) and self.digest == other.digest
+
+    def __hash__(self) -> int:
+        return hash(self.digest)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(fields={list(self._fragments)}, digest={self.digest[:12]})"
+
+    @property
+    def fields(self) -> list[str]:
+        return list(self._fragments)
+
+    def changed_fields(self, previous: "SessionConfig | None") -> list[str]:
+        """
+        Fields that are new or different compared to `previous`, all of them if there is none.
+
+        Fields only `previous` has are not reported, a partial `session.update` can not unset them.
+        """
+        if previous is None:
+            return self.fields
+        if previous.digest == self.digest:
+            return []
+        return [key for key, digest in self._digests.items() if previous._digests.get(key) != digest]
+
+    def encode(self, fields: list[str] = None) -> str:
+        """The json of the config, restricted to `fields` if given, from the cached fragments."""
+        if fields is None or len(fields) == len(self._fragments):
+            return self.encoded
+        return "{" + ",".join(self._fragments[key] for key in fields) + "}"
+
+    def frame(self, event_id: str, fields: list[str] = None) -> str:
+        """A complete `session.update` frame with `event_id`, ready to write to the socket."""
+        return f'{{"event_id":{json.dumps(event_id)},"type":"{SESSION_UPDATE_TYPE}","session":{self.encode(fields)}}}'
+
+    def event(self, event_id: str, fields: list[str] = None) -> dict:
+        """The `session.update` event as a dict, for client event handlers."""
+        session = self.session if fields is None else {key: self.session[key] for key in fields}
+        return {"session": session, "event_id": event_id, "type": SESSION_UPDATE_TYPE}
+
+    def replace(self, **changes) -> "SessionConfig":
+        """A new config with `changes` applied on top of this one."""
+        return SessionConfig({**self.session, **changes})
+
+
+class SessionConfigRegistry:
+    """
+    Interns session configs by digest so identical configs across sessions share one `SessionConfig`.
+
+    Configs can be registered under a name and looked up with `registry[name]`. At most `max_size` unnamed configs are
+    kept, the least recently registered go first.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._configs: OrderedDict[str, SessionConfig] = OrderedDict()
+        self._named: dict[str, SessionConfig] = {}
+
+    def register(self, session: dict | SessionConfig, name: str = None) -> SessionConfig:
+        """
+        Serialize (once) and intern a config.
+
+        Args:
+            session (dict | SessionConfig): The `session` object of a `session.update`.
+            name (str, optional): Name to look the config up by later. Defaults to None.
+
+        Returns:
+            SessionConfig: The interned config, the same instance for equal configs.
+        """
+        config = session if isinstance(session, SessionConfig) else SessionConfig(session)
+        if (existing := self._configs.get(config.digest)) is not None:
+            self._configs.move_to_end(config.digest)
+            config = existing
+        else:
+            self._configs[config.digest] = config
+            while len(self._configs) > self.max_size:
+                self._configs.popitem(last=False)
+        if name is not None:
+            self._named[name] = config
+        return config
+
+    def __getitem__(self, name: str) -> SessionConfig:
+        return self._named[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._named
+
+    def __len__(self) -> int:
+        return len(self._configs)
+
+
+# shared by every `RealtimeAPI` in the process
+default_registry = SessionConfigRegistry()
@@ -0,0 +1,75 @@
+"""Accumulator for streamed text and transcript deltas."""
+
+
+class TextBuilder:
+    """
+    Text built from many small fragments.
+
+    Appending is O(1), the fragments are only joined when the full text is read and the result is kept until the next
+    append, so a response of n characters costs O(n) in total no matter how it was split. `read_new` returns just the
+    text appended since its last call, for streaming into a UI without re-reading everything.
+
+        text = TextBuilder()
+        text += "Hel"
+        text += "lo"
+        str(text)  # "Hello"
+        text.read_new()  # "Hello"
+        text += "!"
+        text.read_new()  # "!"
+    """
+
+    __slots__ = ("_parts", "_unread", "_length")
+
+    def __init__(self, text: str = ""):
+        self.reset(text)
+
+    def append(self, fragment: str) -> "TextBuilder":
+        """Add `fragment` to the end of the text."""
+        if fragment:
+            self._parts.append(fragment)
+            self._unread.append(fragment)
+            self._length += len(fragment)
+        return self
+
+    __iadd__ = append
+
+    def reset(self, text: str = "") -> "TextBuilder":
+        """Replace the text, `text` counts as unread."""
+        self._parts = [text] if text else []
+        self._unread = list(self._parts)
+        self._length = len(text)
+        return self
+
+    @property
+    def text(self) -> str:
+        """The full text, joined on first access after an append."""
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def read_new(self) -> str:
+        """The text appended since the previous `read_new` (or creation), marks it as read."""
+        new = "".join(self._unread)
+        self._unread.clear()
+        return new
+
+    @property
+    def unread(self) -> int:
+        """Number of fragments waiting for `read_new`."""
+        return len(self._unread)
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, TextBuilder):
+            other = other.text
+        return self.text == other if isinstance(other, str) else NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.text!r})"
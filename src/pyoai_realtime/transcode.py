@@ -0,0 +1,193 @@
+"""Codec transcoding between the api format (PCM16 mono at `DEFAULT_FREQUENCY`) and what the other end speaks.
+
+A `Transcoder` wraps a codec with a resampler in each direction and works on chunks as they arrive:
+
+    transcoder = Transcoder(MuLawCodec())  # G.711 μ-law at 8 kHz, e.g. a telephony leg
+    api.add_audio_sink(transcoder.audio_sink(phone.send))  # response audio, encoded
+    await api.start_session(config, initial_audio=transcoder.decode_stream(phone.packets()))
+
+    relay = RealtimeRelay(upstream_url=..., transcoder=lambda: Transcoder(OpusCodec()))  # binary frames carry opus
+
+Codecs are packet oriented: `encode` takes PCM16 at the codec's `sample_rate` and returns the packets that are complete
+so far, `decode` takes one packet, `flush` returns whatever is buffered. `MuLawCodec` is table driven, vectorized with
+NumPy when it is installed, `OpusCodec` needs `opuslib` (and libopus).
+"""
+
+import asyncio
+import functools
+from array import array
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Protocol
+
+from pyoai_realtime.audio import AudioConverter, np
+from pyoai_realtime.audio_fast_path import AudioDelta
+from pyoai_realtime.constants import DEFAULT_FREQUENCY
+
+
+class Codec(Protocol):
+    name: str
+    sample_rate: int
+
+    def encode(self, pcm: bytes) -> list[bytes]: ...
+
+    def decode(self, packet: bytes) -> bytes: ...
+
+    def flush(self) -> list[bytes]: ...
+
+
+# the reference implementation (Sun's g711.c) works on 14 bit samples
+_MULAW_BIAS = 0x84
+_MULAW_CLIP = 8159
+
+
+def _mulaw_encode_sample(sample: int) -> int:
+    sample >>= 2
+    mask = 0x7F if sample < 0 else 0xFF
+    magnitude = min(abs(sample), _MULAW_CLIP) + (_MULAW_BIAS >> 2)
+    if (segment := magnitude.bit_length() - 6) > 7:
+        return 0x7F ^ mask
+    return ((segment << 4) | ((magnitude >> (segment + 1)) & 0x0F)) ^ mask
+
+
+def _mulaw_decode_byte(code: int) -> int:
+    code = ~code & 0xFF
+    magnitude = (((code & 0x0F) << 3) + _MULAW_BIAS << ((code >> 4) & 0x07)) - _MULAW_BIAS
+    return -magnitude if code & 0x80 else magnitude
+
+
+@functools.cache
+def _mulaw_tables() -> tuple[bytes, array]:
+    """μ-law code of every int16 (indexed by its unsigned 16 bit pattern) and the sample of every code."""
+    encode = bytes(_mulaw_encode_sample(sample) for sample in array("h", array("H", range(0x10000)).tobytes()))
+    decode = array("h", map(_mulaw_decode_byte, range(256)))
+    return encode, decode
+
+
+class MuLawCodec:
+    """G.711 μ-law, one byte per sample, one packet per chunk."""
+
+    name = "pcmu"
+
+    def __init__(self, sample_rate: int = 8000, use_numpy: bool = True):
+        """
+        Args:
+            sample_rate (int, optional): Sample rate of the encoded audio. Defaults to 8000.
+            use_numpy (bool, optional): Use the vectorized NumPy path if available. Defaults to True.
+        """
+        self.sample_rate = sample_rate
+        self.use_numpy = use_numpy and np is not None
+        encode, decode = _mulaw_tables()
+        if self.use_numpy:
+            self._encode = np.frombuffer(encode, dtype=np.uint8)
+            self._decode = np.asarray(decode, dtype="<i2")
+        else:
+            self._encode, self._decode = encode, decode
+
+    def encode(self, pcm: bytes) -> list[bytes]:
+        if not pcm:
+            return []
+        if self.use_numpy:
+            return [self._encode[np.frombuffer(pcm, dtype="<u2")].tobytes()]
+        return [bytes(map(self._encode.__getitem__, array("H", pcm)))]
+
+    def decode(self, packet: bytes) -> bytes:
+        if self.use_numpy:
+            return self._decode[np.frombuffer(packet, dtype=np.uint8)].tobytes()
+        return array("h", map(self._decode.__getitem__, packet)).tobytes()
+
+    def flush(self) -> list[bytes]:
+        return []
+
+
+class OpusCodec:
+    """Opus through `opuslib`, audio is cut into `frame_ms` frames and each frame is one packet."""
+
+    name = "opus"
+
+    def __init__(self, sample_rate: int = 48_000, frame_ms: int = 20, bitrate: int = None, application: str = "voip"):
+        """
+        Args:
+            sample_rate (int, optional): 8000, 12000, 16000, 24000 or 48000. Defaults to 48_000.
+            frame_ms (int, optional): Frame length, 10, 20, 40 or 60 ms. Defaults to 20.
+            bitrate (int, optional): Target bits per second. Defaults to the libopus default.
+            application (str, optional): "voip", "audio" or "restricted_lowdelay". Defaults to "voip".
+        """
+        try:
+            import opuslib
+        except ImportError as err:
+            raise ImportError("OpusCodec needs opuslib, `pip install opuslib` (and libopus)") from err
+
+        self.sample_rate = sample_rate
+        self.frame_size = sample_rate * frame_ms // 1000
+        self._encoder = opuslib.Encoder(sample_rate, 1, application)
+        if bitrate is not None:
+            self._encoder.bitrate = bitrate
+        self._decoder = opuslib.Decoder(sample_rate, 1)
+        self._frame_bytes = self.frame_size * 2
+        self._pending = b""
+
+    def encode(self, pcm: bytes) -> list[bytes]:
+        data = self._pending + pcm
+        usable = len(data) - len(data) % self._frame_bytes
+        self._pending = data[usable:]
+        return [
+            self._encoder.encode(data[i : i + self._frame_bytes], self.frame_size)
+            for i in range(0, usable, self._frame_bytes)
+        ]
+
+    def decode(self, packet: bytes) -> bytes:
+        # room for the longest frame opus allows (120 ms)
+        return self._decoder.decode(bytes(packet), self.sample_rate * 120 // 1000)
+
+    def flush(self) -> list[bytes]:
+        """Encode the last partial frame padded with silence."""
+        if not self._pending:
+            return []
+        return self.encode(bytes(self._frame_bytes - len(self._pending)))
+
+
+class Transcoder:
+    """
+    Streaming conversion between api audio and a codec, resampling in both directions.
+
+    `encode` and `decode` keep their own resampler state, one `Transcoder` serves one stream in each direction.
+    """
+
+    def __init__(self, codec: Codec, rate: int = DEFAULT_FREQUENCY, use_numpy: bool = True):
+        """
+        Args:
+            codec (Codec): The codec on the other end, e.g. `MuLawCodec()`.
+            rate (int, optional): Sample rate of the api side. Defaults to DEFAULT_FREQUENCY.
+            use_numpy (bool, optional): Resample with NumPy if available. Defaults to True.
+        """
+        self.codec = codec
+        self.rate = rate
+        self._outbound = AudioConverter(rate, dst_rate=codec.sample_rate, use_numpy=use_numpy)
+        self._inbound = AudioConverter(codec.sample_rate, dst_rate=rate, use_numpy=use_numpy)
+
+    def encode(self, pcm: bytes) -> list[bytes]:
+        """Encode a chunk of api PCM16, returns the packets completed by it."""
+        return self.codec.encode(self._outbound.convert(pcm))
+
+    def decode(self, packet: bytes) -> bytes:
+        """Decode one packet to api PCM16."""
+        return self._inbound.convert(self.codec.decode(packet))
+
+    def flush(self) -> list[bytes]:
+        """Encode what the resampler and the codec still hold and start a new outbound stream."""
+        return [*self.codec.encode(self._outbound.flush()), *self.codec.flush()]
+
+    def audio_sink(self, send: Callable[[bytes], Any]) -> Callable[[AudioDelta], Any]:
+        """An audio sink for `RealtimeAPI.add_audio_sink`, calls (or awaits) `send` with every encoded packet."""
+        is_async = asyncio.iscoroutinefunction(send)
+
+        async def sink(frame: AudioDelta):
+            for packet in self.encode(frame.pcm):
+                _ = await send(packet) if is_async else send(packet)
+
+        return sink
+
+    async def decode_stream(self, packets: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+        """Decode packets as they arrive, e.g. for `start_session(initial_audio=...)`."""
+        async for packet in packets:
+            if pcm := self.decode(packet):
+                yield pcm
@@ -0,0 +1,105 @@
+"""Websocket transport settings shared by `RealtimeAPI` and `RealtimeRelay`."""
+
+from dataclasses import asdict, dataclass
+from typing import Any
+
+
+@dataclass(frozen=True)
+class TransportConfig:
+    """
+    Websocket settings for realtime traffic.
+
+    The defaults are tuned for base64 audio: no compression (it barely shrinks base64 and costs more CPU than it saves),
+    room for large items and bursts of audio deltas. `library_defaults()` gives the `websockets` defaults instead.
+
+    Attributes:
+        compress_outbound (bool): Deflate the messages this side sends.
+        compress_inbound (bool): Accept deflated messages from the peer. Compression is negotiated when either
+            direction is enabled, after which the peer decides for its own messages, so with only
+            `compress_outbound` enabled the peer may still compress.
+        compression_level (int): zlib level for outbound compression.
+        max_window_bits (int): LZ77 window for both directions, smaller uses less memory per connection.
+        max_size (int | None): Largest incoming message in bytes, None for no limit.
+        max_queue (int | None): Incoming frames buffered before the reader applies flow control.
+        write_limit (int): Outgoing bytes buffered before `send` waits on the socket.
+        ping_interval (float | None): Seconds between keepalive pings, None disables them.
+        ping_timeout (float | None): Seconds to wait for a pong before closing.
+        open_timeout (float | None): Seconds allowed for the opening handshake.
+        close_timeout (float | None): Seconds allowed for the closing handshake.
+    """
+
+    compress_outbound: bool = False
+    compress_inbound: bool = False
+    compression_level: int = 1
+    max_window_bits: int = 12
+    max_size: int | None = 16 * 2**20
+    max_queue: int | None = 128
+    write_limit: int = 64 * 2**10
+    ping_interval: float | None = 20
+    ping_timeout: float | None = 20
+    open_timeout: float | None = 10
+    close_timeout: float | None = 10
+
+    @classmethod
+    def library_defaults(cls) -> "TransportConfig":
+        """The `websockets` defaults: deflate in both directions, 1MiB messages, 16 frame queue, 32KiB writes."""
+        return cls(
+            compress_outbound=True,
+            compress_inbound=True,
+            compression_level=6,
+            max_window_bits=15,
+            max_size=2**20,
+            max_queue=16,
+            write_limit=32 * 2**10,
+        )
+
+    @property
+    def compression(self) -> bool:
+        """True if permessage-deflate is negotiated at all."""
+        return self.compress_outbound or self.compress_inbound
+
+    def _common_kwargs(self) -> dict[str, Any]:
+        kwargs = asdict(self)
+        for key in ("compress_outbound", "compress_inbound", "compression_level", "max_window_bits"):
+            kwargs.pop(key)
+        # the extension is configured explicitly below
+        kwargs["compression"] = None
+        return kwargs
+
+    def _compress_settings(self) -> dict[str, Any]:
+        return {"level": self.compression_level, "memLevel": 5}
+
+    def client_kwargs(self) -> dict[str, Any]:
+        """Keyword arguments for `websockets.asyncio.client.connect`."""
+        kwargs = self._common_kwargs()
+        if self.compression:
+            from pyoai_realtime.deflate import ClientDirectionalDeflateFactory
+
+            kwargs["extensions"] = [
+                ClientDirectionalDeflateFactory(
+                    compress_outbound=self.compress_outbound,
+                    # without outbound compression the client never needs to keep a compression context
+                    client_no_context_takeover=not self.compress_outbound,
+                    server_max_window_bits=self.max_window_bits,
+                    client_max_window_bits=self.max_window_bits,
+                    compress_settings=self._compress_settings(),
+                )
+            ]
+        return kwargs
+
+    def server_kwargs(self) -> dict[str, Any]:
+        """Keyword arguments for `websockets.asyncio.server.serve`."""
+        kwargs = self._common_kwargs()
+        if self.compression:
+            from pyoai_realtime.deflate import ServerDirectionalDeflateFactory
+
+            kwargs["extensions"] = [
+                ServerDirectionalDeflateFactory(
+                    compress_outbound=self.compress_outbound,
+                    server_no_context_takeover=not self.compress_outbound,
+                    server_max_window_bits=self.max_window_bits,
+                    client_max_window_bits=self.max_window_bits,
+                    compress_settings=self._compress_settings(),
+                )
+            ]
+        return kwargs
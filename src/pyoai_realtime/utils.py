@@ -1,6 +1,55 @@
-from array import array
-import random
+import os
 import string
+import threading
+import time
+from array import array
+from typing import Iterable
+
+ID_ALPHABET = string.digits[1:] + string.ascii_letters
+_BASE = len(ID_ALPHABET)
+# the same characters in ascii order, fixed width encodings with it sort like the numbers they encode
+_SORTABLE_ALPHABET = "".join(sorted(ID_ALPHABET))
+# bytes >= _ACCEPT are rejected so every character is equally likely
+_ACCEPT = 256 - 256 % _BASE
+_TRANSLATE = bytes(ord(ID_ALPHABET[b % _BASE]) if b < _ACCEPT else 0 for b in range(256))
+_REJECT = bytes(range(_ACCEPT, 256))
+_ENTROPY_BATCH = 4096
+
+_TIME_WIDTH = 9  # 61**9 ms is well past the year 10000
+_COUNTER_WIDTH = 3
+
+_local = threading.local()
+_monotonic_lock = threading.Lock()
+_monotonic_state = {"ms": 0, "counter": 0}
+
+
+def _reset_after_fork():
+    # a forked child must never hand out the random characters its parent buffered
+    global _local
+    _local = threading.local()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _random_chars(k: int) -> str:
+    local = _local
+    buffer, pos = getattr(local, "buffer", ""), getattr(local, "pos", 0)
+    if pos + k > len(buffer):
+        buffer, pos = buffer[pos:], 0
+        while len(buffer) < k:
+            buffer += os.urandom(_ENTROPY_BATCH).translate(_TRANSLATE, _REJECT).decode("ascii")
+        local.buffer = buffer
+    local.pos = pos + k
+    return buffer[pos : pos + k]
+
+
+def _encode(value: int, width: int) -> str:
+    chars = []
+    for _ in range(width):
+        value, rem = divmod(value, _BASE)
+        chars.append(_SORTABLE_ALPHABET[rem])
+    return "".join(reversed(chars))
 
 
 def generate_id(prefix: str, length: int = 21) -> str:
@@ -22,9 +71,54 @@ def generate_id(prefix: str, length: int = 21) -> str:
 
     Note:
         The random part of the ID is generated using digits (1-9) and
-        both uppercase and lowercase ASCII letters.
+        both uppercase and lowercase ASCII letters, drawn from `os.urandom` in
+        batches. Buffers are per thread and dropped in forked children, so
+        workers never share a random stream.
     """
-    return prefix + "".join(random.choices(string.digits[1:] + string.ascii_letters, k=length - len(prefix)))
+    # a prefix longer than `length` gets no random part, a negative count would rewind the shared buffer
+    return prefix + _random_chars(max(0, length - len(prefix)))
+
+
+def generate_monotonic_id(prefix: str, length: int = 21) -> str:
+    """
+    Generate a sortable ID with a given prefix.
+
+    The random part starts with the current time in milliseconds and a per
+    millisecond counter, so IDs from one process sort in creation order and
+    IDs from different processes interleave by time. The rest is random as in
+    `generate_id`.
+
+    Args:
+        prefix (str): The string to be prepended to the ID.
+        length (int, optional): The total length of the generated ID, including
+                                the prefix. Defaults to 21.
+
+    Returns:
+        str: The prefix, a time and counter part and random characters.
+
+    Raises:
+        ValueError: If `length` leaves no room for at least 4 random characters.
+    """
+    random_length = length - len(prefix) - _TIME_WIDTH - _COUNTER_WIDTH
+    if random_length < 4:
+        raise ValueError(f"length {length} is too short for a monotonic id with prefix {prefix!r}")
+
+    now = time.time_ns() // 1_000_000
+    with _monotonic_lock:
+        if now > _monotonic_state["ms"]:
+            _monotonic_state["ms"], _monotonic_state["counter"] = now, 0
+        else:
+            # same millisecond (or the clock went back), keep counting from the last timestamp
+            _monotonic_state["counter"] += 1
+            if _monotonic_state["counter"] >= _BASE**_COUNTER_WIDTH:
+                _monotonic_state["ms"] += 1
+                _monotonic_state["counter"] = 0
+        ms, counter = _monotonic_state["ms"], _monotonic_state["counter"]
+        if _monotonic_state.get("encoded_ms") != ms:
+            _monotonic_state["encoded_ms"], _monotonic_state["encoded"] = ms, _encode(ms, _TIME_WIDTH)
+        encoded_ms = _monotonic_state["encoded"]
+
+    return prefix + encoded_ms + _encode(counter, _COUNTER_WIDTH) + _random_chars(random_length)
 
 
 def merge_arrays(arr1: list[int] | array, arr2: list[int] | array, use_array: bool = False) -> list[int]:
@@ -51,3 +145,20 @@ def merge_arrays(arr1: list[int] | array, arr2: list[int] | array, use_array: bo
         return array("h", arr1)
 
     return arr1
+
+
+def percentile(values: Iterable[float], percent: float) -> float:
+    """
+    Nearest-rank percentile of `values`, what the stats classes report.
+
+    Args:
+        values (Iterable[float]): The samples, in any order.
+        percent (float): The percentile, 0-100. 100 is the maximum.
+
+    Returns:
+        float: The sample at `percent`, 0.0 without samples.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
@@ -0,0 +1,250 @@
+"""Client-side voice activity detection for the input audio send path.
+
+Silence is dropped before it is ever turned into an `input_audio_buffer.append`, speech onsets are pre-rolled so the
+first syllable is not clipped and the buffer is committed (or cleared) automatically once the speaker goes quiet.
+"""
+
+import base64
+import math
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from enum import StrEnum, auto
+
+from pyoai_realtime.constants import DEFAULT_FREQUENCY
+from pyoai_realtime.realtime_events import input_audio_buffer_events
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, fall back to the array module
+    np = None
+
+_PCM16_MAX = 32768.0
+
+
+class VADState(StrEnum):
+    """The state of the voice activity detector."""
+
+    SILENCE = auto()
+    SPEECH = auto()
+
+
+@dataclass
+class VADConfig:
+    """
+    Configuration for the client-side voice activity detector.
+
+    Attributes:
+        sample_rate (int): Sample rate of the incoming PCM16 mono audio.
+        frame_ms (int): Length of an analysis frame.
+        energy_threshold (float): RMS level (normalized to [0, 1]) above which a frame is speech.
+        zcr_threshold (float): Zero-crossing rate above which a quieter frame (at least half the energy
+            threshold) still counts as speech, this catches unvoiced onsets such as fricatives.
+        pre_roll_ms (int): Audio kept from before a speech onset and sent along with it.
+        hangover_ms (int): Trailing silence that is still streamed after speech.
+        commit_silence_ms (int): Silence after speech that ends the turn.
+        min_speech_ms (int): Turns shorter than this are cleared instead of committed.
+        auto_commit (bool): Issue `input_audio_buffer.commit`/`clear` when a turn ends. Disable when the
+            server side turn detection is enabled.
+    """
+
+    sample_rate: int = DEFAULT_FREQUENCY
+    frame_ms: int = 20
+    energy_threshold: float = 0.015
+    zcr_threshold: float = 0.3
+    pre_roll_ms: int = 300
+    hangover_ms: int = 200
+    commit_silence_ms: int = 700
+    min_speech_ms: int = 100
+    auto_commit: bool = True
+
+    @property
+    def frame_samples(self) -> int:
+        return self.sample_rate * self.frame_ms // 1000
+
+    def frames(self, ms: int) -> int:
+        return max(ms // self.frame_ms, 0)
+
+
+@dataclass
+class VADStats:
+    frames_in: int = 0
+    frames_sent: int = 0
+    frames_dropped: int = 0
+    commits: int = 0
+    clears: int = 0
+
+    @property
+    def dropped_ratio(self) -> float:
+        return self.frames_dropped / self.frames_in if self.frames_in else 0.0
+
+
+def frame_features(pcm: bytes, frame_samples: int, use_numpy: bool = True) -> tuple[list[float], list[float]]:
+    """
+    Compute the RMS energy and zero-crossing rate of each complete frame in `pcm`.
+
+    Args:
+        pcm (bytes): PCM16 little-endian mono audio, must hold a whole number of frames.
+        frame_samples (int): Number of samples per frame.
+        use_numpy (bool, optional): Use the vectorized NumPy path if available. Defaults to True.
+
+    Returns:
+        tuple[list[float], list[float]]: The per-frame RMS (normalized to [0, 1]) and zero-crossing rate.
+    """
+    if use_numpy and np is not None:
+        frames = np.frombuffer(pcm, dtype="<i2").reshape(-1, frame_samples).astype(np.float32)
+        frames /= _PCM16_MAX
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_samples - 1)
+        return rms.tolist(), zcr.tolist()
+
+    samples = array("h", pcm)
+    rms, zcr = [], []
+    for start in range(0, len(samples), frame_samples):
+        frame = samples[start : start + frame_samples]
+        rms.append(math.sqrt(sum(s * s for s in frame) / frame_samples) / _PCM16_MAX)
+        crossings = sum((a < 0) != (b < 0) for a, b in zip(frame, frame[1:]))
+        zcr.append(crossings / (frame_samples - 1))
+    return rms, zcr
+
+
+class VoiceActivityDetector:
+    """
+    Energy and zero-crossing based VAD that sits in front of `input_audio_buffer.append`.
+
+    Feed it PCM16 mono audio with `process` and send the returned client events, e.g.
+
+        vad = VoiceActivityDetector()
+        for event_name, data in vad.process(pcm):
+            await api.send(event_name, data)
+
+    or use `stream` which does the same against a `RealtimeAPI`.
+    """
+
+    def __init__(self, config: VADConfig = None, use_numpy: bool = True):
+        self.config = config or VADConfig()
+        self.use_numpy = use_numpy and np is not None
+        self.stats = VADStats()
+        self.reset()
+
+    def reset(self):
+        """Reset the detector to silence, dropping any buffered audio."""
+        self.state = VADState.SILENCE
+        self._remainder = b""
+        self._pre_roll = deque(maxlen=self.config.frames(self.config.pre_roll_ms))
+        self._silent_frames = 0
+        self._speech_frames = 0
+
+    def _is_speech(self, rms: float, zcr: float) -> bool:
+        threshold = self.config.energy_threshold
+        return rms >= threshold or (rms >= threshold / 2 and zcr >= self.config.zcr_threshold)
+
+    def _hold(self, frame: bytes):
+        # silent frames wait in the pre-roll, whatever falls out of it is never sent
+        if len(self._pre_roll) == self._pre_roll.maxlen:
+            self.stats.frames_dropped += 1
+        self._pre_roll.append(frame)
+
+    def _end_turn(self, events: list[tuple[str, dict]]):
+        if self.config.auto_commit:
+            if self._speech_frames >= self.config.frames(self.config.min_speech_ms):
+                events.append((input_audio_buffer_events.Commit.type, {}))
+                self.stats.commits += 1
+            else:
+                events.append((input_audio_buffer_events.Clear.type, {}))
+                self.stats.clears += 1
+        self.state = VADState.SILENCE
+        self._silent_frames = 0
+        self._speech_frames = 0
+
+    def process(self, pcm: bytes) -> list[tuple[str, dict]]:
+        """
+        Run the detector over a chunk of PCM16 mono audio.
+
+        Args:
+            pcm (bytes): PCM16 little-endian mono audio of any length, partial frames are kept for the next call.
+
+        Returns:
+            list[tuple[str, dict]]: The `(event_name, data)` pairs to pass to `RealtimeAPI.send`, in order.
+        """
+        frame_bytes = self.config.frame_samples * 2
+        pcm = self._remainder + pcm
+        usable = len(pcm) - len(pcm) % frame_bytes
+        self._remainder = pcm[usable:]
+        if not usable:
+            return []
+
+        rms, zcr = frame_features(pcm[:usable], self.config.frame_samples, self.use_numpy)
+        hangover = self.config.frames(self.config.hangover_ms)
+        commit_after = max(self.config.frames(self.config.commit_silence_ms), hangover)
+
+        events, outgoing = [], []
+
+        def _flush_outgoing():
+            if outgoing:
+                audio = base64.b64encode(b"".join(outgoing)).decode("ascii")
+                events.append((input_audio_buffer_events.Append.type, {"audio": audio}))
+                outgoing.clear()
+
+        for idx, (frame_rms, frame_zcr) in enumerate(zip(rms, zcr)):
+            frame = pcm[idx * frame_bytes : (idx + 1) * frame_bytes]
+            self.stats.frames_in += 1
+
+            if self._is_speech(frame_rms, frame_zcr):
+                self.state = VADState.SPEECH
+                # send the pre-roll (or the silence held back mid-turn) ahead of the onset
+                outgoing.extend(self._pre_roll)
+                self.stats.frames_sent += len(self._pre_roll) + 1
+                self._pre_roll.clear()
+                outgoing.append(frame)
+                self._silent_frames = 0
+                self._speech_frames += 1
+                continue
+
+            if self.state is VADState.SILENCE:
+                self._hold(frame)
+                continue
+
+            self._silent_frames += 1
+            if self._silent_frames <= hangover:
+                outgoing.append(frame)
+                self.stats.frames_sent += 1
+            else:
+                self._hold(frame)
+
+            if self._silent_frames >= commit_after:
+                _flush_outgoing()
+                self._end_turn(events)
+
+        _flush_outgoing()
+        return events
+
+    def flush(self) -> list[tuple[str, dict]]:
+        """
+        End the stream, committing the current turn if speech is in progress.
+
+        Returns:
+            list[tuple[str, dict]]: The remaining `(event_name, data)` pairs to send.
+        """
+        events = []
+        if self.state is VADState.SPEECH:
+            self._end_turn(events)
+        self.reset()
+        return events
+
+    async def stream(self, api, pcm: bytes) -> int:
+        """
+        Process `pcm` and send the resulting events with `api.send`.
+
+        Args:
+            api (RealtimeAPI): A connected realtime api.
+            pcm (bytes): PCM16 little-endian mono audio.
+
+        Returns:
+            int: The number of events sent.
+        """
+        events = self.process(pcm)
+        for event_name, data in events:
+            await api.send(event_name, data)
+        return len(events)
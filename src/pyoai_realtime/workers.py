@@ -0,0 +1,494 @@
+"""Multi-process runtime that shards realtime sessions across worker processes.
+
+A single event loop is bound to one core for json decoding, base64 and dispatch. `WorkerSupervisor` spawns N worker
+processes, each running its own loop with a `RealtimeSessionPool`, and assigns sessions to workers by consistent
+hashing of the session key. Supervisor and workers talk newline delimited json over local unix sockets, the same
+protocol the supervisor exposes on its own control socket for health and aggregated metrics.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from pyoai_realtime import log
+from pyoai_realtime.realtime_api import RealtimeAPI
+
+SessionRunner = Callable[[RealtimeAPI, dict], Awaitable[Any]]
+
+
+class ConsistentHashRing:
+    """
+    Consistent hash ring with virtual nodes, adding or removing a node only moves the keys that node owned.
+    """
+
+    def __init__(self, nodes: list[str] = (), replicas: int = 128):
+        self.replicas = replicas
+        self._hashes: list[int] = []
+        self._nodes: dict[int, str] = {}
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+    def add(self, node: str):
+        for replica in range(self.replicas):
+            point = self._hash(f"{node}#{replica}")
+            if point not in self._nodes:
+                bisect.insort(self._hashes, point)
+            self._nodes[point] = node
+
+    def remove(self, node: str):
+        for replica in range(self.replicas):
+            point = self._hash(f"{node}#{replica}")
+            if self._nodes.get(point) == node:
+                del self._nodes[point]
+                self._hashes.pop(bisect.bisect_left(self._hashes, point))
+
+    def get(self, key: str) -> str:
+        """Return the node owning `key`."""
+        if not self._hashes:
+            raise LookupError("ConsistentHashRing has no nodes")
+        idx = bisect.bisect(self._hashes, self._hash(key)) % len(self._hashes)
+        return self._nodes[self._hashes[idx]]
+
+    @property
+    def nodes(self) -> set[str]:
+        return set(self._nodes.values())
+
+
+async def control_request(path: str, payload: dict, timeout: float = 5.0) -> dict:
+    """
+    Send a single command to a control socket and return the reply.
+
+    Args:
+        path (str): The unix socket path.
+        payload (dict): The command, e.g. `{"cmd": "metrics"}`.
+        timeout (float, optional): Seconds to wait for the reply. Defaults to 5.0.
+
+    Returns:
+        dict: The decoded reply.
+    """
+    async with asyncio.timeout(timeout):
+        reader, writer = await asyncio.open_unix_connection(path)
+        try:
+            writer.write(json.dumps(payload).encode() + b"\n")
+            await writer.drain()
+            return json.loads(await reader.readline())
+        finally:
+            writer.close()
+
+
+async def serve_control(path: str, handlers: dict[str, Callable[[dict], Awaitable[dict]]]) -> asyncio.Server:
+    """
+    Serve newline delimited json commands on a unix socket, `handlers` maps `cmd` to the coroutine answering it.
+    """
+
+    async def _client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                if (handler := handlers.get(request.get("cmd"))) is None:
+                    reply = {"ok": False, "error": f"unknown command {request.get('cmd')!r}"}
+                else:
+                    try:
+                        reply = {"ok": True, **(await handler(request))}
+                    except Exception as err:
+                        reply = {"ok": False, "error": str(err)}
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    return await asyncio.start_unix_server(_client, path)
+
+
+@dataclass
+class PoolMetrics:
+    """
+    Counters for a `RealtimeSessionPool`.
+
+    Attributes:
+        opened (int): Sessions opened.
+        closed (int): Sessions closed (finished, failed or drained).
+        failed (int): Sessions whose runner raised.
+        frames_received (int): Server events received across all sessions.
+    """
+
+    opened: int = 0
+    closed: int = 0
+    failed: int = 0
+    frames_received: int = 0
+
+
+@dataclass
+class _Session:
+    api: RealtimeAPI
+    task: asyncio.Task = None
+    started: float = field(default_factory=time.monotonic)
+
+
+class RealtimeSessionPool:
+    """
+    Manages the `RealtimeAPI` sessions of one event loop.
+
+    Every session gets its own api, connected before `runner(api, params)` is started in a task, the session ends
+    (and the api disconnects) when the runner returns.
+    """
+
+    def __init__(self, runner: SessionRunner, api_factory: Callable[..., RealtimeAPI] = RealtimeAPI, **api_kwargs):
+        """
+        Args:
+            runner (SessionRunner): Coroutine function driving a session, called with the connected api and the
+                session params.
+            api_factory (Callable[..., RealtimeAPI], optional): Creates the api of a session. Defaults to RealtimeAPI.
+            api_kwargs: Passed on to `api_factory`.
+        """
+        self.runner = runner
+        self.api_factory = api_factory
+        self.api_kwargs = api_kwargs
+        self.sessions: dict[str, _Session] = {}
+        self.metrics = PoolMetrics()
+        self.accepting = True
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    async def open(self, session_key: str, params: dict = None) -> RealtimeAPI:
+        """
+        Connect a new session and start its runner.
+
+        Args:
+            session_key (str): Unique key of the session.
+            params (dict, optional): Passed to the runner, `model` is also used for the connection. Defaults to None.
+
+        Returns:
+            RealtimeAPI: The connected api of the session.
+
+        Raises:
+            RuntimeError: If the pool is draining or the session already exists.
+        """
+        if not self.accepting:
+            raise RuntimeError("RealtimeSessionPool is draining")
+        if session_key in self.sessions:
+            raise RuntimeError(f"Session {session_key} already exists")
+
+        params = params or {}
+        api = self.api_factory(**self.api_kwargs)
+        api.on("server.*", self._count_frame)
+        session = self.sessions[session_key] = _Session(api)
+        try:
+            await api.connect(**({"model": params["model"]} if "model" in params else {}))
+        except Exception:
+            self.sessions.pop(session_key, None)
+            raise
+
+        self.metrics.opened += 1
+        session.task = asyncio.create_task(self._run(session_key, session, params), name=f"session:{session_key}")
+        return api
+
+    def _count_frame(self, event: dict):
+        self.metrics.frames_received += 1
+
+    async def _run(self, session_key: str, session: _Session, params: dict):
+        try:
+            await self.runner(session.api, params)
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            self.metrics.failed += 1
+            log.log(f"session {session_key} failed: {err}")
+        finally:
+            self.sessions.pop(session_key, None)
+            self.metrics.closed += 1
+            await session.api.disconnect()
+
+    async def close(self, session_key: str) -> bool:
+        """Stop a session's runner and disconnect it."""
+        if (session := self.sessions.get(session_key)) is None:
+            return False
+        session.task.cancel()
+        await asyncio.gather(session.task, return_exceptions=True)
+        return True
+
+    async def drain(self, timeout: float = 30.0) -> int:
+        """
+        Stop accepting sessions and wait for the open ones to finish, closing whatever is left after `timeout`.
+
+        Returns:
+            int: The number of sessions that had to be closed.
+        """
+        self.accepting = False
+        tasks = [session.task for session in self.sessions.values() if session.task]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+        else:
+            pending = set()
+        for key in list(self.sessions):
+            await self.close(key)
+        return len(pending)
+
+    def snapshot(self) -> dict:
+        """Current metrics as a plain dict."""
+        return {"active": len(self.sessions), "accepting": self.accepting, **vars(self.metrics)}
+
+
+def _worker_main(worker_id: str, control_path: str, runner: SessionRunner, api_factory: Callable, api_kwargs: dict):
+    async def main():
+        pool = RealtimeSessionPool(runner, api_factory, **api_kwargs)
+        stopped = asyncio.Event()
+
+        async def _open(request: dict) -> dict:
+            await pool.open(request["session_key"], request.get("params"))
+            return {"worker": worker_id}
+
+        async def _close(request: dict) -> dict:
+            return {"closed": await pool.close(request["session_key"])}
+
+        async def _ping(request: dict) -> dict:
+            return {"worker": worker_id, "pid": os.getpid(), "active": len(pool), "sessions": list(pool.sessions)}
+
+        async def _metrics(request: dict) -> dict:
+            return {"worker": worker_id, "pid": os.getpid(), **pool.snapshot()}
+
+        async def _drain(request: dict) -> dict:
+            forced = await pool.drain(request.get("timeout", 30.0))
+            stopped.set()
+            return {"forced": forced}
+
+        handlers = {"open": _open, "close": _close, "ping": _ping, "metrics": _metrics, "drain": _drain}
+        server = await serve_control(control_path, handlers)
+        async with server:
+            await stopped.wait()
+            # let the drain reply go out before the loop ends
+            await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+
+
+@dataclass
+class _Worker:
+    worker_id: str
+    control_path: str
+    process: multiprocessing.Process = None
+    restarts: int = 0
+    missed_pings: int = 0
+
+
+class WorkerSupervisor:
+    """
+    Spawns and supervises worker processes, each with its own event loop and `RealtimeSessionPool`.
+
+        supervisor = WorkerSupervisor(run_session, workers=os.cpu_count())
+        await supervisor.start()
+        await supervisor.open_session("user-123", {"instructions": "..."})
+        ...
+        await supervisor.stop()
+
+    `runner`, `api_factory` and `api_kwargs` must be picklable, e.g. module level functions and classes.
+    """
+
+    def __init__(
+        self,
+        runner: SessionRunner,
+        workers: int = None,
+        control_dir: str = None,
+        health_interval: float = 5.0,
+        max_missed_pings: int = 3,
+        mp_context: str = None,
+        api_factory: Callable[..., RealtimeAPI] = RealtimeAPI,
+        **api_kwargs,
+    ):
+        """
+        Args:
+            runner (SessionRunner): Coroutine function driving a session inside a worker.
+            workers (int, optional): Number of worker processes. Defaults to os.cpu_count().
+            control_dir (str, optional): Directory for the unix control sockets. Defaults to a new temp directory.
+            health_interval (float, optional): Seconds between health checks. Defaults to 5.0.
+            max_missed_pings (int, optional): Unanswered pings before a worker is restarted. Defaults to 3.
+            mp_context (str, optional): multiprocessing start method. Defaults to the platform default.
+            api_factory (Callable[..., RealtimeAPI], optional): Creates the api of a session. Defaults to RealtimeAPI.
+            api_kwargs: Passed to `api_factory` in the workers.
+        """
+        self.runner = runner
+        self.n_workers = workers or os.cpu_count() or 1
+        self.control_dir = control_dir or tempfile.mkdtemp(prefix="pyoai_realtime_")
+        self.control_path = os.path.join(self.control_dir, "supervisor.sock")
+        self.health_interval = health_interval
+        self.max_missed_pings = max_missed_pings
+        self.api_factory = api_factory
+        self.api_kwargs = api_kwargs
+        self._ctx = multiprocessing.get_context(mp_context)
+        self.workers: dict[str, _Worker] = {}
+        self.ring = ConsistentHashRing()
+        self.sessions: dict[str, str] = {}
+        self._server: asyncio.Server = None
+        self._health_task: asyncio.Task = None
+        # the health loop and the "health" command must not restart a worker twice
+        self._health_lock = asyncio.Lock()
+
+    def _spawn(self, worker: _Worker):
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker.worker_id, worker.control_path, self.runner, self.api_factory, self.api_kwargs),
+            name=f"pyoai-realtime-{worker.worker_id}",
+            daemon=True,
+        )
+        worker.process.start()
+        worker.missed_pings = 0
+
+    async def _wait_ready(self, worker: _Worker, timeout: float = 10.0):
+        async with asyncio.timeout(timeout):
+            while True:
+                try:
+                    return await control_request(worker.control_path, {"cmd": "ping"})
+                except (FileNotFoundError, ConnectionRefusedError):
+                    await asyncio.sleep(0.02)
+
+    async def start(self):
+        """Spawn the workers, wait for them to come up and start the health checks and control socket."""
+        for idx in range(self.n_workers):
+            worker_id = f"worker-{idx}"
+            worker = _Worker(worker_id, os.path.join(self.control_dir, f"{worker_id}.sock"))
+            self.workers[worker_id] = worker
+            self._spawn(worker)
+            self.ring.add(worker_id)
+
+        await asyncio.gather(*(self._wait_ready(worker) for worker in self.workers.values()))
+        self._health_task = asyncio.create_task(self._health_loop(), name="worker_health")
+        self._server = await serve_control(
+            self.control_path, {"metrics": self._metrics_command, "health": self._health_command}
+        )
+
+    async def open_session(self, session_key: str, params: dict = None) -> str:
+        """
+        Open a session on the worker that owns `session_key` on the hash ring.
+
+        Returns:
+            str: The id of the worker running the session.
+        """
+        worker = self.workers[self.ring.get(session_key)]
+        request = {"cmd": "open", "session_key": session_key, "params": params}
+        reply = await control_request(worker.control_path, request)
+        if not reply.get("ok"):
+            raise RuntimeError(f"{worker.worker_id} could not open {session_key}: {reply.get('error')}")
+        self.sessions[session_key] = worker.worker_id
+        return worker.worker_id
+
+    async def close_session(self, session_key: str) -> bool:
+        if (worker_id := self.sessions.pop(session_key, None)) is None:
+            return False
+        request = {"cmd": "close", "session_key": session_key}
+        reply = await control_request(self.workers[worker_id].control_path, request)
+        return reply.get("closed", False)
+
+    async def health_check(self) -> dict[str, bool]:
+        """
+        Ping every worker, restarting the ones that died or stopped answering.
+
+        Sessions that ended inside a worker (the runner returned or failed) are dropped from `sessions` here.
+        """
+        async with self._health_lock:
+            status = {}
+            for worker in self.workers.values():
+                status[worker.worker_id] = await self._check_worker(worker)
+            return status
+
+    def _owned(self, worker: _Worker) -> set[str]:
+        return {key for key, worker_id in self.sessions.items() if worker_id == worker.worker_id}
+
+    async def _check_worker(self, worker: _Worker) -> bool:
+        alive = worker.process.is_alive()
+        if alive:
+            # sessions opened while the ping is under way are not in its reply
+            known = self._owned(worker)
+            try:
+                reply = await control_request(worker.control_path, {"cmd": "ping"}, timeout=self.health_interval)
+                worker.missed_pings = 0
+                for session_key in known - set(reply.get("sessions", ())):
+                    if self.sessions.get(session_key) == worker.worker_id:
+                        del self.sessions[session_key]
+            except (OSError, TimeoutError):
+                worker.missed_pings += 1
+                alive = worker.missed_pings < self.max_missed_pings
+
+        if not alive:
+            log.log(f"restarting {worker.worker_id}")
+            if worker.process.is_alive():
+                worker.process.kill()
+            await asyncio.to_thread(worker.process.join, 1)
+            worker.restarts += 1
+            # sessions of a dead worker are gone with it
+            for session_key in self._owned(worker):
+                del self.sessions[session_key]
+            self._spawn(worker)
+            try:
+                await self._wait_ready(worker)
+            except TimeoutError:
+                # restarted again by the next check
+                log.log(f"{worker.worker_id} did not come up")
+                worker.missed_pings = self.max_missed_pings
+        return alive
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.health_check()
+            except Exception as err:
+                log.log(f"health check failed: {err!r}")
+
+    async def metrics(self) -> dict:
+        """Collect metrics from every worker and add them up."""
+        replies = await asyncio.gather(
+            *(control_request(w.control_path, {"cmd": "metrics"}) for w in self.workers.values()),
+            return_exceptions=True,
+        )
+        per_worker, totals = {}, {"active": 0, "opened": 0, "closed": 0, "failed": 0, "frames_received": 0}
+        for worker, reply in zip(self.workers.values(), replies):
+            if isinstance(reply, Exception):
+                per_worker[worker.worker_id] = {"ok": False, "error": str(reply)}
+                continue
+            reply["restarts"] = worker.restarts
+            per_worker[worker.worker_id] = reply
+            for key in totals:
+                totals[key] += reply.get(key, 0)
+        return {"workers": per_worker, "totals": totals}
+
+    async def _metrics_command(self, request: dict) -> dict:
+        return await self.metrics()
+
+    async def _health_command(self, request: dict) -> dict:
+        return {"workers": await self.health_check()}
+
+    async def stop(self, drain_timeout: float = 30.0):
+        """Drain every worker (open sessions get up to `drain_timeout` seconds to finish) and shut down."""
+        if self._health_task:
+            self._health_task.cancel()
+        if self._server:
+            self._server.close()
+
+        async def _drain(worker: _Worker):
+            try:
+                await control_request(
+                    worker.control_path, {"cmd": "drain", "timeout": drain_timeout}, timeout=drain_timeout + 5
+                )
+            except (OSError, TimeoutError) as err:
+                log.log(f"{worker.worker_id} did not drain: {err}")
+
+        await asyncio.gather(*(_drain(worker) for worker in self.workers.values()))
+        for worker in self.workers.values():
+            await asyncio.to_thread(worker.process.join, 5)
+            if worker.process.is_alive():
+                worker.process.kill()
+        self.sessions.clear()
@@ -0,0 +1,97 @@
+import asyncio
+import base64
+import json
+
+import pytest
+
+from pyoai_realtime.audio_fast_path import AudioDelta, split_audio_delta
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.jitter_buffer import JitterBuffer
+from pyoai_realtime.realtime_api import RealtimeAPI
+
+PCM = bytes(range(256)) * 4
+
+
+def audio_delta(**separators) -> bytes:
+    event = {
+        "event_id": "event_1",
+        "type": "response.audio.delta",
+        "response_id": "resp_1",
+        "item_id": "item_1",
+        "output_index": 0,
+        "content_index": 1,
+        "delta": base64.b64encode(PCM).decode(),
+    }
+    return json.dumps(event, **separators).encode()
+
+
+class TestSplitAudioDelta:
+    @pytest.mark.parametrize("separators", [{}, {"separators": (",", ":")}])
+    def test_splits_header_and_audio(self, separators):
+        header, delta = split_audio_delta(audio_delta(**separators))
+        assert header["item_id"] == "item_1"
+        assert header["delta"] is None
+        assert base64.b64decode(delta) == PCM
+
+        frame = AudioDelta.from_header(header, PCM)
+        assert (frame.response_id, frame.content_index, frame.event_id) == ("resp_1", 1, "event_1")
+
+    def test_other_events_take_the_generic_path(self):
+        assert split_audio_delta(b'{"type": "response.audio.done", "item_id": "item_1"}') is None
+        transcript = {"type": "response.audio_transcript.delta", "delta": '"type": "response.audio.delta"'}
+        assert split_audio_delta(json.dumps(transcript).encode()) is None
+
+
+@pytest.mark.asyncio
+class TestAudioFastPath:
+    async def run(self, api: RealtimeAPI, server: FakeRealtimeServer):
+        api.url = server.url
+        await api.connect()
+        # registered before the request, the answer can not slip past it
+        done = asyncio.create_task(api.wait_for_next("server.response.done", timeout=5))
+        await asyncio.sleep(0)
+        await api.send("response.create")
+        await done
+        await api.disconnect()
+
+    async def test_sinks_get_decoded_audio(self):
+        api = RealtimeAPI(audio_fast_path=True, log_events=False)
+        frames, everything = [], []
+        api.add_audio_sink(frames.append)
+        api.on("server.*", lambda event: everything.append(event["type"]))
+
+        async with FakeRealtimeServer(audio_chunks=3) as server:
+            await self.run(api, server)
+            expected = base64.b64decode(server._delta)
+
+        assert [frame.pcm for frame in frames] == [expected] * 3
+        assert len({frame.item_id for frame in frames}) == 1
+        # the wildcard still sees audio deltas on the fast path
+        assert everything.count("response.audio.delta") == 3
+        assert "response.done" in everything
+
+    async def test_exact_handlers_opt_in(self):
+        api = RealtimeAPI(audio_fast_path=True, log_events=False)
+        deltas = []
+        api.on("server.response.audio.delta", deltas.append)
+
+        async with FakeRealtimeServer(audio_chunks=2) as server:
+            await self.run(api, server)
+
+        assert [event["delta"] for event in deltas] == [server._delta] * 2
+        assert deltas[0]["type"] == "response.audio.delta"
+
+    @pytest.mark.parametrize("fast", [False, True])
+    async def test_jitter_buffer_attach(self, fast):
+        api = RealtimeAPI(audio_fast_path=fast, log_events=False)
+        buffer = JitterBuffer().attach(api)
+        sink_frames = []
+        api.add_audio_sink(sink_frames.append)
+
+        async with FakeRealtimeServer(audio_chunks=2, chunk_ms=40) as server:
+            await self.run(api, server)
+
+        assert buffer.buffered_ms == 80
+        assert len(sink_frames) == 2
+        buffer.detach()
+        assert api.audio_sinks == [sink_frames.append]
@@ -0,0 +1,84 @@
+import math
+from array import array
+
+import pytest
+
+from pyoai_realtime.audio import AudioConverter, Resampler, downmix, float32_to_pcm16, np, pcm16_to_float32, to_pcm16
+from pyoai_realtime.constants import DEFAULT_FREQUENCY
+
+
+def sine(rate: int, seconds: float, freq: float = 440.0, amplitude: float = 0.5) -> array:
+    return array("f", (amplitude * math.sin(2 * math.pi * freq * i / rate) for i in range(int(rate * seconds))))
+
+
+def peak_frequency(pcm: bytes, rate: int) -> float:
+    samples = np.frombuffer(pcm, dtype="<i2").astype(np.float64)
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples))))
+    return np.fft.rfftfreq(len(samples), 1 / rate)[np.argmax(spectrum)]
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "array"])
+def use_numpy(request):
+    if request.param and np is None:
+        pytest.skip("numpy not installed")
+    return request.param
+
+
+class TestAudioConversion:
+    def test_float32_to_pcm16_clips(self, use_numpy):
+        pcm = float32_to_pcm16(array("f", [0.0, 0.5, -0.5, 1.0, -1.0, 2.0, -2.0]), use_numpy=use_numpy)
+        assert list(array("h", pcm)) == [0, 16384, -16384, 32767, -32768, 32767, -32768]
+
+    def test_pcm16_roundtrip(self, use_numpy):
+        pcm = array("h", [0, 1000, -1000, 32767, -32767]).tobytes()
+        assert float32_to_pcm16(pcm16_to_float32(pcm, use_numpy), use_numpy) == pcm
+
+    def test_downmix(self, use_numpy):
+        mono = downmix(array("f", [1.0, 0.0, 0.5, 0.5, -1.0, 1.0]), channels=2, use_numpy=use_numpy)
+        assert list(mono) == [0.5, 0.5, 0.0]
+
+    @pytest.mark.parametrize("src_rate", [8_000, 16_000, 44_100, 48_000])
+    def test_resampler_length_and_pitch(self, src_rate, use_numpy):
+        if np is None:
+            pytest.skip("numpy not installed")
+        if not use_numpy and src_rate == 44_100:
+            pytest.skip("too slow on the pure python path")
+        resampler = Resampler(src_rate, use_numpy=use_numpy)
+        out = resampler.process(sine(src_rate, 0.5))
+        assert len(out) == DEFAULT_FREQUENCY // 2
+        assert peak_frequency(float32_to_pcm16(out), DEFAULT_FREQUENCY) == pytest.approx(440, abs=3)
+
+    def test_resampler_chunked_matches_whole(self, use_numpy):
+        signal = sine(16_000, 0.2)
+        whole = Resampler(16_000, use_numpy=use_numpy).process(signal)
+
+        resampler = Resampler(16_000, use_numpy=use_numpy)
+        chunked = []
+        for start in range(0, len(signal), 333):
+            chunked.extend(resampler.process(signal[start : start + 333]))
+        assert chunked == pytest.approx(list(whole), abs=1e-5)
+
+    def test_resampler_empty_chunk(self, use_numpy):
+        resampler = Resampler(8_000, use_numpy=use_numpy)
+        assert len(resampler.process(b"")) == 0
+        assert len(resampler.process(sine(8_000, 0.01))) == 240
+
+    def test_converter_handles_unaligned_chunks(self, use_numpy):
+        stereo = array("h", [1000, -1000] * 4800).tobytes()
+        converter = AudioConverter(48_000, channels=2, use_numpy=use_numpy)
+        out = b"".join(converter.convert(stereo[i : i + 777]) for i in range(0, len(stereo), 777))
+        assert len(out) == 2400 * 2
+        assert set(array("h", out)) <= {-1, 0}
+
+    def test_to_pcm16_passthrough(self):
+        pcm = array("h", range(-1000, 1000)).tobytes()
+        assert to_pcm16(pcm, DEFAULT_FREQUENCY, chunk_size=101) == pcm
+
+    def test_to_pcm16_stereo_file_rate(self, use_numpy):
+        # what a decoded 44.1 kHz stereo file looks like
+        mono = array("h", float32_to_pcm16(sine(44_100, 0.5), use_numpy=use_numpy))
+        stereo = array("h", [0]) * (2 * len(mono))
+        stereo[0::2], stereo[1::2] = mono, mono
+        out = to_pcm16(stereo.tobytes(), 44_100, channels=2, chunk_size=4001, use_numpy=use_numpy)
+        assert abs(len(out) // 2 - DEFAULT_FREQUENCY // 2) <= 32
+        assert peak_frequency(out, DEFAULT_FREQUENCY) == pytest.approx(440, abs=3)
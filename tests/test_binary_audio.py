@@ -0,0 +1,102 @@
+import base64
+import json
+
+import pytest
+from websockets.asyncio.client import connect
+
+from pyoai_realtime import binary_audio
+from pyoai_realtime.binary_audio import AUDIO_ITEM_TYPE, BinaryAudioEncoder, audio_append_frame, decode_audio_frame
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.realtime_conversation import RealtimeRelay
+
+PCM = b"\x01\x00\x02\x00\x03\x00"
+
+
+def delta(item_id: str, pcm: bytes = PCM) -> tuple[dict, bytes]:
+    header = {"type": "response.audio.delta", "item_id": item_id, "response_id": "resp_1", "content_index": 0}
+    return header, base64.b64encode(pcm)
+
+
+class TestBinaryAudioEncoder:
+    def test_announces_items_and_counts_frames(self):
+        encoder = BinaryAudioEncoder()
+        announcement, frames = encoder.encode(*delta("item_a"))
+        assert json.loads(announcement) == {
+            "type": AUDIO_ITEM_TYPE,
+            "index": 0,
+            "item_id": "item_a",
+            "response_id": "resp_1",
+            "output_index": 0,
+            "content_index": 0,
+            "codec": "pcm16",
+        }
+        (frame,) = frames
+        index, sequence, pcm = decode_audio_frame(frame)
+        assert (index, sequence, bytes(pcm)) == (0, 0, PCM) and len(frame) == 6 + len(PCM)
+
+        assert encoder.encode(*delta("item_a"))[0] is None
+        assert json.loads(encoder.encode(*delta("item_b"))[0])["index"] == 1
+        assert decode_audio_frame(encoder.encode(*delta("item_a"))[1][0])[:2] == (0, 2)
+        assert decode_audio_frame(encoder.encode(*delta("item_b"))[1][0])[:2] == (1, 1)
+        assert encoder.finish("item_a") == []
+
+    def test_indices_wrap_around(self, monkeypatch):
+        monkeypatch.setattr(binary_audio, "MAX_ITEMS", 2)
+        encoder = BinaryAudioEncoder()
+        for item_id in ("item_a", "item_b", "item_c"):
+            encoder.encode(*delta(item_id))
+        assert encoder.items == {"item_b": [1, 1], "item_c": [0, 1]}
+
+    def test_append_frame(self):
+        event = json.loads(audio_append_frame(PCM))
+        assert event["type"] == "input_audio_buffer.append" and event["event_id"].startswith("evt_")
+        assert base64.b64decode(event["audio"]) == PCM
+
+
+@pytest.mark.asyncio
+class TestRelayProxy:
+    async def relay(self, upstream: FakeRealtimeServer, **kwargs):
+        relay = RealtimeRelay(upstream_url=upstream.url, model=None, **kwargs)
+        server = await relay.serve(hostname="localhost", port=0)
+        return relay, server, f"ws://localhost:{server.sockets[0].getsockname()[1]}"
+
+    async def test_passes_json_through(self):
+        async with FakeRealtimeServer(audio_chunks=3) as upstream:
+            relay, server, url = await self.relay(upstream)
+            async with connect(url) as client:
+                assert json.loads(await client.recv())["type"] == "session.created"
+                await client.send(json.dumps({"type": "response.create"}))
+                types = []
+                while not types or types[-1] != "response.done":
+                    message = await client.recv()
+                    assert isinstance(message, str)
+                    types.append(json.loads(message)["type"])
+                assert types.count("response.audio.delta") == 3
+            server.close()
+            await server.wait_closed()
+        assert upstream.received == [{"type": "response.create"}]
+
+    async def test_binary_audio_both_ways(self):
+        async with FakeRealtimeServer(audio_chunks=3) as upstream:
+            relay, server, url = await self.relay(upstream, binary_audio=True)
+            async with connect(url) as client:
+                await client.recv()
+                await client.send(PCM)
+                await client.send(json.dumps({"type": "response.create"}))
+                messages = []
+                while not messages or messages[-1] != "response.done":
+                    message = await client.recv()
+                    messages.append(message if isinstance(message, bytes) else json.loads(message)["type"])
+                assert len(relay.sessions) == 1 and next(iter(relay.sessions.values())).frames_received == 2
+            server.close()
+            await server.wait_closed()
+
+        frames = [message for message in messages if isinstance(message, bytes)]
+        assert messages.index(AUDIO_ITEM_TYPE) == messages.index(frames[0]) - 1
+        assert [decode_audio_frame(frame)[:2] for frame in frames] == [(0, 0), (0, 1), (0, 2)]
+        assert bytes(decode_audio_frame(frames[0])[2]) == base64.b64decode(upstream._delta)
+        assert "response.audio.delta" not in messages
+
+        append, create = upstream.received
+        assert append["type"] == "input_audio_buffer.append" and base64.b64decode(append["audio"]) == PCM
+        assert create == {"type": "response.create"}
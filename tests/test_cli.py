@@ -0,0 +1,65 @@
+import json
+import wave
+
+import pytest
+
+from pyoai_realtime.cli import BenchStats, bench, load_audio, main, synthetic_audio
+from pyoai_realtime.constants import DEFAULT_FREQUENCY
+
+
+class TestBench:
+    def test_json_report(self, capsys):
+        assert main(["bench", "-k", "3", "-n", "2", "--seconds", "0.2", "--audio-chunks", "5", "--json"]) == 0
+        results = json.loads(capsys.readouterr().out)
+        assert results["clients"] == 3 and results["failed"] == 0 and results["responses"] == 6
+        assert results["audio_sent"] == 6 * DEFAULT_FREQUENCY // 5 * 2
+        # five 40 ms deltas per response
+        assert results["audio_received"] == 6 * DEFAULT_FREQUENCY // 5 * 2
+        assert 0 < results["setup_ms"]["p50"] <= results["setup_ms"]["max"]
+        assert results["first_audio_ms"]["p99"] <= results["duration_ms"]["max"]
+        assert results["cpu"] > 0
+
+    def test_text_report_through_relay(self, capsys):
+        assert main(["bench", "-k", "2", "-n", "1", "--relay", "--seconds", "0.1", "--audio-chunks", "2"]) == 0
+        report = capsys.readouterr().out
+        assert "clients      2 (0 failed)" in report and "first audio" in report
+
+    def test_failed_clients(self, capsys):
+        assert main(["bench", "-k", "2", "--url", "ws://localhost:1", "--timeout", "1"]) == 1
+        assert "2 failed" in capsys.readouterr().out
+
+    @pytest.mark.asyncio
+    async def test_ramp_and_realtime_pacing(self):
+        stats = await bench(clients=2, responses=1, audio=synthetic_audio(0.2), ramp=0.1, realtime=True)
+        assert stats.responses == 2 and stats.elapsed >= 0.25
+
+
+def test_stats_percentiles():
+    stats = BenchStats(setups=[0.3, 0.1, 0.2], durations=[])
+    assert stats.setup_percentile(50) == 0.2 and stats.setup_percentile(100) == 0.3
+    assert stats.duration_percentile(99) == 0.0
+
+
+def test_load_audio(tmp_path):
+    tone = synthetic_audio(0.5)
+    assert len(tone) == DEFAULT_FREQUENCY
+
+    raw = tmp_path / "input.pcm"
+    raw.write_bytes(tone)
+    assert load_audio(str(raw)) == tone
+
+    path = tmp_path / "input.wav"
+    with wave.open(str(path), "wb") as file:
+        file.setnchannels(2)
+        file.setsampwidth(2)
+        file.setframerate(48_000)
+        file.writeframes(bytes(48_000 * 4 // 2))
+    assert abs(len(load_audio(str(path))) - DEFAULT_FREQUENCY) <= 64
+
+    with wave.open(str(path), "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(1)
+        file.setframerate(8000)
+        file.writeframes(bytes(800))
+    with pytest.raises(ValueError):
+        load_audio(str(path))
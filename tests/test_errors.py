@@ -0,0 +1,241 @@
+import asyncio
+import json
+import random
+import socket
+
+import pytest
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosedError, ConnectionClosedOK
+from websockets.frames import Close
+
+from pyoai_realtime.errors import (
+    CircuitBreaker,
+    CircuitBreakers,
+    CircuitOpenError,
+    CircuitState,
+    ErrorClass,
+    ErrorPolicy,
+    RetryPolicy,
+    classify_error,
+)
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.realtime_api import RealtimeAPI
+
+FAST = RetryPolicy(max_attempts=4, base_delay=0.001, max_delay=0.001)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def unused_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return f"ws://localhost:{sock.getsockname()[1]}"
+
+
+def closed(code: int) -> ConnectionClosedError:
+    return ConnectionClosedError(Close(code, ""), None)
+
+
+class TestClassifyError:
+    @pytest.mark.parametrize(
+        "error, expected",
+        [
+            ({"type": "server_error", "code": None}, ErrorClass.RETRYABLE),
+            ({"type": "invalid_request_error", "code": "rate_limit_exceeded"}, ErrorClass.RETRYABLE),
+            ({"type": "invalid_request_error", "code": "invalid_value"}, ErrorClass.CLIENT_BUG),
+            ({"type": "invalid_request_error", "code": "invalid_api_key"}, ErrorClass.FATAL),
+            ({"type": "something_new"}, ErrorClass.RETRYABLE),
+        ],
+    )
+    def test_server_events(self, error, expected):
+        assert classify_error({"type": "error", "event_id": "e", "error": error}) is expected
+        assert classify_error(error) is expected
+
+    @pytest.mark.parametrize(
+        "error, expected",
+        [
+            (ConnectionRefusedError(), ErrorClass.RETRYABLE),
+            (TimeoutError(), ErrorClass.RETRYABLE),
+            (closed(1011), ErrorClass.RETRYABLE),
+            (ConnectionClosedError(None, None), ErrorClass.RETRYABLE),
+            (ConnectionClosedOK(Close(1000, ""), None), ErrorClass.RETRYABLE),
+            (closed(1008), ErrorClass.FATAL),
+            (closed(1009), ErrorClass.CLIENT_BUG),
+            (json.JSONDecodeError("bad", "", 0), ErrorClass.CLIENT_BUG),
+            (KeyError("item_id"), ErrorClass.CLIENT_BUG),
+            (CircuitOpenError("ws://x", 1.0), ErrorClass.RETRYABLE),
+        ],
+    )
+    def test_exceptions(self, error, expected):
+        assert classify_error(error) is expected
+
+
+def test_retry_policy_full_jitter():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+    rng = random.Random(0)
+    delays = [[policy.delay(attempt, rng) for _ in range(200)] for attempt in range(5)]
+    assert all(0 <= delay <= 1.0 for delay in delays[0])
+    assert max(delays[2]) > 1.0 and all(delay <= 4.0 for delay in delays[2])
+    assert all(delay <= 5.0 for delay in delays[4])
+
+
+class TestCircuitBreaker:
+    def test_opens_half_opens_and_closes(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state is CircuitState.OPEN and not breaker.allow()
+        assert breaker.retry_after == 10
+
+        clock.now = 10
+        assert breaker.state is CircuitState.HALF_OPEN
+        assert breaker.allow() and not breaker.allow()  # a single trial
+        breaker.record_failure()
+        assert breaker.state is CircuitState.OPEN
+
+        clock.now = 20
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state is CircuitState.CLOSED and breaker.failures == 0
+
+    def test_released_trial(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=1, clock=clock)
+        breaker.record_failure()
+        clock.now = 1
+        assert breaker.allow()
+        assert breaker.retry_after == 0.1
+        breaker.release()
+        assert breaker.allow()
+
+    def test_one_per_endpoint(self):
+        breakers = CircuitBreakers(failure_threshold=3)
+        assert breakers["ws://a"] is breakers["ws://a"]
+        assert breakers["ws://b"] is not breakers["ws://a"]
+        assert len(breakers) == 2 and breakers["ws://a"].failure_threshold == 3
+
+
+@pytest.mark.asyncio
+class TestErrorPolicy:
+    async def test_retries_retryable_errors(self):
+        policy = ErrorPolicy({ErrorClass.RETRYABLE: FAST}, breakers=CircuitBreakers())
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ConnectionResetError()
+            return "ok"
+
+        assert await policy.run("ws://a", flaky) == "ok"
+        assert len(attempts) == 3 and policy.stats.retries == 2
+        assert policy.stats.errors[ErrorClass.RETRYABLE] == 2
+        assert policy.breakers["ws://a"].failures == 0
+
+    async def test_does_not_retry_client_bugs(self):
+        policy = ErrorPolicy({ErrorClass.RETRYABLE: FAST}, breakers=CircuitBreakers())
+        attempts = []
+
+        async def broken():
+            attempts.append(1)
+            raise KeyError("oops")
+
+        with pytest.raises(KeyError):
+            await policy.run("ws://a", broken)
+        assert len(attempts) == 1 and policy.stats.errors[ErrorClass.CLIENT_BUG] == 1
+
+    async def test_local_bugs_do_not_reset_the_breaker(self):
+        policy = ErrorPolicy(breakers=CircuitBreakers())
+        policy.record("ws://a", ConnectionRefusedError())
+        policy.record("ws://a", KeyError("item_id"))
+        assert policy.breakers["ws://a"].failures == 1
+        # the endpoint answered
+        policy.record("ws://a", {"type": "error", "error": {"type": "invalid_request_error"}})
+        assert policy.breakers["ws://a"].failures == 0
+
+    async def test_breaker_sheds_load(self):
+        policy = ErrorPolicy({ErrorClass.RETRYABLE: FAST}, breakers=CircuitBreakers(failure_threshold=2))
+        attempts = []
+
+        async def down():
+            attempts.append(1)
+            raise ConnectionRefusedError()
+
+        with pytest.raises(CircuitOpenError):
+            await policy.run("ws://a", down)
+        with pytest.raises(CircuitOpenError):
+            await policy.run("ws://a", down)
+        assert len(attempts) == 2 and policy.stats.shed == 2
+
+    async def test_api_connect(self):
+        policy = ErrorPolicy({ErrorClass.RETRYABLE: FAST}, breakers=CircuitBreakers(failure_threshold=10))
+        api = RealtimeAPI(url=unused_url(), error_policy=policy, log_events=False)
+        with pytest.raises(OSError):
+            await api.connect(model=None)
+        assert policy.stats.errors[ErrorClass.RETRYABLE] == FAST.max_attempts
+
+        async with FakeRealtimeServer() as server:
+            api = RealtimeAPI(url=server.url, error_policy=policy, log_events=False)
+            await api.connect()
+            await api.disconnect()
+        assert policy.breakers[server.url].state is CircuitState.CLOSED
+
+    async def test_api_handshake_status(self):
+        policy = ErrorPolicy({ErrorClass.RETRYABLE: FAST}, breakers=CircuitBreakers())
+
+        async def handler(websocket):
+            pass
+
+        async with serve(handler, "localhost", 0, process_request=lambda conn, req: conn.respond(401, "no")) as server:
+            url = f"ws://localhost:{server.sockets[0].getsockname()[1]}"
+            with pytest.raises(Exception):
+                await RealtimeAPI(url=url, error_policy=policy, log_events=False).connect()
+        assert dict(policy.stats.errors) == {ErrorClass.FATAL: 1}
+
+    async def test_handler_bugs_keep_the_session(self, monkeypatch):
+        warnings = []
+        monkeypatch.setattr("pyoai_realtime.log.warn", lambda message, **kwargs: warnings.append(message))
+        policy = ErrorPolicy(breakers=CircuitBreakers())
+        async with FakeRealtimeServer() as server:
+            api = RealtimeAPI(url=server.url, error_policy=policy, log_events=False)
+            closes = []
+            api.on("close", closes.append)
+            await api.connect()
+            await api.receive("error", {"type": "error", "error": {"type": "invalid_request_error"}})
+            # a handler bug in the receive loop
+            api.on("server.session.updated", lambda event: event["missing"])
+            await api.send("session.update", {"session": {}})
+            done = asyncio.create_task(api.wait_for_next("server.response.done", timeout=1))
+            await asyncio.sleep(0)
+            await api.send("response.create")
+            await done
+            assert api.connected and closes == []
+            failures = policy.breakers[server.url].failures
+        await asyncio.wait_for(api.background_tasks["receive_loop"], 1)
+
+        assert len(warnings) == 1 and "KeyError" in warnings[0]
+        assert policy.stats.errors[ErrorClass.CLIENT_BUG] == 2 and failures == 0
+
+    async def test_close_event_carries_the_class(self):
+        policy = ErrorPolicy(breakers=CircuitBreakers())
+
+        async def handler(websocket):
+            await websocket.close(1011, "internal error")
+
+        async with serve(handler, "localhost", 0) as server:
+            api = RealtimeAPI(url=f"ws://localhost:{server.sockets[0].getsockname()[1]}", error_policy=policy)
+            closes = []
+            api.on("close", closes.append)
+            await api.connect(model=None)
+            await asyncio.wait_for(api.background_tasks["receive_loop"], 1)
+
+        assert closes == [{"error": True, "error_class": "retryable"}]
+        assert not api.connected and policy.stats.errors[ErrorClass.RETRYABLE] == 1
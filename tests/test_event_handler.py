@@ -1,8 +1,9 @@
 import asyncio
+import gc
 
 import pytest
 
-from pyoai_realtime.event_handler import RealtimeEventHandler
+from pyoai_realtime.event_handler import HandlerPriority, RealtimeEventHandler, Subscription
 from pyoai_realtime.realtime_conversation import RealtimeConversation
 from pyoai_realtime.realtime_events import RealtimeEvent, Registry
 
@@ -28,6 +29,16 @@ class TestRealtimeEventHandler:
 
         assert received_events == [{"data": 123}]
 
+    async def test_on_handler_persists(self, event_handler):
+        """Test that on handlers keep receiving events after the first dispatch."""
+        received_events = []
+
+        event_handler.on("test_event", received_events.append)
+        await event_handler.dispatch("test_event", {"data": 1})
+        await event_handler.dispatch("test_event", {"data": 2})
+
+        assert received_events == [{"data": 1}, {"data": 2}]
+
     async def test_on_next_and_wait_for_next(self, event_handler):
         """Test the on_next listener and wait_for_next method."""
         testdata = {"data": 456}
@@ -120,6 +131,203 @@ class TestRealtimeEventHandler:
         assert "Could not turn off" in str(exc_info.value)
 
 
+@pytest.mark.asyncio
+class TestHandlerPriority:
+    async def test_critical_handlers_run_first(self, event_handler):
+        order = []
+        event_handler.on("test_event", lambda event: order.append("normal"))
+        event_handler.on("test_event", lambda event: order.append("critical"), HandlerPriority.CRITICAL)
+        event_handler.on_next("test_event", lambda event: order.append("next"))
+        await event_handler.dispatch("test_event", {})
+        assert order == ["critical", "normal", "next"]
+
+    async def test_background_handlers_are_deferred(self, event_handler):
+        order = []
+
+        async def background(event):
+            order.append(("background", event["n"]))
+
+        event_handler.on("test_event", background, HandlerPriority.BACKGROUND)
+        event_handler.on("test_event", lambda event: order.append(("inline", event["n"])))
+        for n in range(3):
+            await event_handler.dispatch("test_event", {"n": n})
+        assert order == [("inline", 0), ("inline", 1), ("inline", 2)]
+
+        await event_handler.flush_background()
+        assert order[3:] == [("background", 0), ("background", 1), ("background", 2)]
+        stats = event_handler.background_stats
+        assert stats.queued == stats.processed == 3
+        assert stats.lag_percentile(100) == stats.max_lag > 0
+
+    async def test_background_yields_to_the_loop(self, event_handler):
+        order = []
+        event_handler.on("test_event", lambda event: order.append("background"), HandlerPriority.BACKGROUND)
+        await event_handler.dispatch("test_event", {})
+        await event_handler.dispatch("test_event", {})
+
+        async def foreground():
+            order.append("foreground")
+
+        await asyncio.gather(event_handler.flush_background(), foreground())
+        assert order.index("foreground") < order.index("background", 1)
+
+    async def test_background_catches_up_past_the_lag_bound(self, event_handler):
+        event_handler.background_max_lag = 0.0
+        received = []
+        event_handler.on("test_event", received.append, HandlerPriority.BACKGROUND)
+        for n in range(5):
+            await event_handler.dispatch("test_event", {"n": n})
+        await asyncio.sleep(0.01)
+        await event_handler.flush_background()
+        assert len(received) == 5 and event_handler.background_stats.caught_up == 5
+
+    async def test_background_errors_are_contained(self, event_handler, monkeypatch):
+        monkeypatch.setattr("pyoai_realtime.log.warn", lambda *args, **kwargs: None)
+        received = []
+        event_handler.on("test_event", lambda event: event["missing"], HandlerPriority.BACKGROUND)
+        event_handler.on("test_event", received.append, HandlerPriority.BACKGROUND)
+        await event_handler.dispatch("test_event", {})
+        await event_handler.flush_background()
+        assert received == [{}] and event_handler.background_stats.errors == 1
+
+    async def test_off_finds_any_priority(self, event_handler):
+        received = []
+        critical = event_handler.on("test_event", received.append, HandlerPriority.CRITICAL)
+        background = event_handler.on("test_event", received.append, HandlerPriority.BACKGROUND)
+        assert event_handler.has_handlers("test_event")
+
+        event_handler.off("test_event", critical)
+        assert event_handler.critical_handlers["test_event"] == []
+        assert event_handler.deferred_handlers["test_event"] == [background]
+
+        event_handler.off("test_event")
+        assert not event_handler.has_handlers("test_event")
+        with pytest.raises(ValueError):
+            event_handler.off("test_event")
+
+    async def test_shedding_skips_non_critical_handlers(self, event_handler):
+        received = []
+        event_handler.on("test_event", lambda event: received.append("critical"), HandlerPriority.CRITICAL)
+        event_handler.on("test_event", lambda event: received.append("normal"))
+        event_handler.on("test_event", lambda event: received.append("background"), HandlerPriority.BACKGROUND)
+
+        event_handler.shed_priority = HandlerPriority.BACKGROUND
+        await event_handler.dispatch("test_event", {})
+        await event_handler.flush_background()
+        assert received == ["critical", "normal"]
+
+        event_handler.shed_priority = HandlerPriority.NORMAL
+        event_handler.on_next("test_event", lambda event: received.append("next"))
+        await event_handler.dispatch("test_event", {})
+        assert received[2:] == ["critical", "next"]
+        assert event_handler.background_stats.shed == 2 and event_handler.background_stats.queued == 0
+
+        event_handler.shed_priority = None
+        await event_handler.dispatch("test_event", {})
+        await event_handler.flush_background()
+        assert received[4:] == ["critical", "normal", "background"]
+
+        # the backlog is dropped once shedding starts
+        await event_handler.dispatch("test_event", {})
+        event_handler.shed_priority = HandlerPriority.BACKGROUND
+        await event_handler.flush_background()
+        assert received[7:] == ["critical", "normal"] and event_handler.background_stats.shed == 3
+
+
+class Widget:
+    def __init__(self):
+        self.received = []
+
+    def on_event(self, event):
+        self.received.append(event)
+
+    async def on_event_async(self, event):
+        self.received.append(event)
+
+
+@pytest.mark.asyncio
+class TestSubscriptions:
+    async def test_handle_cancels(self, event_handler):
+        received = []
+        sub = event_handler.subscribe("test_event", received.append)
+        assert isinstance(sub, Subscription) and sub.active
+        await event_handler.dispatch("test_event", 1)
+        assert sub.cancel() and not sub.cancel()
+        await event_handler.dispatch("test_event", 2)
+        assert received == [1] and not sub.active
+        # the empty list is dropped from the lane
+        assert "test_event" not in event_handler.event_handlers
+
+    async def test_context_manager_and_scope(self, event_handler):
+        received = []
+        with event_handler.subscribe("test_event", received.append, HandlerPriority.CRITICAL):
+            await event_handler.dispatch("test_event", 1)
+        with event_handler.scope() as scope:
+            scope.on("test_event", received.append)
+            scope.on("other_event", received.append)
+            scope.on_next("test_event", received.append)
+            await event_handler.dispatch("test_event", 2)
+            await event_handler.dispatch("other_event", 3)
+        await event_handler.dispatch("test_event", 4)
+        assert received == [1, 2, 2, 3]
+        assert not event_handler.has_handlers("test_event") and not event_handler.has_handlers("other_event")
+
+    async def test_duplicates_are_removed_one_at_a_time(self, event_handler):
+        received = []
+        first = event_handler.subscribe("test_event", received.append)
+        event_handler.on("test_event", received.append)
+        first.cancel()
+        await event_handler.dispatch("test_event", 1)
+        event_handler.off("test_event", received.append)
+        await event_handler.dispatch("test_event", 2)
+        assert received == [1]
+
+    async def test_weak_handlers_unregister_when_collected(self, event_handler):
+        widget = Widget()
+        event_handler.subscribe("test_event", widget.on_event, weak=True)
+        event_handler.subscribe("test_event", widget.on_event_async, weak=True)
+        await event_handler.dispatch("test_event", 1)
+        assert widget.received == [1, 1]
+        assert widget.on_event in event_handler.event_handlers["test_event"]
+
+        received = widget.received
+        del widget
+        gc.collect()
+        await event_handler.dispatch("test_event", 2)
+        assert received == [1, 1]
+        assert not event_handler.has_handlers("test_event")
+
+    async def test_weak_functions_and_off(self, event_handler):
+        received = []
+
+        def handler(event):
+            received.append(event)
+
+        sub = event_handler.subscribe("test_event", handler, weak=True)
+        assert sub.callback is handler
+        event_handler.off("test_event", handler)
+        assert not sub.active and not event_handler.has_handlers("test_event")
+
+    async def test_wait_for_next_timeout_does_not_leak(self, event_handler):
+        for _ in range(3):
+            assert await event_handler.wait_for_next("test_event", timeout=0.01) is None
+        assert not event_handler.next_event_handlers.get("test_event")
+
+    async def test_dispatch_snapshot_survives_changes(self, event_handler):
+        received = []
+        subs = []
+
+        def first(event):
+            received.append("first")
+            subs[1].cancel()
+            event_handler.on("test_event", lambda event: received.append("late"))
+
+        subs.append(event_handler.subscribe("test_event", first))
+        subs.append(event_handler.subscribe("test_event", lambda event: received.append("second")))
+        await event_handler.dispatch("test_event", {})
+        assert received == ["first", "second"]
+
+
 @pytest.mark.asyncio
 class TestRealtimeEvent:
     async def test_realtime_event_init(self):
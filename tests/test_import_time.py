@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# milliseconds, best of a few fresh interpreters. PYOAI_IMPORT_BUDGET_SCALE loosens them on slow machines
+IMPORT_BUDGETS_MS = {
+    "pyoai_realtime": 25,
+    "pyoai_realtime.realtime_events": 100,
+}
+BUDGET_SCALE = float(os.environ.get("PYOAI_IMPORT_BUDGET_SCALE", 1))
+
+SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print((time.perf_counter() - start) * 1000)
+print(" ".join(sys.modules))
+"""
+
+
+def import_module(module: str) -> tuple[float, set[str]]:
+    """Import `module` in a fresh interpreter, return the import time in ms and the modules it loaded."""
+    src = os.path.join(os.path.dirname(os.path.dirname(__file__)), "src")
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [src, os.environ.get("PYTHONPATH")]))}
+    out = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(module=module)], env=env, capture_output=True, text=True, check=True
+    )
+    elapsed, modules = out.stdout.splitlines()
+    return float(elapsed), set(modules.split())
+
+
+@pytest.mark.parametrize(
+    "module, heavy",
+    [
+        ("pyoai_realtime", {"asyncio", "rich", "websockets"}),
+        ("pyoai_realtime.realtime_events", {"asyncio", "rich", "websockets"}),
+        ("pyoai_realtime.realtime_conversation", {"rich", "websockets"}),
+        ("pyoai_realtime.realtime_api", {"rich", "websockets.asyncio.server"}),
+    ],
+)
+def test_heavy_dependencies_are_lazy(module, heavy):
+    _, modules = import_module(module)
+    assert not heavy & modules
+
+
+@pytest.mark.parametrize("module, budget_ms", IMPORT_BUDGETS_MS.items())
+def test_import_time_budget(module, budget_ms):
+    elapsed = min(import_module(module)[0] for _ in range(3))
+    assert elapsed < budget_ms * BUDGET_SCALE, f"import {module} took {elapsed:.1f}ms"
+
+
+def test_lazy_exports():
+    import pyoai_realtime
+    from pyoai_realtime.event_handler import RealtimeEventHandler
+
+    assert pyoai_realtime.RealtimeEventHandler is RealtimeEventHandler
+    assert "RealtimeEventHandler" in dir(pyoai_realtime)
+    with pytest.raises(AttributeError):
+        pyoai_realtime.missing
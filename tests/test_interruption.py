@@ -0,0 +1,101 @@
+import base64
+
+import pytest
+
+from pyoai_realtime.event_functions import ConversationInterface, EventFunctionsMixin
+from pyoai_realtime.event_handler import RealtimeEventHandler
+from pyoai_realtime.interruption import InterruptionController, base64_decoded_size
+from pyoai_realtime.text_builder import TextBuilder
+
+
+class RecordingAPI(RealtimeEventHandler):
+    """Stands in for a connected RealtimeAPI, records what would be sent."""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    async def send(self, event_name: str, data: dict = None) -> bool:
+        self.sent.append((event_name, data or {}))
+        return True
+
+
+class Processor(EventFunctionsMixin):
+    def __init__(self):
+        self.conversation = ConversationInterface()
+
+
+def audio_delta(item_id: str, n_samples: int) -> dict:
+    delta = base64.b64encode(bytes(2 * n_samples)).decode()
+    return {"type": "response.audio.delta", "item_id": item_id, "content_index": 0, "delta": delta}
+
+
+@pytest.fixture
+def api():
+    return RecordingAPI()
+
+
+@pytest.mark.asyncio
+class TestInterruptionController:
+    async def test_base64_decoded_size(self):
+        for n in range(10):
+            assert base64_decoded_size(base64.b64encode(bytes(n)).decode()) == n
+
+    async def test_speech_started_cancels_and_truncates(self, api):
+        controller = InterruptionController(api).attach()
+        await api.dispatch("server.response.created", {"response": {"id": "resp_1"}})
+        await api.dispatch("server.response.audio.delta", audio_delta("item_1", 24_000))
+        await api.dispatch("server.response.audio.delta", audio_delta("item_1", 24_000))
+        controller.played("item_1", 36_000)
+
+        await api.dispatch("server.input_audio_buffer.speech_started", {"audio_start_ms": 0, "item_id": "user_1"})
+
+        assert api.sent == [
+            ("response.cancel", {}),
+            ("conversation.item.truncate", {"item_id": "item_1", "content_index": 0, "audio_end_ms": 1500}),
+        ]
+        assert controller.interruptions == 1
+
+    async def test_nothing_playing_is_not_interrupted(self, api):
+        controller = InterruptionController(api).attach()
+        await api.dispatch("server.response.created", {"response": {"id": "resp_1"}})
+        await api.dispatch("server.response.audio.delta", audio_delta("item_1", 4800))
+        await api.dispatch("server.response.done", {"response": {"id": "resp_1"}})
+        controller.played("item_1", 4800)
+
+        await api.dispatch("server.input_audio_buffer.speech_started", {"audio_start_ms": 0, "item_id": "user_1"})
+        assert api.sent == []
+
+    async def test_played_out_item_is_not_truncated(self, api):
+        processor = Processor()
+        item = {"id": "item_1", "formatted": {"audio": list(range(4800)), "transcript": TextBuilder("hello")}}
+        processor.conversation.item_lookup["item_1"] = item
+        controller = InterruptionController(api, processor=processor).attach()
+        await api.dispatch("server.response.created", {"response": {"id": "resp_1"}})
+        await api.dispatch("server.response.audio.delta", audio_delta("item_1", 4800))
+        await api.dispatch("server.response.done", {"response": {"id": "resp_1"}})
+        controller.played("item_1", 4800)
+
+        # the next response has not sent audio yet
+        await api.dispatch("server.response.created", {"response": {"id": "resp_2"}})
+        await api.dispatch("server.input_audio_buffer.speech_started", {"audio_start_ms": 0, "item_id": "user_1"})
+        assert api.sent == [("response.cancel", {})]
+        assert item["formatted"]["transcript"] == "hello" and len(item["formatted"]["audio"]) == 4800
+
+    async def test_truncates_local_conversation(self, api):
+        processor = Processor()
+        item = {"id": "item_1", "formatted": {"audio": list(range(48_000)), "transcript": TextBuilder("hello there")}}
+        processor.conversation.item_lookup["item_1"] = item
+        interrupted = []
+
+        controller = InterruptionController(
+            api, processor=processor, on_interrupt=lambda item_id, end_ms: interrupted.append((item_id, end_ms))
+        ).attach()
+        await api.dispatch("server.response.audio.delta", audio_delta("item_1", 48_000))
+        controller.played("item_1", 12_345)
+        assert await controller.interrupt() is True
+
+        # 514ms of audio at 24kHz, integer sample index
+        assert len(item["formatted"]["audio"]) == 12_336
+        assert item["formatted"]["transcript"] == ""
+        assert interrupted == [("item_1", 514)]
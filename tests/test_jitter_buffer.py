@@ -0,0 +1,90 @@
+import asyncio
+import base64
+from array import array
+
+import pytest
+
+from pyoai_realtime.event_handler import RealtimeEventHandler
+from pyoai_realtime.jitter_buffer import JitterBuffer
+
+FRAME = 480  # 20ms at 24kHz
+
+
+def pcm(n_samples: int, value: int = 1) -> bytes:
+    return array("h", [value] * n_samples).tobytes()
+
+
+class TestJitterBuffer:
+    def test_prebuffers_until_target_delay(self):
+        buffer = JitterBuffer(target_delay_ms=60)
+        buffer.push("item_1", pcm(FRAME * 2))
+        assert bytes(buffer.read(FRAME)) == bytes(FRAME * 2)
+        assert buffer.stats.silence_samples == FRAME
+
+        buffer.push("item_1", pcm(FRAME))
+        assert bytes(buffer.read(FRAME)) == pcm(FRAME)
+        assert buffer.playing
+
+    def test_read_returns_memoryview_across_items(self):
+        played = []
+        buffer = JitterBuffer(target_delay_ms=20, on_played=lambda item_id, n: played.append((item_id, n)))
+        buffer.push("item_1", pcm(300, 1))
+        buffer.end_item("item_1")
+        buffer.push("item_2", pcm(FRAME, 2))
+
+        frame = buffer.read(FRAME)
+        assert isinstance(frame, memoryview)
+        assert list(array("h", bytes(frame))) == [1] * 300 + [2] * 180
+        assert played == [("item_1", 300), ("item_2", 180)]
+        assert "item_1" not in buffer.items
+
+    def test_underrun_raises_target_delay(self):
+        buffer = JitterBuffer(target_delay_ms=20, relax_after_frames=2)
+        buffer.push("item_1", pcm(FRAME))
+        buffer.read(FRAME)
+        buffer.read(FRAME)  # dry while the item is still streaming
+        assert buffer.stats.underruns == 1
+        assert buffer.target_delay_ms == 40
+        assert not buffer.playing
+
+        buffer.push("item_1", pcm(FRAME * 4))
+        for _ in range(3):
+            buffer.read(FRAME)
+        assert buffer.target_delay_ms == 20
+
+    def test_finished_item_is_not_an_underrun(self):
+        buffer = JitterBuffer(target_delay_ms=200)
+        buffer.push("item_1", pcm(100))
+        buffer.end_item("item_1")
+        assert list(array("h", bytes(buffer.read(FRAME)))) == [1] * 100 + [0] * (FRAME - 100)
+        assert buffer.stats.underruns == 0
+        assert not buffer.playing
+
+    def test_overrun_drops_oldest(self):
+        buffer = JitterBuffer(capacity_ms=20, target_delay_ms=20)
+        buffer.push("item_1", pcm(FRAME, 1))
+        buffer.push("item_1", pcm(FRAME // 2, 2))
+        assert buffer.stats.overruns == 1
+        assert buffer.stats.samples_dropped == FRAME // 2
+        assert list(array("h", bytes(buffer.read(FRAME)))) == [1] * (FRAME // 2) + [2] * (FRAME // 2)
+
+    def test_reorders_by_sequence(self):
+        buffer = JitterBuffer(target_delay_ms=0)
+        buffer.push("item_1", pcm(2, 2), seq=1)
+        assert buffer.buffered_ms == 0
+        buffer.push("item_1", pcm(2, 1), seq=0)
+        assert list(array("h", bytes(buffer.read(4)))) == [1, 1, 2, 2]
+
+    @pytest.mark.asyncio
+    async def test_driven_by_event_handler(self):
+        api = RealtimeEventHandler()
+        buffer = JitterBuffer(target_delay_ms=20).attach(api)
+        delta = base64.b64encode(pcm(FRAME, 7)).decode()
+        await api.dispatch("server.response.audio.delta", {"item_id": "item_1", "delta": delta})
+        await api.dispatch("server.response.audio.done", {"item_id": "item_1"})
+
+        frames = buffer.frames()
+        frame = await anext(frames)
+        assert list(array("h", bytes(frame))) == [7] * FRAME
+        await asyncio.wait_for(anext(frames), timeout=1)
+        await frames.aclose()
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import time
+
+import pytest
+from websockets.asyncio.client import connect, unix_connect
+
+from pyoai_realtime.event_handler import HandlerPriority
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.monitor import LoopMonitor
+from pyoai_realtime.realtime_api import RealtimeAPI
+from pyoai_realtime.realtime_conversation import RealtimeRelay
+
+
+def busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@pytest.fixture
+def warnings(monkeypatch):
+    messages = []
+    monkeypatch.setattr("pyoai_realtime.log.warn", lambda message, **kwargs: messages.append(message))
+    return messages
+
+
+@pytest.mark.asyncio
+class TestLoopMonitor:
+    async def test_samples_api_connections(self):
+        monitor = LoopMonitor()
+        async with FakeRealtimeServer(audio_chunks=5) as server:
+            api = RealtimeAPI(url=server.url, log_events=False)
+            monitor.attach(api)
+            assert monitor.sample(0.0).connections == []
+
+            await api.connect()
+            await api.wait_for_next("server.session.created", timeout=1)
+            first = monitor.sample(0.0).connections[0]
+            assert first.name == server.url and first.frame_rate == 0.0
+            assert first.write_buffer == 0 and not first.reading_paused
+
+            done = asyncio.create_task(api.wait_for_next("server.response.done", timeout=1))
+            await asyncio.sleep(0)
+            await api.send("response.create")
+            await done
+            second = monitor.sample(0.002).connections[0]
+            assert second.frame_rate > 0 and second.receive_queue >= 0
+            await api.disconnect()
+
+        assert monitor.sample(0.0).connections == [] and not monitor._frames
+        assert monitor.stats.samples == 4 and monitor.stats.max_lag == 0.002
+
+    async def test_samples_relay_clients(self):
+        relay = RealtimeRelay()
+        monitor = LoopMonitor()
+        monitor.attach(relay)
+        server = await relay.serve(hostname="localhost", port=0)
+        try:
+            port = server.sockets[0].getsockname()[1]
+            async with connect(f"ws://localhost:{port}") as websocket:
+                for i in range(3):
+                    await websocket.send(json.dumps({"type": "ping", "n": i}))
+                    assert json.loads(await websocket.recv()) == {"type": "ping", "n": i}
+                (session,) = relay.sessions.values()
+                assert session.frames_received == 3
+                (connection,) = monitor.sample(0.0).connections
+                assert connection.name.startswith("127.0.0.1:") or connection.name.startswith("::1:")
+        finally:
+            server.close()
+            await server.wait_closed()
+        assert relay.sessions == {}
+
+    async def test_samples_unix_socket_clients(self, tmp_path):
+        relay = RealtimeRelay()
+        monitor = LoopMonitor()
+        monitor.attach(relay)
+        path = str(tmp_path / "relay.sock")
+        server = await relay.serve(hostname=None, port=None, unix=True, path=path)
+        try:
+            async with unix_connect(path, "ws://localhost/") as websocket:
+                await websocket.send(json.dumps({"type": "ping"}))
+                await websocket.recv()
+                (connection,) = monitor.sample(0.0).connections
+                assert connection.name in (path, "unix")
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    async def test_connection_without_websockets_internals(self):
+        monitor = LoopMonitor()
+        connection = monitor._connection("key", object(), "peer", 0, 0.0)
+        assert (connection.write_buffer, connection.receive_queue, connection.reading_paused) == (0, 0, False)
+
+    async def test_sheds_background_handlers_while_lagging(self, warnings):
+        api = RealtimeAPI(log_events=False)
+        received = []
+        api.on("test_event", received.append, HandlerPriority.BACKGROUND)
+        monitor = LoopMonitor(interval=0.01, lag_threshold=0.02)
+        monitor.attach(api)
+        samples = []
+        monitor.add_hook(samples.append)
+        monitor.start()
+
+        await asyncio.sleep(0.02)
+        busy(0.05)
+        # the monitor's sleep ends late
+        while not samples or not samples[-1].shedding:
+            await asyncio.sleep(0.005)
+        assert api.shed_priority is HandlerPriority.BACKGROUND
+        assert monitor.stats.shed == 1 and "shedding BACKGROUND" in warnings[0]
+        await api.dispatch("test_event", {})
+        await api.flush_background()
+        assert received == []
+
+        while samples[-1].shedding:
+            await asyncio.sleep(0.005)
+        assert api.shed_priority is None
+        await api.dispatch("test_event", {})
+        await api.flush_background()
+        assert received == [{}]
+
+        await monitor.stop()
+        assert monitor.task is None and monitor.stats.lag_percentile(100) >= 0.02
+
+    async def test_hook_errors_are_contained(self, warnings):
+        monitor = LoopMonitor()
+        received = []
+
+        async def broken(sample):
+            raise RuntimeError("hook")
+
+        monitor.add_hook(broken)
+        monitor.add_hook(received.append)
+        await monitor.emit(monitor.sample(0.0))
+        assert len(received) == 1 and monitor.stats.hook_errors == 1
+
+    async def test_critical_can_not_be_shed(self):
+        with pytest.raises(ValueError):
+            LoopMonitor(shed_priority=HandlerPriority.CRITICAL)
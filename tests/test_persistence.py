@@ -0,0 +1,124 @@
+from array import array
+
+import pytest
+
+from pyoai_realtime.event_functions import ConversationInterface, EventFunctionsMixin
+from pyoai_realtime.event_handler import RealtimeEventHandler
+from pyoai_realtime.persistence import (
+    ConversationJournal,
+    ConversationStore,
+    MemoryStore,
+    SQLiteStore,
+    dump_conversation,
+    load_conversation,
+)
+from pyoai_realtime.realtime_events import Registry
+from pyoai_realtime.text_builder import TextBuilder
+
+
+class Processor(EventFunctionsMixin):
+    def __init__(self):
+        self.conversation = ConversationInterface()
+        self.event_processor = {}
+        self._register_events()
+
+
+def events(n_items: int = 3, n_deltas: int = 5) -> list[dict]:
+    out = []
+    for idx in range(n_items):
+        item_id = f"item_{idx}"
+        item = {"id": item_id, "type": "message", "role": "assistant", "content": []}
+        out.append({"event_id": "e", "type": "conversation.item.created", "previous_item_id": None, "item": item})
+        ids = {"response_id": "resp_1", "item_id": item_id, "output_index": 0, "content_index": 0}
+        for delta in range(n_deltas):
+            out.append({"event_id": "e", "type": "response.audio_transcript.delta", **ids, "delta": f"{delta} "})
+        # ignored by the processor, never journaled
+        out.append({"event_id": "e", "type": "response.audio.done", **ids})
+    return out
+
+
+def transcripts(convo: ConversationInterface) -> dict[str, str]:
+    return {item["id"]: str(item["formatted"]["transcript"]) for item in convo.items}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = MemoryStore() if request.param == "memory" else SQLiteStore(str(tmp_path / "conversations.db"))
+    yield store
+    store.close()
+
+
+class TestPersistence:
+    def test_dump_and_load_conversation(self):
+        processor = Processor()
+        for event in events():
+            if handler := processor.event_processor.get(event["type"]):
+                handler(Registry.factory(event))
+        processor.conversation.queued_input_audio = array("h", [1, -2, 3])
+        processor.conversation.item_lookup.pop("item_2")
+
+        restored = load_conversation(dump_conversation(processor.conversation))
+        assert transcripts(restored) == transcripts(processor.conversation)
+        assert isinstance(restored.items[0]["formatted"]["transcript"], TextBuilder)
+        assert restored.queued_input_audio == array("h", [1, -2, 3])
+        assert list(restored.item_lookup) == ["item_0", "item_1"]
+
+    def test_resume_replays_journal(self, store):
+        journal = ConversationJournal(store, "sess_1", Processor(), checkpoint_every=0, flush_every=4)
+        journal.extend(events())
+        journal.flush()
+        assert store.last_seq("sess_1") == 3 * 6
+
+        resumed = ConversationJournal.resume(store, "sess_1", Processor())
+        assert transcripts(resumed.conversation) == transcripts(journal.conversation)
+        assert resumed.conversation.item_lookup.keys() == {"item_0", "item_1", "item_2"}
+        assert resumed.seq == 18
+
+    def test_resume_from_checkpoint(self, store):
+        journal = ConversationJournal(store, "sess_1", Processor(), checkpoint_every=10, flush_every=3)
+        journal.extend(events())
+        journal.flush()
+
+        seq, _ = store.load_checkpoint("sess_1")
+        assert seq == 10
+        # compacted, only the tail after the checkpoint is replayed
+        assert [seq for seq, _ in store.events("sess_1")] == list(range(11, 19))
+
+        resumed = ConversationJournal.resume(store, "sess_1", Processor())
+        assert transcripts(resumed.conversation) == dict.fromkeys(["item_0", "item_1", "item_2"], "0 1 2 3 4 ")
+
+        # and it keeps journaling where the crashed one left off
+        resumed.apply(events(1, 1)[1] | {"item_id": "item_2"})
+        assert resumed.flush() == 19
+
+    def test_unflushed_events_are_lost(self, store):
+        journal = ConversationJournal(store, "sess_1", Processor(), checkpoint_every=0, flush_every=100)
+        journal.extend(events(1))
+        assert ConversationJournal.resume(store, "sess_1", Processor()).conversation.items == []
+
+    def test_attach_and_clear(self, store):
+        api = RealtimeEventHandler()
+        journal = ConversationJournal(store, "sess_1", Processor(), flush_every=1).attach(api)
+        assert "sess_1" not in store.sessions()
+        journal.detach()
+        assert api.event_handlers["server.*"] == []
+
+        journal.apply(events(1)[0])
+        assert store.sessions() == ["sess_1"]
+        journal.clear()
+        assert store.sessions() == []
+        assert journal.conversation.items == []
+
+    @pytest.mark.asyncio
+    async def test_rejected_event_does_not_raise(self, store):
+        api = RealtimeEventHandler()
+        journal = ConversationJournal(store, "sess_1", Processor(), flush_every=1).attach(api)
+        created, delta = events(1)[:2]
+        # a delta for an item the conversation does not know makes the processor raise ValueError
+        await api.dispatch("server.*", delta)
+        await api.dispatch("server.*", created)
+        assert journal.seq == 1 and [event["type"] for _, event in store.events("sess_1")] == [created["type"]]
+
+    def test_store_is_abstract(self):
+        with pytest.raises(TypeError):
+            ConversationStore()
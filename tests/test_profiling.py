@@ -0,0 +1,146 @@
+import asyncio
+import time
+
+import pytest
+
+from pyoai_realtime.event_handler import HandlerPriority, RealtimeEventHandler
+from pyoai_realtime.profiling import HandlerProfiler, callback_name
+
+
+def busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class Player:
+    def on_delta(self, event):
+        pass
+
+
+@pytest.fixture
+def warnings(monkeypatch):
+    messages = []
+    monkeypatch.setattr("pyoai_realtime.log.warn", lambda message, **kwargs: messages.append(message))
+    return messages
+
+
+@pytest.mark.asyncio
+class TestHandlerProfiler:
+    async def test_disabled_by_default(self):
+        handler = RealtimeEventHandler()
+        assert handler.profiler is None
+        handler.on("test_event", lambda event: None)
+        await handler.dispatch("test_event", {})
+        assert handler.disable_profiling() is None
+
+    async def test_times_callbacks_and_warns_on_slow_ones(self, warnings):
+        handler = RealtimeEventHandler()
+        profiler = handler.enable_profiling(slow_threshold=0.002)
+
+        def slow(event):
+            busy(0.004)
+
+        async def quick(event):
+            pass
+
+        handler.on("test_event", slow)
+        handler.on("test_event", quick, HandlerPriority.BACKGROUND)
+        for _ in range(3):
+            await handler.dispatch("test_event", {})
+            await asyncio.sleep(0)
+        await handler.flush_background()
+
+        stats = {name.rsplit(".", 1)[-1]: stats for (_, name), stats in profiler.handlers.items()}
+        assert stats["slow"].calls == 3 and stats["slow"].slow == 3 and stats["slow"].mean >= 0.004
+        assert stats["quick"].calls == 3 and stats["quick"].slow == 0
+        assert len(warnings) == 3 and "slow for test_event" in warnings[0]
+
+        # the loop was blocked for the whole slow handler before it got to the lag probe
+        assert profiler.loop_lag["test_event"].calls == 3
+        assert profiler.loop_lag["test_event"].max >= 0.004
+
+        assert handler.disable_profiling() is profiler
+        await handler.dispatch("test_event", {})
+        assert stats["slow"].calls == 3
+
+    async def test_async_callbacks_are_timed_on_the_loop(self, warnings):
+        handler = RealtimeEventHandler()
+        profiler = handler.enable_profiling(slow_threshold=0.01)
+        lock = asyncio.Lock()
+
+        async def waits(event):
+            busy(0.002)
+            await asyncio.sleep(0.05)
+            async with lock:
+                busy(0.002)
+            return event
+
+        async def fails(event):
+            await asyncio.sleep(0)
+            raise ValueError("bad event")
+
+        handler.on("test_event", waits)
+        await handler.dispatch("test_event", {})
+        handler.on("failing_event", fails)
+        with pytest.raises(ValueError):
+            await handler.dispatch("failing_event", {})
+
+        stats = {name.rsplit(".", 1)[-1]: stats for (_, name), stats in profiler.handlers.items()}
+        # both busy steps count, the sleep in between does not
+        assert 0.004 <= stats["waits"].max < 0.04 and stats["waits"].slow == 0
+        assert stats["fails"].calls == 1
+        assert warnings == []
+
+    async def test_cancelled_async_callback(self):
+        handler = RealtimeEventHandler()
+        profiler = handler.enable_profiling()
+        cancelled = []
+
+        async def hangs(event):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(event)
+                raise
+
+        handler.on("test_event", hangs)
+        task = asyncio.create_task(handler.dispatch("test_event", "event"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert cancelled == ["event"]
+        ((_, stats),) = profiler.handlers.items()
+        assert stats.calls == 1 and stats.max < 0.005
+
+    async def test_report_and_folded_stacks(self, warnings, tmp_path):
+        handler = RealtimeEventHandler()
+        profiler = handler.enable_profiling(warn=False)
+        player = Player()
+        handler.subscribe("server.response.audio.delta", player.on_delta, weak=True)
+        handler.on("server.response.done", lambda event: busy(0.001))
+        await handler.dispatch("server.response.audio.delta", {})
+        await handler.dispatch("server.response.done", {})
+        await asyncio.sleep(0)
+
+        report = profiler.report()
+        lines = report.splitlines()
+        assert "<lambda>" in lines[1] and "Player.on_delta" in lines[2]
+        assert "server.response.done" in report.split("\n\n")[1]
+
+        folded = profiler.folded().splitlines()
+        assert folded[0].startswith("dispatch;server.response.audio.delta;test_profiling.Player.on_delta ")
+        assert all(int(line.rsplit(" ", 1)[1]) >= 0 for line in folded)
+        profiler.dump_folded(tmp_path / "handlers.folded")
+        assert (tmp_path / "handlers.folded").read_text().splitlines() == folded
+        assert warnings == []
+
+        profiler.reset()
+        assert not profiler.handlers and not profiler.loop_lag
+
+
+def test_callback_name():
+    assert callback_name(Player().on_delta) == "test_profiling.Player.on_delta"
+    assert callback_name(busy) == "test_profiling.busy"
+    assert HandlerProfiler().slow_threshold == 0.005
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.rate_limit import RateLimitScheduler, TokenBucket
+from pyoai_realtime.realtime_api import RealtimeAPI
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def limits(remaining: int, limit: int = 10, reset_seconds: float = 1.0) -> list[dict]:
+    return [{"name": "requests", "limit": limit, "remaining": remaining, "reset_seconds": reset_seconds}]
+
+
+class TestTokenBucket:
+    def test_refills_up_to_capacity(self):
+        clock = Clock()
+        bucket = TokenBucket(4, rate=2, tokens=0, clock=clock)
+        assert not bucket.take()
+        assert bucket.delay(3) == 1.5
+
+        clock.now = 1.0
+        assert bucket.take(2) and not bucket.take()
+        clock.now = 10.0
+        assert bucket.available == 4
+
+    def test_costs_are_clamped_to_capacity(self):
+        clock = Clock()
+        bucket = TokenBucket(2, rate=1, tokens=0, clock=clock)
+        assert bucket.delay(100) == 2.0
+        clock.now = 2.0
+        assert bucket.take(100) and bucket.available == 0
+
+    def test_consume_and_set(self):
+        bucket = TokenBucket(10, rate=0, clock=Clock())
+        bucket.consume(15)
+        assert bucket.available == -5 and bucket.delay() == float("inf")
+        bucket.set(20, 30, rate=5)
+        assert bucket.available == 20 and bucket.rate == 5
+
+
+@pytest.mark.asyncio
+class TestRateLimitScheduler:
+    async def test_update_derives_refill_rate(self):
+        scheduler = RateLimitScheduler(window=60)
+        assert await scheduler.acquire_response() == 0.0
+        scheduler.update(limits(remaining=6, limit=10, reset_seconds=2.0))
+        assert scheduler.buckets["requests"].rate == 2.0
+        scheduler.update(limits(remaining=10, limit=10))
+        # untouched limits keep the last known rate
+        assert scheduler.buckets["requests"].rate == 2.0
+
+        scheduler.update([{"name": "tokens", "limit": 600, "remaining": 600, "reset_seconds": 0}])
+        assert scheduler.buckets["tokens"].rate == 10.0
+
+    async def test_waits_for_capacity_and_wakes_on_update(self):
+        scheduler = RateLimitScheduler()
+        scheduler.update(limits(remaining=0, limit=10, reset_seconds=60))
+
+        waiter = asyncio.create_task(scheduler.acquire_response())
+        await asyncio.sleep(0.02)
+        assert not waiter.done() and scheduler.waiting == 1
+
+        scheduler.update(limits(remaining=1))
+        assert await asyncio.wait_for(waiter, 1) > 0
+        assert scheduler.waiting == 0
+        assert scheduler.stats.acquired == scheduler.stats.delayed == 1
+        assert scheduler.stats.latency_percentile(50) > 0
+
+    async def test_token_estimate_follows_usage(self):
+        scheduler = RateLimitScheduler(response_tokens=1000)
+        scheduler._on_response_done({"response": {"usage": {"total_tokens": 2000}}})
+        assert scheduler.response_tokens == 1200
+
+        scheduler.update([{"name": "tokens", "limit": 10_000, "remaining": 1000, "reset_seconds": 9000}])
+        waiter = asyncio.create_task(scheduler.acquire_response())
+        await asyncio.sleep(0.02)
+        assert not waiter.done()
+        waiter.cancel()
+
+    async def test_rate_limit_errors_drain_the_buckets(self):
+        scheduler = RateLimitScheduler()
+        scheduler.update(limits(remaining=5))
+        scheduler._on_error({"error": {"code": "invalid_value"}})
+        assert scheduler.buckets["requests"].available >= 5
+
+        scheduler._on_error({"error": {"code": "rate_limit_exceeded"}})
+        assert scheduler.buckets["requests"].available < 1
+        assert scheduler.stats.rate_limited == 1
+
+    async def test_connections(self):
+        scheduler = RateLimitScheduler(connections_per_second=50, connection_burst=2)
+        waited = [await scheduler.acquire_connection() for _ in range(3)]
+        assert waited[:2] == [0.0, 0.0] and waited[2] > 0
+
+    async def test_gates_sessions_sharing_a_key(self):
+        scheduler = RateLimitScheduler()
+        async with FakeRealtimeServer(request_limit=3, limit_window=60) as server:
+            apis = [RealtimeAPI(url=server.url, rate_limiter=scheduler, log_events=False) for _ in range(4)]
+            for api in apis:
+                await api.connect()
+            for api in apis[:3]:
+                done = asyncio.create_task(api.wait_for_next("server.response.done", timeout=5))
+                await asyncio.sleep(0)
+                await api.send("response.create")
+                await done
+
+            blocked = asyncio.create_task(apis[3].send("response.create"))
+            await asyncio.sleep(0.05)
+            assert not blocked.done()
+            blocked.cancel()
+
+            for api in apis:
+                await api.disconnect()
+
+        assert server.rate_limited == 0 and scheduler.stats.rate_limited == 0
+        assert scheduler.stats.updates == 3
+        assert sum(event["type"] == "response.create" for event in server.received) == 3
+
+        scheduler.detach(apis[0])
+        assert apis[0].rate_limiter is None and len(scheduler.apis) == 3
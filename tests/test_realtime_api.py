@@ -134,3 +134,13 @@ class TestRealtimeAPI:
         for task in asyncio.all_tasks():
             if not task.done():
                 task.cancel()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("log_events", [True, False])
+async def test_log_events(log_events):
+    realtime = RealtimeAPI(log_events=log_events)
+    logged = []
+    realtime.log = lambda *args: logged.append(args[0])
+    await realtime.receive("response.done", {"type": "response.done"})
+    assert logged == (["RECEIVED:"] if log_events else [])
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import time
+
+import pytest
+from websockets.asyncio.client import connect
+from websockets.exceptions import InvalidStatus
+
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.realtime_conversation import RealtimeRelay
+from pyoai_realtime.routing import Tenant, TenantRouter
+
+ACME = Tenant("acme", api_key="acme-key", max_sessions=2)
+
+
+def headers(token: str = "acme-token", session: str = None) -> dict:
+    headers = {"Authorization": f"Bearer {token}"}
+    if session:
+        headers["X-Session-Key"] = session
+    return headers
+
+
+async def relay(upstream: FakeRealtimeServer, router: TenantRouter, port: int = 0):
+    relay = RealtimeRelay(upstream_url=upstream.url, model=None, router=router)
+    server = await relay.serve(hostname="localhost", port=port)
+    return relay, server, f"ws://localhost:{server.sockets[0].getsockname()[1]}"
+
+
+async def status(url: str, **kwargs) -> int:
+    with pytest.raises(InvalidStatus) as err:
+        async with connect(url, **kwargs):
+            pass
+    return err.value.response.status_code
+
+
+@pytest.mark.asyncio
+class TestTenantRouter:
+    async def test_authenticates_and_uses_tenant_credentials(self):
+        seen = []
+
+        def capture(connection, request):
+            seen.append(request.headers.get("Authorization"))
+
+        async with FakeRealtimeServer(process_request=capture) as upstream:
+            router = TenantRouter({"acme-token": ACME})
+            _, server, url = await relay(upstream, router)
+            assert await status(url, additional_headers=headers("wrong")) == 401
+            assert await status(url) == 401
+            async with connect(url, additional_headers=headers()) as client:
+                assert json.loads(await client.recv())["type"] == "session.created"
+            # browsers can not set headers
+            async with connect(f"{url}/?token=acme-token") as client:
+                assert json.loads(await client.recv())["type"] == "session.created"
+            server.close()
+            await server.wait_closed()
+        assert seen == ["Bearer acme-key"] * 2
+        assert router.stats.accepted == 2 and router.stats.rejected == {401: 2}
+        assert router.sessions["acme"] == 0
+
+    async def test_session_quota(self):
+        async with FakeRealtimeServer() as upstream:
+            router = TenantRouter({"acme-token": ACME})
+            relay_, server, url = await relay(upstream, router)
+            async with connect(url, additional_headers=headers()) as first, connect(url, additional_headers=headers()):
+                await first.recv()
+                assert await status(url, additional_headers=headers()) == 429
+                assert {session.tenant for session in relay_.sessions.values()} == {ACME}
+            # slots are freed once the handlers are done
+            while router.sessions["acme"]:
+                await asyncio.sleep(0.01)
+            async with connect(url, additional_headers=headers()) as client:
+                await client.recv()
+            server.close()
+            await server.wait_closed()
+        assert router.stats.rejected == {429: 1}
+
+    async def test_failed_handshake_frees_slot(self):
+        async with FakeRealtimeServer() as upstream:
+            router = TenantRouter({"acme-token": ACME})
+            _, server, url = await relay(upstream, router)
+            port = server.sockets[0].getsockname()[1]
+            for _ in range(3):
+                # a health check or a broken client, authenticated but without an upgrade
+                reader, writer = await asyncio.open_connection("localhost", port)
+                writer.write(b"GET / HTTP/1.1\r\nHost: localhost\r\nAuthorization: Bearer acme-token\r\n\r\n")
+                assert (await reader.readline()).startswith(b"HTTP/1.1 426")
+                writer.close()
+                await writer.wait_closed()
+            assert router.sessions["acme"] == 0 and not router.routes
+            async with connect(url, additional_headers=headers()) as client:
+                assert json.loads(await client.recv())["type"] == "session.created"
+            server.close()
+            await server.wait_closed()
+        assert router.stats.rejected == {426: 3} and router.stats.accepted == 1
+
+    async def test_resumes_parked_upstream(self):
+        async with FakeRealtimeServer() as upstream:
+            router = TenantRouter({"acme-token": ACME}, resume_timeout=5.0)
+            _, server, url = await relay(upstream, router)
+            async with connect(url, additional_headers=headers(session="conv-1")) as client:
+                assert json.loads(await client.recv())["type"] == "session.created"
+                assert await status(url, additional_headers=headers(session="conv-1")) == 409
+            while not router._parked:
+                await asyncio.sleep(0.01)
+            assert router.sessions["acme"] == 1
+
+            async with connect(url, additional_headers=headers(session="conv-1")) as client:
+                await client.send(json.dumps({"type": "session.update", "session": {"voice": "ash"}}))
+                assert json.loads(await client.recv())["type"] == "session.updated"
+            assert upstream.connections == 1 and router.stats.resumed == 1
+
+            while not router._parked:
+                await asyncio.sleep(0.01)
+            await router.close()
+            server.close()
+            await server.wait_closed()
+        assert router.sessions["acme"] == 0 and router.stats.expired == 1
+
+    async def test_parked_upstream_expires(self):
+        async with FakeRealtimeServer() as upstream:
+            router = TenantRouter({"acme-token": ACME}, resume_timeout=0.05)
+            _, server, url = await relay(upstream, router)
+            async with connect(url, additional_headers=headers(session="conv-1")) as client:
+                await client.recv()
+            await asyncio.sleep(0.2)
+            assert router.stats.expired == 1 and router.sessions["acme"] == 0 and not router._parked
+
+            async with connect(url, additional_headers=headers(session="conv-1")) as client:
+                assert json.loads(await client.recv())["type"] == "session.created"
+            server.close()
+            await server.wait_closed()
+        assert upstream.connections == 2 and router.stats.resumed == 0
+
+    async def test_redirects_to_owning_relay(self):
+        async with FakeRealtimeServer() as upstream:
+            nodes = {}
+            routers = [TenantRouter({"acme-token": ACME}, node=name, resume_timeout=0) for name in ("a", "b")]
+            servers = []
+            for router in routers:
+                _, server, nodes[router.node] = await relay(upstream, router)
+                servers.append(server)
+            for router in routers:
+                for name, url in nodes.items():
+                    router.add_node(name, url)
+
+            keys = [f"conv-{i}" for i in range(20)]
+            for key in keys:
+                # clients drop the Authorization header when redirected to another origin
+                async with connect(f"{nodes['a']}/?token=acme-token&session={key}") as client:
+                    assert json.loads(await client.recv())["type"] == "session.created"
+            for server in servers:
+                server.close()
+                await server.wait_closed()
+
+        owners = {key: routers[0].owner(ACME, key) for key in keys}
+        assert set(owners.values()) == {"a", "b"}
+        assert routers[0].stats.redirected == list(owners.values()).count("b")
+        assert routers[1].stats.accepted == list(owners.values()).count("b")
+        assert routers[1].stats.redirected == 0
+
+    async def test_bandwidth_throttling(self):
+        tenant = Tenant("acme", bandwidth=20_000, burst=4_000)
+        async with FakeRealtimeServer(audio_chunks=4) as upstream:
+            router = TenantRouter({"acme-token": tenant})
+            _, server, url = await relay(upstream, router)
+            async with connect(url, additional_headers=headers()) as client:
+                await client.recv()
+                start = time.monotonic()
+                await client.send(json.dumps({"type": "response.create"}))
+                received = 0
+                while (message := json.loads(await client.recv()))["type"] != "response.done":
+                    received += len(json.dumps(message))
+                elapsed = time.monotonic() - start
+            server.close()
+            await server.wait_closed()
+        # four 40 ms deltas of base64 PCM16 at 24 kHz are about 10 kB
+        assert received > 10_000
+        assert elapsed > (received - 4_000) / 20_000 * 0.8
+        assert router.stats.throttled > 0
@@ -0,0 +1,123 @@
+import asyncio
+import base64
+import json
+
+import pytest
+
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.realtime_api import RealtimeAPI
+from pyoai_realtime.send_queue import SendPriority, SendQueue, merge_audio
+
+
+def append(audio: bytes, event_id: str = "evt_1") -> dict:
+    return {"event_id": event_id, "type": "input_audio_buffer.append", "audio": base64.b64encode(audio).decode()}
+
+
+@pytest.fixture
+def written():
+    return []
+
+
+@pytest.fixture
+def queue(written):
+    async def write(frame: str):
+        written.append(json.loads(frame))
+
+    return SendQueue(write)
+
+
+@pytest.mark.asyncio
+class TestSendQueue:
+    async def test_merge_audio(self):
+        chunks = [b"abc", b"de", b"f", b"ghij"]
+        merged = merge_audio([base64.b64encode(chunk).decode() for chunk in chunks])
+        assert base64.b64decode(merged) == b"abcdefghij"
+
+    async def test_coalesces_adjacent_appends(self, queue, written):
+        for idx in range(5):
+            queue.put(append(bytes([idx]) * 10, f"evt_{idx}"))
+        queue.put({"event_id": "evt_commit", "type": "input_audio_buffer.commit"})
+
+        task = asyncio.create_task(queue.run())
+        await queue.flush()
+        task.cancel()
+
+        assert [event["type"] for event in written] == ["input_audio_buffer.append", "input_audio_buffer.commit"]
+        assert base64.b64decode(written[0]["audio"]) == b"".join(bytes([idx]) * 10 for idx in range(5))
+        assert queue.stats.coalesced == 4
+        assert queue.stats.frames == 2
+
+    async def test_urgent_events_jump_the_queue(self, queue, written):
+        queue.coalesce_bytes = 0
+        for idx in range(3):
+            queue.put(append(b"audio", f"evt_{idx}"))
+        queue.put({"event_id": "evt_cancel", "type": "response.cancel"})
+        queue.put({"event_id": "evt_update", "type": "session.update"}, priority=SendPriority.URGENT)
+
+        task = asyncio.create_task(queue.run())
+        await queue.flush()
+        task.cancel()
+
+        assert [event["event_id"] for event in written] == ["evt_cancel", "evt_update", "evt_0", "evt_1", "evt_2"]
+
+    async def test_cancel_stays_behind_its_create(self, written):
+        gate = asyncio.Event()
+
+        async def write(frame: str):
+            await gate.wait()
+            written.append(json.loads(frame))
+
+        queue = SendQueue(write, coalesce_bytes=0)
+        task = asyncio.create_task(queue.run())
+        # the writer is busy with the first append while the rest queues up
+        queue.put(append(b"audio", "evt_0"))
+        await asyncio.sleep(0)
+        queue.put({"event_id": "evt_create", "type": "response.create"})
+        queue.put(append(b"audio", "evt_1"))
+        queue.put({"event_id": "evt_cancel", "type": "response.cancel"})
+        queue.put(append(b"audio", "evt_2"))
+        gate.set()
+        await queue.flush()
+        task.cancel()
+
+        assert [event["event_id"] for event in written] == ["evt_0", "evt_create", "evt_cancel", "evt_1", "evt_2"]
+
+    async def test_wait_and_failed_write(self):
+        async def write(frame: str):
+            raise ConnectionError("gone")
+
+        queue = SendQueue(write)
+        future = queue.put(append(b"audio"), wait=True)
+        task = asyncio.create_task(queue.run())
+        with pytest.raises(ConnectionError):
+            await future
+        with pytest.raises(ConnectionError):
+            await task
+        assert len(queue) == 0
+
+        # the writer is gone, nothing may wait for it
+        with pytest.raises(ConnectionError, match="gone"):
+            await queue.put(append(b"audio"), wait=True)
+        with pytest.raises(ConnectionError):
+            queue.put(append(b"audio"))
+        await asyncio.wait_for(queue.flush(), 1)
+
+        queue.reopen()
+        assert not queue.put(append(b"audio")) and len(queue) == 1
+
+    async def test_realtime_api_send_queue(self):
+        async with FakeRealtimeServer() as server:
+            api = RealtimeAPI(url=server.url, send_queue=True)
+            api.log = lambda *args: True
+            await api.connect()
+            for _ in range(10):
+                await api.send("input_audio_buffer.append", {"audio": base64.b64encode(bytes(960)).decode()})
+            await api.send("input_audio_buffer.commit", wait=True)
+            await api.flush()
+            await asyncio.sleep(0.05)
+            await api.disconnect()
+
+        types = [event["type"] for event in server.received]
+        assert types[-1] == "input_audio_buffer.commit"
+        audio = b"".join(base64.b64decode(e["audio"]) for e in server.received if e["type"].endswith("append"))
+        assert len(audio) == 9600
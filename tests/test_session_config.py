@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import pytest
+
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.realtime_api import RealtimeAPI
+from pyoai_realtime.session_config import SessionConfig, SessionConfigRegistry
+
+TOOL = {
+    "type": "function",
+    "name": "get_weather",
+    "description": "Current weather for a city",
+    "parameters": {"type": "object", "properties": {"city": {"type": "string"}}, "required": ["city"]},
+}
+SESSION = {"instructions": "Be brief.", "voice": "alloy", "tools": [TOOL], "temperature": 0.8}
+
+
+async def acknowledged(api: RealtimeAPI, update) -> dict:
+    """Run `update` and return the server's `session.updated` for it."""
+    waiter = asyncio.create_task(api.wait_for_next("server.session.updated", timeout=5))
+    await asyncio.sleep(0)
+    assert await update
+    return await waiter
+
+
+class TestSessionConfig:
+    def test_canonical_encoding(self):
+        config = SessionConfig(SESSION)
+        reordered = SessionConfig(dict(reversed(SESSION.items())))
+        assert config == reordered and config.encoded == reordered.encoded
+        assert json.loads(config.encoded) == SESSION
+
+        frame = json.loads(config.frame("evt_1", ["voice"]))
+        assert frame == {"event_id": "evt_1", "type": "session.update", "session": {"voice": "alloy"}}
+        assert config.event("evt_1", ["voice"])["session"] == {"voice": "alloy"}
+
+    def test_is_isolated_from_the_source_dict(self):
+        session = {"voice": "alloy", "tools": [dict(TOOL)]}
+        config = SessionConfig(session)
+        session["tools"][0]["name"] = "changed"
+        assert config.session["tools"][0]["name"] == "get_weather"
+
+    def test_changed_fields(self):
+        config = SessionConfig(SESSION)
+        assert config.changed_fields(None) == config.fields
+        assert config.changed_fields(SessionConfig(SESSION)) == []
+
+        updated = config.replace(voice="verse", tools=[TOOL, {**TOOL, "name": "get_time"}])
+        assert sorted(updated.changed_fields(config)) == ["tools", "voice"]
+        # dropped fields can not be unset by a partial update
+        assert SessionConfig({"voice": "alloy"}).changed_fields(config) == []
+
+    def test_registry_interns(self):
+        registry = SessionConfigRegistry(max_size=2)
+        first = registry.register(SESSION, name="support")
+        assert registry.register(dict(SESSION)) is first
+        assert registry["support"] is first and "support" in registry
+
+        registry.register({"voice": "a"})
+        registry.register({"voice": "b"})
+        assert len(registry) == 2
+        # evicted from the digest cache, named configs stay reachable
+        assert registry.register(SESSION) is not first
+        assert registry["support"] is first
+
+
+@pytest.mark.asyncio
+class TestUpdateSession:
+    @pytest.mark.parametrize("send_queue", [False, True])
+    async def test_sends_only_changes(self, send_queue):
+        config = SessionConfig(SESSION)
+        async with FakeRealtimeServer() as server:
+            api = RealtimeAPI(url=server.url, send_queue=send_queue, log_events=False)
+            sent = []
+            api.on("client.session.update", sent.append)
+            await api.connect()
+
+            await acknowledged(api, api.update_session(config))
+            assert not await api.update_session(SessionConfig(SESSION))
+            updated = await acknowledged(api, api.update_session(config.replace(voice="verse")))
+            assert updated["session"]["voice"] == "verse"
+            await api.disconnect()
+
+            # a new connection starts from scratch
+            await api.connect()
+            await acknowledged(api, api.update_session(config.replace(voice="verse")))
+            await api.disconnect()
+
+        updates = [event["session"] for event in server.received if event["type"] == "session.update"]
+        assert updates == [SESSION, {"voice": "verse"}, {**SESSION, "voice": "verse"}]
+        assert [event["session"] for event in sent] == updates
+
+    async def test_plain_dicts_and_force(self):
+        async with FakeRealtimeServer() as server:
+            api = RealtimeAPI(url=server.url, log_events=False)
+            await api.connect()
+            await acknowledged(api, api.update_session(SESSION))
+            assert not await api.update_session(dict(SESSION))
+            await acknowledged(api, api.update_session(SESSION, force=True))
+            await api.disconnect()
+
+        assert sum(event["type"] == "session.update" for event in server.received) == 2
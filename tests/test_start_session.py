@@ -0,0 +1,81 @@
+import asyncio
+import base64
+
+import pytest
+
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.realtime_api import RealtimeAPI
+
+SESSION = {"voice": "verse", "instructions": "Be brief."}
+
+
+def appended(server: FakeRealtimeServer) -> bytes:
+    events = [event for event in server.received if event["type"] == "input_audio_buffer.append"]
+    return b"".join(base64.b64decode(event["audio"]) for event in events)
+
+
+@pytest.mark.asyncio
+class TestStartSession:
+    async def test_pipelines_update_and_audio(self):
+        async with FakeRealtimeServer(latency=0.05) as server:
+            api = RealtimeAPI(url=server.url, log_events=False)
+            session = await api.start_session(SESSION, initial_audio=[b"\x01\x00" * 10, b"\x02\x00" * 10])
+            await asyncio.wait_for(api.background_tasks["initial_audio"], 1)
+            await api.disconnect()
+
+        assert session["voice"] == "verse" and api.session is session
+        types = [event["type"] for event in server.received]
+        # both went out before the first server event could have arrived, in order, as a single append
+        assert types == ["session.update", "input_audio_buffer.append"]
+        assert appended(server) == b"\x01\x00" * 10 + b"\x02\x00" * 10
+
+    async def test_buffers_audio_produced_during_setup(self):
+        produced = asyncio.Event()
+
+        async def microphone():
+            for value in range(4):
+                yield bytes([value, 0]) * 10
+            produced.set()
+            await asyncio.sleep(0.05)
+            yield b"\x09\x00" * 10
+
+        async with FakeRealtimeServer() as server:
+            api = RealtimeAPI(url=server.url, log_events=False)
+            await api.start_session(SESSION, initial_audio=microphone())
+            await asyncio.wait_for(api.background_tasks["initial_audio"], 1)
+            await api.disconnect()
+
+        appends = [event for event in server.received if event["type"] == "input_audio_buffer.append"]
+        assert produced.is_set()
+        assert len(appends) == 2
+        assert appended(server) == b"".join(bytes([value, 0]) * 10 for value in [0, 1, 2, 3, 9])
+
+    async def test_without_config_or_audio(self):
+        async with FakeRealtimeServer() as server:
+            api = RealtimeAPI(url=server.url, log_events=False)
+            session = await api.start_session()
+            await api.disconnect()
+        assert session["id"].startswith("sess_")
+        assert server.received == []
+
+    async def test_times_out_and_cleans_up(self):
+        async with FakeRealtimeServer(latency=1.0) as server:
+            api = RealtimeAPI(url=server.url, log_events=False)
+            with pytest.raises(TimeoutError):
+                await api.start_session(SESSION, timeout=0.05)
+            assert not api.next_event_handlers.get("server.session.created")
+            assert "initial_audio" not in api.background_tasks
+            assert not api.connected and api.ws is None
+            await asyncio.sleep(0)
+            assert api.background_tasks["receive_loop"].done()
+
+    async def test_cancelled_setup_disconnects(self):
+        async with FakeRealtimeServer(latency=1.0) as server:
+            api = RealtimeAPI(url=server.url, log_events=False)
+            task = asyncio.create_task(api.start_session(SESSION))
+            while not api.connected:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert api.ws is None
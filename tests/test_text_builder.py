@@ -0,0 +1,109 @@
+import pytest
+
+from pyoai_realtime.event_functions import ConversationInterface, EventFunctionsMixin
+from pyoai_realtime.realtime_events import Registry
+from pyoai_realtime.text_builder import TextBuilder
+
+
+class Processor(EventFunctionsMixin):
+    def __init__(self):
+        self.conversation = ConversationInterface()
+        self.event_processor = {}
+        self._register_events()
+
+    def process(self, event: dict) -> dict:
+        return self.event_processor[event["type"]](Registry.factory({"event_id": "event_1", **event}))
+
+
+def created(item_id: str, **item) -> dict:
+    item = {"id": item_id, "type": "message", "role": "assistant", **item}
+    return {"type": "conversation.item.created", "previous_item_id": None, "item": item}
+
+
+def delta(event_type: str, item_id: str, text: str) -> dict:
+    ids = {"response_id": "resp_1", "item_id": item_id, "output_index": 0, "content_index": 0}
+    return {"type": event_type, **ids, "delta": text}
+
+
+class TestTextBuilder:
+    def test_joins_lazily_and_caches(self):
+        text = TextBuilder("He")
+        for fragment in ["l", "l", "", "o"]:
+            text += fragment
+        assert len(text) == 5
+        assert text._parts == ["He", "l", "l", "o"]
+        assert str(text) == "Hello"
+        assert text._parts == ["Hello"]
+        assert text == "Hello" and text == TextBuilder("Hello")
+
+    def test_read_new(self):
+        text = TextBuilder()
+        assert text.read_new() == ""
+        text += "Hel"
+        text += "lo"
+        assert text.unread == 2
+        assert text.read_new() == "Hello"
+        text += " there"
+        assert text.text == "Hello there"
+        assert text.read_new() == " there"
+        assert text.read_new() == ""
+
+    def test_reset(self):
+        text = TextBuilder("draft")
+        text.read_new()
+        text.reset("final")
+        assert text == "final"
+        assert text.read_new() == "final"
+
+
+class TestConversationText:
+    def test_item_created_collects_text_content(self):
+        processor = Processor()
+        content = [{"type": "input_text", "text": "Hi "}, {"type": "input_audio"}, {"type": "text", "text": "there"}]
+        result = processor.process(created("item_1", role="user", content=content))
+        assert result["item"]["formatted"]["text"] == "Hi there"
+        assert processor.conversation.item_lookup["item_1"] is result["item"]
+
+    def test_queued_transcript(self):
+        processor = Processor()
+        completed = {
+            "type": "conversation.item.input_audio_transcription.completed",
+            "item_id": "item_1",
+            "content_index": 0,
+            "transcript": "what is the weather",
+        }
+        assert processor.process(completed)["item"] is None
+
+        item = processor.process(created("item_1", role="user"))["item"]
+        assert item["formatted"]["transcript"] == "what is the weather"
+        assert not processor.conversation.queued_transcript_items
+
+    def test_deltas(self):
+        processor = Processor()
+        item = processor.process(created("item_1"))["item"]
+        transcript = item["formatted"]["transcript"]
+        for fragment in ["It ", "is ", "sunny"]:
+            result = processor.process(delta("response.audio_transcript.delta", "item_1", fragment))
+            assert result["delta"] == {"transcript": fragment}
+        processor.process(delta("response.text.delta", "item_1", "ok"))
+
+        assert transcript.read_new() == "It is sunny"
+        assert item["formatted"]["transcript"] == "It is sunny"
+        assert item["formatted"]["text"] == "ok"
+
+        with pytest.raises(ValueError):
+            processor.process(delta("response.text.delta", "item_2", "?"))
+
+    def test_truncate_resets_in_place(self):
+        processor = Processor()
+        item = processor.process(created("item_1"))["item"]
+        transcript = item["formatted"]["transcript"]
+        processor.process(delta("response.audio_transcript.delta", "item_1", "It is"))
+        assert transcript.read_new() == "It is"
+
+        truncated = {"type": "conversation.item.truncated", "item_id": "item_1", "content_index": 0, "audio_end_ms": 0}
+        processor.process(truncated)
+        # a reader holding the builder keeps following the item
+        assert item["formatted"]["transcript"] is transcript and transcript == ""
+        processor.process(delta("response.audio_transcript.delta", "item_1", "Sorry"))
+        assert transcript.read_new() == "Sorry"
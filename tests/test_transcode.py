@@ -0,0 +1,141 @@
+import base64
+import json
+import math
+import sys
+from array import array
+
+import pytest
+from websockets.asyncio.client import connect
+
+from pyoai_realtime.audio import np
+from pyoai_realtime.audio_fast_path import AudioDelta
+from pyoai_realtime.binary_audio import decode_audio_frame
+from pyoai_realtime.constants import DEFAULT_FREQUENCY
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.realtime_conversation import RealtimeRelay
+from pyoai_realtime.transcode import MuLawCodec, OpusCodec, Transcoder
+
+
+def sine(rate: int, seconds: float, freq: float = 440.0, amplitude: float = 0.5) -> bytes:
+    samples = (round(amplitude * 32767 * math.sin(2 * math.pi * freq * i / rate)) for i in range(int(rate * seconds)))
+    return array("h", samples).tobytes()
+
+
+def peak_frequency(pcm: bytes, rate: int) -> float:
+    samples = np.frombuffer(pcm, dtype="<i2").astype(np.float64)
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples))))
+    return np.fft.rfftfreq(len(samples), 1 / rate)[np.argmax(spectrum)]
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "array"])
+def use_numpy(request):
+    if request.param and np is None:
+        pytest.skip("numpy not installed")
+    return request.param
+
+
+class TestMuLawCodec:
+    def test_reference_values(self, use_numpy):
+        codec = MuLawCodec(use_numpy=use_numpy)
+        (packet,) = codec.encode(array("h", [0, -1, 32767, -32768, 1000, -1000]).tobytes())
+        assert list(packet) == [0xFF, 0x7E, 0x80, 0x00, 0xCE, 0x4E]
+        assert list(array("h", codec.decode(bytes([0xFF, 0x80, 0x00, 0xCE])))) == [0, 32124, -32124, 988]
+
+    def test_paths_agree_and_error_is_bounded(self):
+        if np is None:
+            pytest.skip("numpy not installed")
+        pcm = array("h", range(-32768, 32768, 7)).tobytes()
+        vectorized, fallback = MuLawCodec(use_numpy=True), MuLawCodec(use_numpy=False)
+        assert vectorized.encode(pcm) == fallback.encode(pcm)
+        assert vectorized.decode(bytes(range(256))) == fallback.decode(bytes(range(256)))
+
+        decoded = array("h", vectorized.decode(vectorized.encode(pcm)[0]))
+        # 8 bit logarithmic: the step grows with the magnitude, 1/16 of the segment
+        assert all(abs(a - b) <= max(abs(a) / 16, 8) + 128 for a, b in zip(array("h", pcm), decoded))
+        assert vectorized.encode(b"") == [] and vectorized.flush() == []
+
+
+class TestTranscoder:
+    def test_roundtrip_keeps_the_signal(self, use_numpy):
+        transcoder = Transcoder(MuLawCodec(use_numpy=use_numpy), use_numpy=use_numpy)
+        pcm = sine(DEFAULT_FREQUENCY, 0.2)
+        packets = transcoder.encode(pcm) + transcoder.flush()
+        assert abs(sum(map(len, packets)) - len(pcm) // 6) <= 16  # 8 kHz, one byte per sample
+
+        decoded = b"".join(transcoder.decode(packet) for packet in packets)
+        assert abs(len(decoded) - len(pcm)) <= 96
+        if np is not None:
+            assert abs(peak_frequency(decoded, DEFAULT_FREQUENCY) - 440) < 10
+
+    def test_chunks_match_a_single_call(self):
+        pcm = sine(DEFAULT_FREQUENCY, 0.2)
+        whole = Transcoder(MuLawCodec())
+        chunked = Transcoder(MuLawCodec())
+        expected = b"".join(whole.encode(pcm) + whole.flush())
+        # 40 ms chunks, like audio deltas
+        packets = [packet for i in range(0, len(pcm), 1920) for packet in chunked.encode(pcm[i : i + 1920])]
+        assert b"".join(packets + chunked.flush()) == expected
+
+    @pytest.mark.asyncio
+    async def test_sink_and_stream(self):
+        transcoder = Transcoder(MuLawCodec())
+        sent = []
+
+        async def send(packet):
+            sent.append(packet)
+
+        await transcoder.audio_sink(send)(AudioDelta("item_1", sine(DEFAULT_FREQUENCY, 0.04)))
+        assert len(sent) == 1 and abs(len(sent[0]) - 320) <= 16
+
+        async def packets():
+            for packet in (sent[0], b"", sent[0]):
+                yield packet
+
+        decoded = [pcm async for pcm in Transcoder(MuLawCodec()).decode_stream(packets())]
+        assert len(decoded) == 2 and all(pcm for pcm in decoded)
+
+
+def test_opus_roundtrip():
+    pytest.importorskip("opuslib")
+    transcoder = Transcoder(OpusCodec())
+    packets = transcoder.encode(sine(DEFAULT_FREQUENCY, 0.1))
+    assert len(packets) == 4
+    assert len(transcoder.flush()) == 1
+    assert len(transcoder.decode(packets[0])) == DEFAULT_FREQUENCY * 20 // 1000 * 2
+
+
+def test_opus_needs_opuslib(monkeypatch):
+    monkeypatch.setitem(sys.modules, "opuslib", None)
+    with pytest.raises(ImportError, match="opuslib"):
+        OpusCodec()
+
+
+@pytest.mark.asyncio
+async def test_relay_transcodes_both_ways():
+    async with FakeRealtimeServer(audio_chunks=3) as upstream:
+        relay = RealtimeRelay(upstream_url=upstream.url, model=None, transcoder=lambda: Transcoder(MuLawCodec()))
+        server = await relay.serve(hostname="localhost", port=0)
+        async with connect(f"ws://localhost:{server.sockets[0].getsockname()[1]}") as client:
+            await client.recv()
+            await client.send(MuLawCodec().encode(sine(8000, 0.02))[0])
+            await client.send(json.dumps({"type": "response.create"}))
+            messages = []
+            while not messages or messages[-1] != "response.done":
+                message = await client.recv()
+                messages.append(message if isinstance(message, bytes) else json.loads(message))
+                if isinstance(messages[-1], dict):
+                    messages[-1] = messages[-1] if messages[-1]["type"] == "relay.audio.item" else messages[-1]["type"]
+        server.close()
+        await server.wait_closed()
+
+    announcement = next(message for message in messages if isinstance(message, dict))
+    assert announcement["codec"] == "pcmu"
+    frames = [message for message in messages if isinstance(message, bytes)]
+    # the tail the resampler held back goes out before response.audio.done
+    assert messages.index("response.audio.done") > messages.index(frames[-1])
+    assert [decode_audio_frame(frame)[1] for frame in frames] == list(range(len(frames)))
+    assert abs(sum(len(decode_audio_frame(frame)[2]) for frame in frames) - 3 * 320) <= 16
+
+    append = upstream.received[0]
+    assert append["type"] == "input_audio_buffer.append"
+    assert abs(len(base64.b64decode(append["audio"])) - 960) <= 96
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+from websockets.extensions import Extension
+from websockets.frames import Frame, Opcode
+
+from pyoai_realtime.deflate import DirectionalDeflate
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.realtime_api import RealtimeAPI
+from pyoai_realtime.transport import TransportConfig
+
+
+def text_frame(payload: bytes = b'{"type": "input_audio_buffer.append"}' * 10) -> Frame:
+    return Frame(Opcode.TEXT, payload)
+
+
+async def roundtrip(transport: TransportConfig, server_transport: TransportConfig = None) -> list[Extension]:
+    server_transport = server_transport or transport
+    async with FakeRealtimeServer(audio_chunks=3, **server_transport.server_kwargs()) as server:
+        api = RealtimeAPI(url=server.url, transport=transport, log_events=False)
+        deltas = []
+        api.on("server.response.audio.delta", deltas.append)
+        await api.connect()
+        extensions = list(api.ws.protocol.extensions)
+        # registered before the request, the answer can not slip past it
+        done = asyncio.create_task(api.wait_for_next("server.response.done", timeout=5))
+        await asyncio.sleep(0)
+        await api.send("response.create")
+        await done
+        await api.disconnect()
+        assert len(deltas) == 3
+    return extensions
+
+
+@pytest.mark.asyncio
+class TestTransport:
+    async def test_default_is_uncompressed(self):
+        assert TransportConfig().client_kwargs()["compression"] is None
+        assert "extensions" not in TransportConfig().client_kwargs()
+        assert await roundtrip(TransportConfig()) == []
+
+    async def test_library_defaults_compress_both_ways(self):
+        (extension,) = await roundtrip(TransportConfig.library_defaults())
+        assert isinstance(extension, DirectionalDeflate)
+        assert extension.compress_outbound
+        assert extension.encode(text_frame()).rsv1
+
+    async def test_inbound_only(self):
+        transport = TransportConfig(compress_inbound=True)
+        (extension,) = await roundtrip(transport, TransportConfig.library_defaults())
+        assert not extension.compress_outbound
+        # the client does not keep a compression context it never uses
+        assert extension.local_no_context_takeover
+        frame = text_frame()
+        assert extension.encode(frame) is frame
+
+    async def test_server_without_compression(self):
+        # the client asks for deflate but the server does not offer it
+        assert await roundtrip(TransportConfig.library_defaults(), TransportConfig()) == []
+
+    async def test_limits_are_passed_through(self):
+        kwargs = TransportConfig(max_size=None, max_queue=4, ping_interval=None).server_kwargs()
+        assert kwargs["max_size"] is None
+        assert kwargs["max_queue"] == 4
+        assert kwargs["ping_interval"] is None
+        assert "compress_outbound" not in kwargs
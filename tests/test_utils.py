@@ -0,0 +1,76 @@
+import multiprocessing
+import threading
+
+import pytest
+
+from pyoai_realtime.utils import ID_ALPHABET, generate_id, generate_monotonic_id, percentile
+
+
+def _ids_in_child(conn, count: int):
+    conn.send([generate_id("evt_") for _ in range(count)])
+    conn.close()
+
+
+class TestGenerateId:
+    def test_prefix_length_and_alphabet(self):
+        event_id = generate_id("evt_", length=30)
+        assert event_id.startswith("evt_")
+        assert len(event_id) == 30
+        assert set(event_id[4:]) <= set(ID_ALPHABET)
+
+    def test_long_prefix_does_not_rewind(self):
+        before = generate_id("evt_")
+        assert generate_id("x" * 30) == "x" * 30
+        after = generate_id("evt_")
+        # the random part of the next id is fresh, not a replay of characters already handed out
+        assert after[4:12] not in before
+
+    def test_threads_do_not_collide(self):
+        results = []
+
+        def worker():
+            results.extend(generate_id("evt_") for _ in range(5000))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(set(results)) == len(results) == 20_000
+
+    @pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="requires fork")
+    def test_forked_workers_do_not_collide(self):
+        # warm the parent's buffer so the children inherit one
+        parent_ids = [generate_id("evt_") for _ in range(10)]
+        ctx = multiprocessing.get_context("fork")
+        pipes, procs = [], []
+        for _ in range(4):
+            recv, send = ctx.Pipe(duplex=False)
+            proc = ctx.Process(target=_ids_in_child, args=(send, 2000))
+            proc.start()
+            pipes.append(recv)
+            procs.append(proc)
+
+        ids = list(parent_ids)
+        for recv, proc in zip(pipes, procs):
+            ids.extend(recv.recv())
+            proc.join()
+        ids.extend(generate_id("evt_") for _ in range(2000))
+        assert len(set(ids)) == len(ids)
+
+    def test_monotonic_ids_sort_in_creation_order(self):
+        ids = [generate_monotonic_id("evt_") for _ in range(5000)]
+        assert ids == sorted(ids)
+        assert len(set(ids)) == len(ids)
+        assert all(len(event_id) == 21 for event_id in ids)
+
+    def test_monotonic_id_too_short(self):
+        with pytest.raises(ValueError):
+            generate_monotonic_id("evt_", length=16)
+
+
+def test_percentile():
+    assert percentile([], 99) == 0.0
+    values = [0.3, 0.1, 0.4, 0.2]
+    assert percentile(values, 0) == 0.1 and percentile(values, 50) == 0.3 and percentile(values, 100) == 0.4
+    assert values == [0.3, 0.1, 0.4, 0.2]
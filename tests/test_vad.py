@@ -0,0 +1,75 @@
+import base64
+import math
+from array import array
+
+import pytest
+
+from pyoai_realtime.realtime_events import input_audio_buffer_events
+from pyoai_realtime.vad import VADConfig, VADState, VoiceActivityDetector, frame_features, np
+
+SAMPLE_RATE = 24_000
+
+
+def tone(ms: int, amplitude: float = 0.3, freq: int = 220) -> bytes:
+    n = SAMPLE_RATE * ms // 1000
+    step = 2 * math.pi * freq / SAMPLE_RATE
+    return array("h", (int(amplitude * 32767 * math.sin(step * i)) for i in range(n))).tobytes()
+
+
+def silence(ms: int) -> bytes:
+    return bytes(SAMPLE_RATE * ms // 1000 * 2)
+
+
+def event_names(events):
+    return [name for name, _ in events]
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "array"])
+def use_numpy(request):
+    if request.param and np is None:
+        pytest.skip("numpy not installed")
+    return request.param
+
+
+class TestVoiceActivityDetector:
+    def test_frame_features_paths_agree(self):
+        if np is None:
+            pytest.skip("numpy not installed")
+        pcm = tone(100) + silence(100)
+        rms_np, zcr_np = frame_features(pcm, 480, use_numpy=True)
+        rms_py, zcr_py = frame_features(pcm, 480, use_numpy=False)
+        assert rms_np == pytest.approx(rms_py, abs=1e-5)
+        assert zcr_np == pytest.approx(zcr_py, abs=1e-5)
+
+    def test_silence_is_dropped(self, use_numpy):
+        vad = VoiceActivityDetector(use_numpy=use_numpy)
+        assert vad.process(silence(2000)) == []
+        assert vad.state is VADState.SILENCE
+        assert vad.stats.frames_sent == 0
+        assert vad.stats.frames_dropped == vad.stats.frames_in - vad.config.frames(vad.config.pre_roll_ms)
+
+    def test_speech_is_pre_rolled_and_committed(self, use_numpy):
+        config = VADConfig(pre_roll_ms=100, hangover_ms=40, commit_silence_ms=200)
+        vad = VoiceActivityDetector(config, use_numpy=use_numpy)
+        events = vad.process(silence(500) + tone(300) + silence(400))
+
+        assert event_names(events) == [input_audio_buffer_events.Append.type, input_audio_buffer_events.Commit.type]
+        audio = base64.b64decode(events[0][1]["audio"])
+        # pre-roll + speech + hangover
+        assert len(audio) == len(silence(100) + tone(300) + silence(40))
+        assert vad.state is VADState.SILENCE
+
+    def test_short_blip_is_cleared(self, use_numpy):
+        config = VADConfig(min_speech_ms=200, commit_silence_ms=100)
+        vad = VoiceActivityDetector(config, use_numpy=use_numpy)
+        events = vad.process(tone(40) + silence(200))
+        assert event_names(events)[-1] == input_audio_buffer_events.Clear.type
+        assert vad.stats.clears == 1
+
+    def test_partial_frames_carry_over(self, use_numpy):
+        vad = VoiceActivityDetector(use_numpy=use_numpy)
+        pcm = tone(100)
+        events = vad.process(pcm[:301]) + vad.process(pcm[301:])
+        sent = b"".join(base64.b64decode(data["audio"]) for name, data in events)
+        assert sent == pcm
+        assert event_names(vad.flush()) == [input_audio_buffer_events.Commit.type]
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import signal
+from collections import Counter
+
+import pytest
+
+from pyoai_realtime.fake_server import FakeRealtimeServer
+from pyoai_realtime.realtime_api import RealtimeAPI
+from pyoai_realtime.workers import ConsistentHashRing, RealtimeSessionPool, WorkerSupervisor, control_request
+
+
+async def run_response(api: RealtimeAPI, params: dict):
+    done = asyncio.create_task(api.wait_for_next("server.response.done", timeout=5))
+    await api.send("response.create")
+    await done
+    await asyncio.sleep(params.get("linger", 0))
+
+
+class TestConsistentHashRing:
+    def test_balanced_and_stable(self):
+        ring = ConsistentHashRing([f"worker-{idx}" for idx in range(4)])
+        keys = [f"session-{idx}" for idx in range(4000)]
+        before = {key: ring.get(key) for key in keys}
+        assert min(Counter(before.values()).values()) > 600
+
+        ring.add("worker-4")
+        after = {key: ring.get(key) for key in keys}
+        moved = [key for key in keys if before[key] != after[key]]
+        # only keys taken over by the new node move
+        assert all(after[key] == "worker-4" for key in moved)
+        assert len(moved) < len(keys) / 3
+
+        ring.remove("worker-4")
+        assert {key: ring.get(key) for key in keys} == before
+
+    def test_empty_ring(self):
+        with pytest.raises(LookupError):
+            ConsistentHashRing().get("key")
+
+
+@pytest.mark.asyncio
+class TestRealtimeSessionPool:
+    async def test_open_run_and_drain(self):
+        async with FakeRealtimeServer(audio_chunks=3) as server:
+            pool = RealtimeSessionPool(run_response, url=server.url, log_events=False)
+            await pool.open("a")
+            await pool.open("b", {"linger": 10})
+            with pytest.raises(RuntimeError):
+                await pool.open("b")
+
+            await asyncio.sleep(0.2)
+            assert len(pool) == 1
+            assert await pool.drain(timeout=0.1) == 1
+            assert pool.snapshot()["closed"] == 2
+            # session.created + response.created + 3 deltas + audio.done + response.done, twice
+            assert pool.metrics.frames_received >= 14
+            with pytest.raises(RuntimeError):
+                await pool.open("c")
+
+
+@pytest.mark.asyncio
+class TestWorkerSupervisor:
+    async def test_sessions_are_sharded_and_metrics_aggregated(self):
+        async with FakeRealtimeServer(audio_chunks=2) as server:
+            supervisor = WorkerSupervisor(run_response, workers=2, mp_context="fork", url=server.url, log_events=False)
+            await supervisor.start()
+            try:
+                for idx in range(6):
+                    await supervisor.open_session(f"session-{idx}")
+                assert set(supervisor.sessions.values()) <= set(supervisor.workers)
+                assert supervisor.sessions["session-0"] == supervisor.ring.get("session-0")
+
+                await asyncio.sleep(0.5)
+                metrics = await control_request(supervisor.control_path, {"cmd": "metrics"})
+                assert metrics["totals"]["opened"] == 6
+                assert metrics["totals"]["closed"] == 6
+                # the runners returned, the health check forgets their sessions
+                assert len(supervisor.sessions) == 6
+                await supervisor.health_check()
+                assert supervisor.sessions == {}
+
+                worker = supervisor.workers["worker-0"]
+                worker.process.kill()
+                await asyncio.to_thread(worker.process.join)
+                status = await supervisor.health_check()
+                assert status["worker-0"] is False
+                assert worker.restarts == 1
+                assert (await supervisor.health_check())["worker-0"] is True
+            finally:
+                await supervisor.stop(drain_timeout=1)
+            assert not any(worker.process.is_alive() for worker in supervisor.workers.values())
+
+    async def test_concurrent_health_checks_restart_once(self):
+        supervisor = WorkerSupervisor(
+            run_response, workers=1, health_interval=0.3, max_missed_pings=1, mp_context="fork", log_events=False
+        )
+        await supervisor.start()
+        try:
+            worker = supervisor.workers["worker-0"]
+            # a hung worker, both checks time out on their ping
+            os.kill(worker.process.pid, signal.SIGSTOP)
+            status, reply = await asyncio.gather(
+                supervisor.health_check(), control_request(supervisor.control_path, {"cmd": "health"})
+            )
+            assert worker.restarts == 1
+            assert [status["worker-0"], reply["workers"]["worker-0"]].count(False) == 1
+        finally:
+            await supervisor.stop(drain_timeout=1)